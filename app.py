@@ -1,12 +1,11 @@
-from flask import Flask, render_template, url_for
+from flask import Flask, render_template, url_for, g, has_request_context
 import os
 import mysql.connector
 from mysql.connector import Error
 from mysql.connector import pooling
-from flask import jsonify, request
+from flask import jsonify, request, Request, Response, stream_with_context, send_file
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-import uuid
 import time
 from datetime import datetime, timedelta
 from werkzeug.security import check_password_hash, generate_password_hash
@@ -15,10 +14,38 @@ from functools import wraps
 from flask_mail import Mail, Message
 import secrets
 from mpesa import lipa_na_mpesa_online, transaction_status
-import random
+from search_index import ProductSearchIndex, PrefixSuggester
+from catalog_cache import CatalogCache, SharedCatalogVersion
+from facet_index import FACETS, ProductFacetIndex, brand_key
+from catalog_io import DEFAULT_BATCH_SIZE, detect_format, read_rows, import_catalog, iter_export
+import image_pipeline
+import upload_store
+import upload_gc
+import chunked_upload
+import order_stock
+import pricing
+import order_export
+import order_events
+from order_numbers import OrderNumberAllocator, is_valid_order_number
+import idempotency
+from idempotency import IdempotencyStore
 from collections import defaultdict
 from pyngrok import ngrok
 import pytz
+import json
+import base64
+import mimetypes
+from urllib.parse import quote
+import hashlib
+import heapq
+import itertools
+import gzip
+from decimal import Decimal
+
+try:
+    import brotli  # Optional: catalog responses are also pre-compressed with brotli when installed
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 CORS(app)  # Add this line
@@ -54,6 +81,19 @@ os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 # File size limit (5MB)
 app.config["MAX_CONTENT_LENGTH"] = 5 * 1024 * 1024
 
+# Endpoints whose image parts are spooled straight into hashing temp files
+SPOOLED_UPLOAD_ENDPOINTS = {"add_product", "update_product"}
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint in SPOOLED_UPLOAD_ENDPOINTS:
+            return upload_store.HashingSpool(app.config["UPLOAD_FOLDER"])
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
+app.request_class = UploadRequest
+
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
 
@@ -329,75 +369,629 @@ def get_user_info():
             cursor.close()
             conn.close()
 
+
+def image_variant_url(filename, variant, version=None):
+    """Fingerprinted URL; the v parameter changes whenever the bytes behind it do.
+
+    Pass version when building several URLs for one upload, so its files are stat'ed once.
+    """
+    if version is None:
+        version = image_pipeline.fingerprint(app.config["UPLOAD_FOLDER"], filename)
+    return url_for("serve_image_variant", variant=variant, filename=filename, v=version)
+
+
+def image_variants_ready(filename):
+    # Cached catalog responses embed fingerprinted URLs; rebuild them with the new fingerprint
+    catalog_data_changed()
+
+
+def image_variant_urls(filename):
+    """Responsive URLs for one upload, keyed by variant name"""
+    version = image_pipeline.fingerprint(app.config["UPLOAD_FOLDER"], filename)
+    return {variant: image_variant_url(filename, variant, version) for variant in image_pipeline.VARIANTS}
+
+
+def load_product_relations(cursor, products, include_ratings=False):
+    """Attach colors, sizes and images (and optionally rating stats) to product rows in a fixed number of queries"""
+    if not products:
+        return products
+
+    product_ids = [p["id"] for p in products]
+    placeholders = ",".join(["%s"] * len(product_ids))
+    if has_request_context():
+        # cached_catalog_read tags the cached response with these for invalidate_products
+        g.setdefault("catalog_product_ids", set()).update(product_ids)
+
+    colors_by_product = defaultdict(list)
+    sizes_by_product = defaultdict(list)
+    images_by_product = defaultdict(list)
+
+    # Fetch colors
+    cursor.execute(f"""
+        SELECT pc.product_id, cl.color_id, cl.name
+        FROM product_colors pc
+        JOIN colors cl ON pc.color_id = cl.color_id
+        WHERE pc.product_id IN ({placeholders})
+        ORDER BY pc.product_id, pc.id
+    """, product_ids)
+    for row in cursor.fetchall():
+        colors_by_product[row["product_id"]].append({"color_id": row["color_id"], "name": row["name"]})
+
+    # Fetch sizes
+    cursor.execute(f"""
+        SELECT ps.product_id, s.size_id, s.size_name
+        FROM product_sizes ps
+        JOIN sizes s ON ps.size_id = s.size_id
+        WHERE ps.product_id IN ({placeholders})
+        ORDER BY ps.product_id, ps.id
+    """, product_ids)
+    for row in cursor.fetchall():
+        sizes_by_product[row["product_id"]].append({"size_id": row["size_id"], "size_name": row["size_name"]})
+
+    # Fetch images
+    cursor.execute(f"""
+        SELECT product_id, image_filename
+        FROM product_images
+        WHERE product_id IN ({placeholders})
+        ORDER BY product_id, id
+    """, product_ids)
+    for row in cursor.fetchall():
+        images_by_product[row["product_id"]].append(row["image_filename"])
+
+    for product in products:
+        product["colors"] = colors_by_product.get(product["id"], [])
+        product["sizes"] = sizes_by_product.get(product["id"], [])
+        product["images"] = images_by_product.get(product["id"], [])
+        product["image_variants"] = [image_variant_urls(f) for f in product["images"]]
+
+    if include_ratings:
+        ratings = fetch_rating_stats(cursor, product_ids)
+        for product in products:
+            product["rating"] = ratings[product["id"]]
+
+    return products
+
+
+# ---------------------- Catalog Cache & Indexes ----------------------
+
+# Catalog reads are served from memory until a write bumps the version
+app.config["CATALOG_CACHE_MAX_ENTRIES"] = int(os.environ.get("CATALOG_CACHE_MAX_ENTRIES", 256))
+catalog_cache = CatalogCache(max_entries=app.config["CATALOG_CACHE_MAX_ENTRIES"])
+# Other worker processes' catalog writes show up here within this many seconds
+app.config["CATALOG_VERSION_CHECK_SECONDS"] = float(os.environ.get("CATALOG_VERSION_CHECK_SECONDS", 2))
+catalog_version = SharedCatalogVersion(get_db_connection, app.config["CATALOG_VERSION_CHECK_SECONDS"])
+
+
+product_search_index = ProductSearchIndex()
+
+SEARCH_INDEX_QUERY = """
+    SELECT p.id, p.name, p.description, p.brand, c.name AS category_name
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.id
+    WHERE p.status = 'active'
+"""
+
+
+def ensure_search_index(cursor):
+    """Build the search index from the database on first use"""
+    if product_search_index.built:
+        return
+    cursor.execute(SEARCH_INDEX_QUERY)
+    product_search_index.rebuild(cursor.fetchall())
+    print(f"Search index built with {len(product_search_index)} products")
+
+
+def refresh_search_index(conn, product_ids=None, category_id=None):
+    """Re-index the given products (or every product in a category) after a write"""
+    if not product_search_index.built:
+        return  # Built lazily on the next search with fresh data
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if category_id is not None:
+            cursor.execute("SELECT id FROM products WHERE category_id = %s", (category_id,))
+            product_ids = [row["id"] for row in cursor.fetchall()]
+        if not product_ids:
+            return
+
+        placeholders = ",".join(["%s"] * len(product_ids))
+        cursor.execute(SEARCH_INDEX_QUERY + f" AND p.id IN ({placeholders})", list(product_ids))
+        active = {row["id"]: row for row in cursor.fetchall()}
+        for product_id in product_ids:
+            if product_id in active:
+                product_search_index.upsert(active[product_id])
+            else:
+                product_search_index.remove(product_id)
+    except Exception as e:
+        print(f"⚠️  Search index refresh failed, rebuilding on next search: {e}")
+        product_search_index.built = False
+    finally:
+        cursor.close()
+
+
+product_suggester = PrefixSuggester(k=8)
+
+SUGGESTION_PRODUCTS_QUERY = """
+    SELECT p.id, p.name, p.brand, p.price, p.discount, p.category_id,
+           c.name AS category_name, p.primary_image AS image,
+           COALESCE(sold.units_sold, 0) AS units_sold
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.id
+    LEFT JOIN (
+        SELECT product_id, SUM(quantity) AS units_sold
+        FROM order_items
+        GROUP BY product_id
+    ) sold ON sold.product_id = p.id
+    WHERE p.status = 'active'
+"""
+
+
+def build_suggestions(conn):
+    """Rebuild the autocomplete index; products rank by units sold, brands and categories by their products' sales"""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(SUGGESTION_PRODUCTS_QUERY)
+        products = cursor.fetchall()
+        cursor.execute("SELECT id, name FROM categories")
+        categories = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    entries = []
+    brand_popularity = defaultdict(int)
+    brand_names = {}
+    category_popularity = defaultdict(int)
+
+    for p in products:
+        units_sold = int(p["units_sold"])
+        entries.append({
+            "type": "product",
+            "id": p["id"],
+            "text": p["name"],
+            "category_name": p["category_name"],
+            "price": float(p["price"]) if p["price"] is not None else None,
+            "discount": float(p["discount"]) if p["discount"] is not None else None,
+            "image": p["image"],
+            "popularity": units_sold,
+        })
+        key = brand_key(p["brand"])
+        if key:
+            brand_names.setdefault(key, p["brand"].strip())
+            brand_popularity[key] += units_sold + 1
+        if p["category_id"] is not None:
+            category_popularity[p["category_id"]] += units_sold + 1
+
+    for key, brand in brand_names.items():
+        entries.append({"type": "brand", "text": brand, "popularity": brand_popularity[key]})
+
+    for c in categories:
+        entries.append({
+            "type": "category",
+            "id": c["id"],
+            "text": c["name"],
+            "popularity": category_popularity.get(c["id"], 0),
+        })
+
+    product_suggester.rebuild(entries)
+
+
+def refresh_suggestions(conn):
+    """Rebuild the autocomplete index after a write, if it has been built"""
+    if not product_suggester.built:
+        return
+    try:
+        build_suggestions(conn)
+    except Exception as e:
+        print(f"⚠️  Suggestion index refresh failed, rebuilding on next request: {e}")
+        product_suggester.built = False
+
+
+def apply_remote_catalog_changes(changes):
+    """Drop what this process built from data another worker has since changed"""
+    data_changed, index_changed, changed_product_ids = changes
+    if index_changed:
+        # Rebuilt from the database on next use
+        product_search_index.built = False
+        product_suggester.built = False
+        product_facet_index.invalidate()
+    if data_changed:
+        catalog_cache.bump()
+    elif changed_product_ids:
+        # Stock sold by another worker's checkouts
+        catalog_cache.invalidate_products(changed_product_ids)
+
+
+def sync_catalog():
+    """Pick up other workers' catalog writes; reads the shared version at most every few seconds"""
+    apply_remote_catalog_changes(catalog_version.poll())
+
+
+def publish_catalog_change(conn=None, index=False):
+    """Tell the other worker processes about a committed catalog write made here.
+
+    Pass the request's connection if it still holds one: a second pooled connection per
+    write would let a handful of concurrent writers exhaust the pool.
+    """
+    try:
+        apply_remote_catalog_changes(catalog_version.bump(index=index, conn=conn))
+    except Exception as e:
+        print(f"⚠️  Could not bump the shared catalog version: {e}")
+
+
+def catalog_data_changed(conn=None):
+    """After a committed write that cached catalog responses embed (ratings, colors, images)"""
+    catalog_cache.bump()
+    publish_catalog_change(conn)
+
+
+def catalog_changed(conn, product_ids=None, category_id=None):
+    """Bring in-memory catalog indexes up to date after a committed product or category write"""
+    if product_ids or category_id is not None:
+        refresh_search_index(conn, product_ids, category_id)
+    refresh_suggestions(conn)
+    product_facet_index.invalidate()
+    # Bump last so no read can cache a response built from the old indexes under the new version
+    catalog_cache.bump()
+    publish_catalog_change(conn, index=True)
+
+
+# Bodies smaller than this are not worth compressing
+CATALOG_COMPRESS_MIN_BYTES = 1024
+
+
+def build_catalog_blobs(body):
+    """Pre-encode a catalog body once: identity, gzip and (if available) brotli, each with its own ETag"""
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    blobs = {"identity": (body, digest)}
+    if len(body) >= CATALOG_COMPRESS_MIN_BYTES:
+        blobs["gzip"] = (gzip.compress(body, compresslevel=6), f"{digest}-gz")
+        if brotli is not None:
+            blobs["br"] = (brotli.compress(body, quality=5), f"{digest}-br")
+    return blobs
+
+
+def catalog_response(blobs):
+    """Send the representation Accept-Encoding prefers, or a bodiless 304 if the client has it"""
+    encoding = request.accept_encodings.best_match([e for e in ("br", "gzip", "identity") if e in blobs]) or "identity"
+    body, etag = blobs[encoding]
+
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype="application/json")
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    # Let browsers keep the body but revalidate it on every visit
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def cached_catalog_read(view):
+    """Serve a catalog GET endpoint from catalog_cache while the catalog version is unchanged.
+
+    The cache holds ready-to-send bodies in every supported encoding, built once per
+    catalog version, so a hit costs no query, no JSON encoding and no compression.
+    Each body has a strong ETag, and a matching If-None-Match gets a 304.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        sync_catalog()
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        blobs = catalog_cache.get(key)
+        if blobs is not None:
+            return catalog_response(blobs)
+
+        version = catalog_cache.version
+        product_generation = catalog_cache.product_generation
+        result = view(*args, **kwargs)
+        response = app.make_response(result)
+        if response.status_code != 200 or response.mimetype != "application/json":
+            return response
+
+        blobs = build_catalog_blobs(response.get_data())
+        catalog_cache.set(key, blobs, version, g.get("catalog_product_ids", ()), product_generation)
+        return catalog_response(blobs)
+    return wrapper
+
+
+def warm_catalog_indexes():
+    """Build the search and autocomplete indexes at startup so the first shopper doesn't pay for it"""
+    conn = get_db_connection()
+    if conn is None:
+        print("⚠️  Catalog indexes not built at startup, will build on first request")
+        return
+    try:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            ensure_search_index(cursor)
+        finally:
+            cursor.close()
+        build_suggestions(conn)
+        print(f"Suggestion index built with {len(product_suggester)} entries")
+    except Exception as e:
+        print(f"⚠️  Failed to build catalog indexes: {e}")
+    finally:
+        conn.close()
+
+
+# ---------------------- Product Facets ----------------------
+
+product_facet_index = ProductFacetIndex()
+
+
+def ensure_facet_index(cursor):
+    """(Re)build the facet bitmaps from the database if a catalog write made them stale"""
+    if product_facet_index.built:
+        return
+    generation = product_facet_index.generation
+    cursor.execute("""
+        SELECT id, category_id, brand, price, discount
+        FROM products
+        WHERE status = 'active'
+    """)
+    products = cursor.fetchall()
+    cursor.execute("SELECT product_id, color_id FROM product_colors")
+    colors = [(row["product_id"], row["color_id"]) for row in cursor.fetchall()]
+    cursor.execute("SELECT product_id, size_id FROM product_sizes")
+    sizes = [(row["product_id"], row["size_id"]) for row in cursor.fetchall()]
+    product_facet_index.rebuild(products, colors, sizes, generation)
+
+
+def parse_facet_filters(args):
+    """Read facet selections and the price range from query args; raises ValueError on bad input"""
+    selections = {}
+    for facet in FACETS:
+        values = [v.strip() for item in args.getlist(facet) for v in item.split(",") if v.strip()]
+        if facet != "brand":
+            try:
+                values = [int(v) for v in values]
+            except ValueError:
+                raise ValueError(f"Invalid {facet} filter")
+        selections[facet] = values
+
+    prices = []
+    for name in ("min_price", "max_price"):
+        value = args.get(name)
+        try:
+            prices.append(float(value) if value not in (None, "") else None)
+        except ValueError:
+            raise ValueError(f"Invalid {name}")
+    return selections, prices[0], prices[1]
+
+
+# Sort keys allowed for keyset pagination on /api/products; p.id is always the tie-breaker
+PRODUCT_SORT_COLUMNS = {
+    "id": "p.id",
+    "price": "p.price",
+    "created_at": "p.created_at",
+    "name": "p.name",
+}
+DEFAULT_PAGE_LIMIT = 24
+MAX_PAGE_LIMIT = 100
+
+
+def encode_cursor(values):
+    """Encode the sort key values of the last row into an opaque cursor string"""
+    def to_json(value):
+        if isinstance(value, datetime):
+            return value.isoformat(sep=" ")
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    raw = json.dumps([to_json(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor_str, size):
+    """Decode a cursor produced by encode_cursor, returns None if it is malformed"""
+    try:
+        padded = cursor_str + "=" * (-len(cursor_str) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def wants_rating_stats():
+    """True when the request asks for rating stats embedded in product payloads (?include=ratings)"""
+    return "ratings" in request.args.get("include", "").split(",")
+
+
+def parse_page_limit(value):
+    """Parse the ?limit= parameter, returns None for unpaginated (compatibility) requests"""
+    if value is None or value == "":
+        return None
+    try:
+        limit = int(value)
+    except (ValueError, TypeError):
+        return DEFAULT_PAGE_LIMIT
+    return max(1, min(limit, MAX_PAGE_LIMIT))
+
+
 @app.route("/api/products", methods=["GET"])
+@cached_catalog_read
 def get_products():
+    """List active products.
+
+    Without ?limit= the full list is returned as a plain array (compatibility mode).
+    With ?limit= the response is a page: {"products", "next_cursor", "total"}, where
+    ?after= takes the previous page's next_cursor and ?sort= / ?order= pick the
+    sort key (id, price, created_at, name) and direction. "total" is only counted
+    on the first page. ?search= goes through the search index and, unless another
+    sort key is given, orders results by relevance.
+
+    Facet filters: ?category_id=, ?color_id=, ?size_id=, ?brand= (repeat the parameter
+    or comma-separate values), ?min_price= / ?max_price= on the discounted price. Paged
+    requests with ?facets=1 also get per-value "facets" counts.
+
+    ?include=ratings embeds each product's average rating and review count.
+    """
+    # Get search and pagination parameters from query string
+    search = request.args.get('search', '').strip()
+    limit = parse_page_limit(request.args.get('limit'))
+    after = request.args.get('after')
+    sort = request.args.get('sort') or ('relevance' if search else 'id')
+    order = request.args.get('order', 'asc').lower()
+
+    if sort not in PRODUCT_SORT_COLUMNS and not (sort == 'relevance' and search):
+        return jsonify({"error": f"Invalid sort key: {sort}"}), 400
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "Order must be 'asc' or 'desc'"}), 400
+
+    after_values = None
+    if limit is not None and after:
+        after_values = decode_cursor(after, 1 if sort in ("id", "relevance") else 2)
+        if after_values is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    try:
+        selections, min_price, max_price = parse_facet_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    facet_filters_active = any(selections.values()) or min_price is not None or max_price is not None
+    want_facets = limit is not None and request.args.get('facets', '').lower() in ("1", "true", "yes")
+    include_ratings = wants_rating_stats()
+
     conn = get_db_connection()
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
 
     try:
         cursor = conn.cursor(dictionary=True)
-        
-        # Get search parameter from query string
-        search = request.args.get('search', '')
-        
+
         # Base query - ADD STATUS FILTER FOR 'active' products only
-        base_query = """
-            SELECT p.id, p.name, p.description, p.price, p.discount, p.stock_quantity, 
-                   p.category_id, p.brand, p.status, c.name AS category_name
+        from_clause = """
             FROM products p
             LEFT JOIN categories c ON p.category_id = c.id
             WHERE p.status = 'active'  -- ONLY SHOW ACTIVE PRODUCTS
         """
-        
+        select_clause = """
+            SELECT p.id, p.name, p.description, p.price, p.discount, p.stock_quantity, 
+                   p.category_id, p.brand, p.status, p.created_at, c.name AS category_name
+        """
+
         query_params = []
-        
-        # Add search conditions if search parameter is provided
+
+        # Resolve the search term to product ids through the in-memory index
+        candidate_ids = None
         if search:
-            base_query += """
-                AND (p.name LIKE %s 
-                OR p.description LIKE %s 
-                OR p.brand LIKE %s 
-                OR c.name LIKE %s)
-            """
-            search_term = f"%{search}%"
-            query_params = [search_term, search_term, search_term, search_term]
+            ensure_search_index(cursor)
+            candidate_ids = product_search_index.search(search)
+
+        # Narrow by facets with the bitmap index; counts are computed from the same masks
+        facet_counts = None
+        if facet_filters_active or want_facets:
+            ensure_facet_index(cursor)
+            base_mask = None if candidate_ids is None else product_facet_index.mask_for_ids(candidate_ids)
+            facet_ids, facet_counts = product_facet_index.query(
+                selections, min_price, max_price, base_mask=base_mask, with_counts=want_facets
+            )
+            if facet_filters_active:
+                if candidate_ids is None:
+                    candidate_ids = facet_ids
+                else:
+                    # Keep relevance order from the search index
+                    allowed = set(facet_ids)
+                    candidate_ids = [product_id for product_id in candidate_ids if product_id in allowed]
+
+        page_extra = {"facets": facet_counts} if want_facets else {}
+
+        if candidate_ids is not None and not candidate_ids:
+            if limit is None:
+                return jsonify([]), 200
+            return jsonify({"products": [], "next_cursor": None, "total": 0, **page_extra}), 200
+
+        if sort == "relevance":
+            ranked_ids = candidate_ids
+            # Page over the ranked id list; the cursor is the offset into it
+            offset = after_values[0] if after_values is not None else 0
+            if not isinstance(offset, int) or offset < 0:
+                return jsonify({"error": "Invalid cursor"}), 400
+            page_ids = ranked_ids if limit is None else ranked_ids[offset:offset + limit]
+
+            products = []
+            if page_ids:
+                placeholders = ",".join(["%s"] * len(page_ids))
+                cursor.execute(select_clause + from_clause + f" AND p.id IN ({placeholders})", page_ids)
+                rank = {product_id: position for position, product_id in enumerate(page_ids)}
+                products = sorted(cursor.fetchall(), key=lambda row: rank[row["id"]])
+
+            load_product_relations(cursor, products, include_ratings)
+
+            if limit is None:
+                return jsonify(products), 200
+
+            next_offset = offset + limit
+            return jsonify({
+                "products": products,
+                "next_cursor": encode_cursor([next_offset]) if next_offset < len(ranked_ids) else None,
+                "total": len(ranked_ids) if after_values is None else None,
+                **page_extra,
+            }), 200
+
+        if candidate_ids is not None:
+            from_clause += f" AND p.id IN ({','.join(['%s'] * len(candidate_ids))})"
+            query_params.extend(candidate_ids)
+
+        base_query = select_clause + from_clause
+
+        if limit is None:
             cursor.execute(base_query, query_params)
+            products = cursor.fetchall()
+            load_product_relations(cursor, products, include_ratings)
+            return jsonify(products), 200
+
+        # Keyset pagination: continue strictly after the (sort value, id) of the last row
+        sort_column = PRODUCT_SORT_COLUMNS[sort]
+        comparison = ">" if order == "asc" else "<"
+        page_query = base_query
+        page_params = list(query_params)
+
+        if after_values is not None:
+            if sort == "id":
+                page_query += f" AND p.id {comparison} %s"
+                page_params.append(after_values[0])
+            else:
+                page_query += f" AND ({sort_column} {comparison} %s OR ({sort_column} = %s AND p.id {comparison} %s))"
+                page_params.extend([after_values[0], after_values[0], after_values[1]])
+
+        if sort == "id":
+            page_query += f" ORDER BY p.id {order.upper()}"
         else:
-            cursor.execute(base_query)
-            
+            page_query += f" ORDER BY {sort_column} {order.upper()}, p.id {order.upper()}"
+
+        # Fetch one extra row to know whether another page exists
+        page_query += " LIMIT %s"
+        page_params.append(limit + 1)
+
+        cursor.execute(page_query, page_params)
         products = cursor.fetchall()
 
-        for product in products:
-            product_id = product["id"]
+        next_cursor = None
+        if len(products) > limit:
+            products = products[:limit]
+            last = products[-1]
+            next_cursor = encode_cursor([last["id"]] if sort == "id" else [last[sort], last["id"]])
 
-            # Fetch colors
-            cursor.execute("""
-                SELECT cl.color_id, cl.name 
-                FROM product_colors pc
-                JOIN colors cl ON pc.color_id = cl.color_id
-                WHERE pc.product_id = %s
-            """, (product_id,))
-            product["colors"] = cursor.fetchall()
-
-            # Fetch sizes
-            cursor.execute("""
-                SELECT s.size_id, s.size_name 
-                FROM product_sizes ps
-                JOIN sizes s ON ps.size_id = s.size_id
-                WHERE ps.product_id = %s
-            """, (product_id,))
-            product["sizes"] = cursor.fetchall()
-
-            # Fetch images
-            cursor.execute("""
-                SELECT image_filename 
-                FROM product_images 
-                WHERE product_id = %s
-            """, (product_id,))
-            product["images"] = [row["image_filename"] for row in cursor.fetchall()]
+        load_product_relations(cursor, products, include_ratings)
 
-        return jsonify(products), 200
+        total = None
+        if after_values is None:
+            cursor.execute("SELECT COUNT(*) AS total " + from_clause, query_params)
+            total = cursor.fetchone()["total"]
+
+        return jsonify({
+            "products": products,
+            "next_cursor": next_cursor,
+            "total": total,
+            **page_extra,
+        }), 200
 
     except Exception as e:
         print("❌ Error fetching products:", e)
@@ -407,7 +1001,47 @@ def get_products():
         cursor.close()
         conn.close()
 
+@app.route("/api/products/suggest", methods=["GET"])
+def suggest_products():
+    """Autocomplete for the search box: top products, brands and categories for a prefix"""
+    query = request.args.get("q", "")
+    try:
+        limit = max(1, min(int(request.args.get("limit", 8)), 20))
+    except ValueError:
+        limit = 8
+
+    sync_catalog()
+    if not product_suggester.built:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"error": "Database connection failed"}), 500
+        try:
+            build_suggestions(conn)
+        except Exception as e:
+            print(f"❌ Error building suggestions: {e}")
+            return jsonify({"error": "Server error"}), 500
+        finally:
+            conn.close()
+
+    suggestions = []
+    for suggestion in product_suggester.suggest(query, limit):
+        if suggestion.get("image"):
+            # Read per response: variants finishing later change it without an index rebuild
+            suggestion = dict(suggestion, image_version=image_pipeline.fingerprint(
+                app.config["UPLOAD_FOLDER"], suggestion["image"]
+            ))
+        suggestions.append(suggestion)
+    return jsonify({"suggestions": suggestions}), 200
+
+
+@app.route("/api/admin/cache-stats", methods=["GET"])
+def get_cache_stats():
+    """Hit, miss and eviction counters for the catalog cache"""
+    return jsonify(catalog_cache.stats()), 200
+
+
 @app.route("/api/products/<int:product_id>", methods=["GET"])
+@cached_catalog_read
 def get_product_by_id(product_id):
     """Get a single product by ID with all details except stock"""
     conn = get_db_connection()
@@ -433,31 +1067,7 @@ def get_product_by_id(product_id):
         if not product:
             return jsonify({"error": "Product not found"}), 404
 
-        # Fetch colors
-        cursor.execute("""
-            SELECT cl.color_id, cl.name 
-            FROM product_colors pc
-            JOIN colors cl ON pc.color_id = cl.color_id
-            WHERE pc.product_id = %s
-        """, (product_id,))
-        product["colors"] = cursor.fetchall()
-
-        # Fetch sizes
-        cursor.execute("""
-            SELECT s.size_id, s.size_name 
-            FROM product_sizes ps
-            JOIN sizes s ON ps.size_id = s.size_id
-            WHERE ps.product_id = %s
-        """, (product_id,))
-        product["sizes"] = cursor.fetchall()
-
-        # Fetch images
-        cursor.execute("""
-            SELECT image_filename 
-            FROM product_images 
-            WHERE product_id = %s
-        """, (product_id,))
-        product["images"] = [row["image_filename"] for row in cursor.fetchall()]
+        load_product_relations(cursor, [product], wants_rating_stats())
         
         # If you want to include stock for admins only, you can add this:
         # For now, we're excluding it completely as requested
@@ -476,64 +1086,11 @@ def get_product_by_id(product_id):
 
 @app.route("/api/products", methods=["POST"])
 def add_product():
-    # ✅ ADDED LOGGING: Debug what files are being received
-    print("🔍 DEBUG: Request received")
-    print(f"🔍 DEBUG: Request method: {request.method}")
-    print(f"🔍 DEBUG: Request content type: {request.content_type}")
-    print(f"🔍 DEBUG: Request form data keys: {list(request.form.keys())}")
-    
-    # Get the list of image files
+    # Image parts are spooled to hashing temp files while the form is parsed; they get
+    # their final names only inside the transaction that references them
+    form_data = request.form
     images = request.files.getlist("images")
-    
-    # ✅ ADDED LOGGING: Debug images received
-    print(f"🔍 DEBUG: Number of image files received: {len(images)}")
-    for i, img in enumerate(images):
-        if img and img.filename:
-            print(f"🔍 DEBUG: Image {i}: filename='{img.filename}', content_type='{img.content_type}', size={img.content_length if img.content_length else 'unknown'}")
-        else:
-            print(f"🔍 DEBUG: Image {i}: EMPTY or no filename")
-    
-    if not images or all(img.filename == '' for img in images):
-        print("❌ ERROR: No images uploaded or all filenames empty")
-        return jsonify({"error": "No images uploaded"}), 400
 
-    saved_filenames = []
-
-    # Process and save each image
-    for image in images:
-        if image and allowed_file(image.filename):
-            filename = secure_filename(image.filename)
-            unique_filename = f"{uuid.uuid4().hex}_{filename}"
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            
-            # ✅ ADDED LOGGING: Debug file saving
-            print(f"🔍 DEBUG: Saving image - Original: '{image.filename}', Secure: '{filename}', Unique: '{unique_filename}'")
-            print(f"🔍 DEBUG: Save path: {image_path}")
-
-            try:
-                image.save(image_path)
-                saved_filenames.append(unique_filename)
-                print(f"✅ SUCCESS: Image saved as '{unique_filename}'")
-                
-                # ✅ ADDED LOGGING: Verify file was saved
-                if os.path.exists(image_path):
-                    file_size = os.path.getsize(image_path)
-                    print(f"✅ SUCCESS: File exists, size: {file_size} bytes")
-                else:
-                    print("❌ ERROR: File was not created!")
-                    
-            except Exception as e:
-                print(f"❌ ERROR: Failed to save image '{image.filename}': {str(e)}")
-                return jsonify({"error": f"Failed to save image: {str(e)}"}), 500
-        else:
-            print(f"❌ ERROR: Invalid file type for '{image.filename}'")
-            return jsonify({"error": f"Invalid file type for {image.filename}"}), 400
-
-    # ✅ ADDED LOGGING: Show saved filenames
-    print(f"✅ SUCCESS: All images saved: {saved_filenames}")
-
-    # Extract form data
-    form_data = request.form
     name = form_data.get("name")
     description = form_data.get("description")
     price = form_data.get("price")
@@ -543,64 +1100,92 @@ def add_product():
     colors = form_data.getlist("colors")
     sizes = form_data.getlist("sizes")
     discount = form_data.get("discount")
-    
-    # ✅ ADDED LOGGING: Debug form data
-    print(f"🔍 DEBUG: Form data received:")
-    print(f"  - name: {name}")
-    print(f"  - description: {description[:50]}..." if description else "  - description: None")
-    print(f"  - price: {price}")
-    print(f"  - category_id: {category_id}")
-    print(f"  - brand: {brand}")
-    print(f"  - stock_quantity: {stock_quantity}")
-    print(f"  - colors: {colors}")
-    print(f"  - sizes: {sizes}")
-    print(f"  - discount: {discount}")
 
     # Validate required fields (material removed)
     if not all([name, description, price, category_id, brand]):
         print("❌ ERROR: Missing required fields")
-        # Cleanup saved images
-        for filename in saved_filenames:
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            if os.path.exists(image_path):
-                os.remove(image_path)
-                print(f"⚠️  CLEANUP: Removed orphaned file '{filename}'")
         return jsonify({"error": "Missing required fields"}), 400
 
+    images = [img for img in images if img and img.filename]
+    # Finished chunked uploads (see /api/admin/uploads) can stand in for image parts
+    upload_ids = [u for u in form_data.getlist("upload_ids") if u]
+    if not images and not upload_ids:
+        print("❌ ERROR: No images uploaded or all filenames empty")
+        return jsonify({"error": "No images uploaded"}), 400
+
+    for image in images:
+        if not allowed_file(image.filename):
+            print(f"❌ ERROR: Invalid file type for '{image.filename}'")
+            return jsonify({"error": f"Invalid file type for {image.filename}"}), 400
+
+    staged_uploads = []
+    seen = set()
+
+    def discard_staged():
+        for staged in staged_uploads:
+            staged.discard()
+
+    try:
+        for image in images:
+            staged_uploads.append(
+                upload_store.stage(image, app.config['UPLOAD_FOLDER'], secure_filename(image.filename))
+            )
+        for upload_id in upload_ids:
+            staged_uploads.append(chunked_upload.stage(app.config['UPLOAD_FOLDER'], upload_id))
+        # Strips metadata and fsyncs each file on the upload pool; names are final after
+        upload_store.persist(staged_uploads, app.config['UPLOAD_FOLDER'], image_pipeline.strip_metadata)
+        unique_uploads = []
+        for staged in staged_uploads:
+            if staged.filename in seen:
+                # Same bytes uploaded twice in one request; keep the first
+                staged.discard()
+                continue
+            seen.add(staged.filename)
+            unique_uploads.append(staged)
+        staged_uploads[:] = unique_uploads
+    except chunked_upload.ChunkedUploadError as e:
+        discard_staged()
+        return chunked_upload_error(e)
+    except Exception as e:
+        print(f"❌ ERROR: Failed to save images: {str(e)}")
+        discard_staged()
+        return jsonify({"error": f"Failed to save image: {str(e)}"}), 500
+
+    saved_filenames = [staged.filename for staged in staged_uploads]
+    print(f"🔍 Adding product '{name}' with {len(saved_filenames)} images: {saved_filenames}")
+
     conn = get_db_connection()
     if conn is None:
         print("❌ ERROR: Database connection failed")
+        discard_staged()
         return jsonify({"error": "DB connection failed"}), 500
 
+    new_filenames = []
+    committing = False
     try:
         cursor = conn.cursor()
         discount = float(discount) if discount else None
-        
-        print(f"🔍 DEBUG: Inserting product into database...")
 
         # Insert product (material removed)
         cursor.execute("""
             INSERT INTO products (
                 name, description, price, category_id, brand, 
-                stock_quantity, discount, created_at
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+                stock_quantity, discount, primary_image, created_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW())
         """, (name, description, price, category_id, brand,
-              stock_quantity, discount))
+              stock_quantity, discount, saved_filenames[0] if saved_filenames else None))
         
         product_id = cursor.lastrowid
         print(f"✅ SUCCESS: Product inserted with ID: {product_id}")
 
-        # Insert product_images
-        print(f"🔍 DEBUG: Inserting {len(saved_filenames)} images into product_images table")
-        for filename in saved_filenames:
-            cursor.execute("""
-                INSERT INTO product_images (product_id, image_filename)
-                VALUES (%s, %s)
-            """, (product_id, filename))
-            print(f"✅ SUCCESS: Image '{filename}' linked to product {product_id}")
+        # Insert product_images and count the references in the same transaction
+        cursor.executemany("""
+            INSERT INTO product_images (product_id, image_filename)
+            VALUES (%s, %s)
+        """, [(product_id, filename) for filename in saved_filenames])
+        upload_store.add_references(cursor, saved_filenames)
 
         # Insert product_colors
-        print(f"🔍 DEBUG: Inserting {len(colors)} colors")
         for color_id in colors:
             cursor.execute("""
                 INSERT INTO product_colors (product_id, color_id) 
@@ -608,15 +1193,22 @@ def add_product():
             """, (product_id, int(color_id)))
 
         # Insert product_sizes
-        print(f"🔍 DEBUG: Inserting {len(sizes)} sizes")
         for size in sizes:
             cursor.execute("""
                 INSERT INTO product_sizes (product_id, size_id) 
                 VALUES (%s, %s)
             """, (product_id, size))
 
+        # Placed while this transaction holds the upload_files row locks, so the rows
+        # never commit without their files
+        new_filenames = upload_store.place(app.config['UPLOAD_FOLDER'], staged_uploads)
+        committing = True
         conn.commit()
         print(f"✅ SUCCESS: Transaction committed successfully!")
+
+        chunked_upload.cleanup(app.config['UPLOAD_FOLDER'], upload_ids)
+        catalog_changed(conn, [product_id])
+        image_pipeline.submit(app.config['UPLOAD_FOLDER'], new_filenames, on_ready=image_variants_ready)
         
         return jsonify({
             "message": "Product added successfully",
@@ -625,26 +1217,22 @@ def add_product():
         }), 201
 
     except Exception as e:
+        if not committing:
+            upload_store.unplace(app.config['UPLOAD_FOLDER'], new_filenames)
         conn.rollback()
         print("❌ ERROR adding product:", e)
         print(f"❌ ERROR details: {type(e).__name__}")
         import traceback
         traceback.print_exc()  # Print full traceback
         
-        # Cleanup saved images on failure
-        print(f"⚠️  CLEANUP: Removing {len(saved_filenames)} saved images due to error")
-        for filename in saved_filenames:
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            if os.path.exists(image_path):
-                os.remove(image_path)
-                print(f"⚠️  CLEANUP: Removed file '{filename}'")
+        print(f"⚠️  CLEANUP: Discarding {len(staged_uploads)} staged images due to error")
+        discard_staged()
                 
         return jsonify({"error": "Server error: " + str(e)}), 500
 
     finally:
         cursor.close()
         conn.close()
-        print("🔍 DEBUG: Database connection closed")
 
 
 @app.route("/api/products/<int:product_id>", methods=["PUT"])
@@ -686,20 +1274,14 @@ def update_product(product_id):
     discount = float(discount) if discount else None
 
     image_filename = old_image
+    staged = None
 
     # ✅ Handle new image upload
     if image and allowed_file(image.filename):
         filename = secure_filename(image.filename)
-        unique_filename = f"{uuid.uuid4().hex}_{filename}"
-        image_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
         try:
-            image.save(image_path)
-            image_filename = unique_filename
-
-            # Delete old image file
-            old_image_path = os.path.join(app.config['UPLOAD_FOLDER'], old_image)
-            if old_image and os.path.exists(old_image_path):
-                os.remove(old_image_path)
+            staged = upload_store.stage(image, app.config['UPLOAD_FOLDER'], filename)
+            image_filename = staged.filename
         except Exception as e:
             cursor.close()
             conn.close()
@@ -708,17 +1290,52 @@ def update_product(product_id):
         cursor.close()
         conn.close()
         return jsonify({"error": "Invalid image file type"}), 400
+    elif form_data.get("upload_id"):
+        # A finished chunked upload replaces the image
+        try:
+            staged = chunked_upload.stage(app.config['UPLOAD_FOLDER'], form_data.get("upload_id"))
+            image_filename = staged.filename
+        except chunked_upload.ChunkedUploadError as e:
+            cursor.close()
+            conn.close()
+            return chunked_upload_error(e)
+
+    if staged is not None:
+        # Stripping metadata can change the content name
+        try:
+            upload_store.persist([staged], app.config['UPLOAD_FOLDER'], image_pipeline.strip_metadata)
+        except Exception as e:
+            staged.discard()
+            cursor.close()
+            conn.close()
+            return jsonify({"error": f"Image upload failed: {str(e)}"}), 500
+        image_filename = staged.filename
+
+    image_changed = image_filename != old_image
+    new_filenames = []
+    committing = False
 
     try:
-        # ✅ Update product (removed 'material')
+        if image_changed:
+            upload_store.add_references(cursor, [image_filename])
+        elif staged is not None:
+            # Re-uploaded the current image; nothing to store
+            staged.discard()
+
+        # ✅ Update product (removed 'material'); the gallery's first image stays primary
         cursor.execute("""
             UPDATE products SET
                 name=%s, description=%s, price=%s, category_id=%s, brand=%s,
-                stock_quantity=%s, discount=%s, image_url=%s
+                stock_quantity=%s, discount=%s, image_url=%s,
+                primary_image=COALESCE(
+                    (SELECT image_filename FROM product_images WHERE product_id = %s ORDER BY id LIMIT 1),
+                    %s
+                )
             WHERE id=%s
         """, (
             name, description, price, category_id, brand,
-            stock_quantity, discount, image_filename, product_id
+            stock_quantity, discount, image_filename,
+            product_id, image_filename, product_id
         ))
 
         # ✅ Clear and re-insert product colors
@@ -737,11 +1354,31 @@ def update_product(product_id):
                 VALUES (%s, %s)
             """, (product_id, int(size_id)))
 
+        # Placed before the commit, like add_product
+        new_filenames = upload_store.place(app.config['UPLOAD_FOLDER'], [staged]) if image_changed else []
+        committing = True
         conn.commit()
+        if form_data.get("upload_id"):
+            chunked_upload.cleanup(app.config['UPLOAD_FOLDER'], [form_data.get("upload_id")])
+        catalog_changed(conn, [product_id])
+        image_pipeline.submit(app.config['UPLOAD_FOLDER'], new_filenames, on_ready=image_variants_ready)
+        if image_changed and old_image:
+            # The old file goes only if no other product still references it
+            try:
+                upload_store.release(
+                    conn, app.config['UPLOAD_FOLDER'], [old_image],
+                    on_delete=lambda f: image_pipeline.delete_variants(app.config['UPLOAD_FOLDER'], f),
+                )
+            except Exception as e:
+                print(f"⚠️  Could not release old image '{old_image}': {e}")
         return jsonify({"message": "Product updated successfully"}), 200
 
     except Exception as e:
+        if not committing:
+            upload_store.unplace(app.config['UPLOAD_FOLDER'], new_filenames)
         conn.rollback()
+        if staged is not None:
+            staged.discard()
         print("❌ Error updating product:", e)
         return jsonify({"error": "Server error"}), 500
 
@@ -776,6 +1413,7 @@ def soft_delete_product(product_id):
         """, (product_id,))
         
         conn.commit()
+        catalog_changed(conn, [product_id])
         return jsonify({
             "success": True, 
             "message": "Product marked as deleted"
@@ -792,9 +1430,249 @@ def soft_delete_product(product_id):
         if conn and conn.is_connected():
             conn.close()
 
+# ---------------------- Bulk Catalog Import / Export ----------------------
+
+# Bulk imports may exceed the 5MB limit for regular requests
+app.config["CATALOG_IMPORT_MAX_BYTES"] = 200 * 1024 * 1024
+
+
+@app.route("/api/admin/products/import", methods=["POST"])
+def import_products():
+    """Bulk-import products from CSV or NDJSON (multipart field 'file' or the raw request body)"""
+    request.max_content_length = app.config["CATALOG_IMPORT_MAX_BYTES"]
+
+    try:
+        batch_size = max(1, int(request.args.get("batch_size", DEFAULT_BATCH_SIZE)))
+    except ValueError:
+        return jsonify({"error": "batch_size must be an integer"}), 400
+
+    upload = request.files.get("file")
+    if upload:
+        stream = upload.stream
+        fmt = detect_format(upload.filename, upload.mimetype, request.args.get("format"))
+    else:
+        stream = request.stream
+        fmt = detect_format(content_type=request.content_type, explicit=request.args.get("format"))
+
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "Format must be 'csv' or 'ndjson'"}), 400
+
+    conn = get_db_connection()
+    if conn is None:
+        return jsonify({"error": "DB connection failed"}), 500
+
+    try:
+        summary = import_catalog(conn, read_rows(stream, fmt), app.config["UPLOAD_FOLDER"], batch_size)
+        if summary["imported"]:
+            # Rebuilding the search index once is cheaper than re-indexing every new row
+            product_search_index.built = False
+            catalog_changed(conn)
+        print(f"Catalog import: {summary['imported']} imported, {summary['failed']} failed")
+        return jsonify(summary), 500 if summary.get("aborted") else 200
+
+    except Exception as e:
+        print("❌ Error importing catalog:", e)
+        return jsonify({"error": "Server error: " + str(e)}), 500
+
+    finally:
+        conn.close()
+
+
+@app.route("/api/admin/products/export", methods=["GET"])
+def export_products():
+    """Stream all active products as CSV or NDJSON, one keyset page in memory at a time"""
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "Format must be 'csv' or 'ndjson'"}), 400
+
+    conn = get_db_connection()
+    if conn is None:
+        return jsonify({"error": "DB connection failed"}), 500
+
+    def generate():
+        try:
+            yield from iter_export(conn, fmt)
+        finally:
+            conn.close()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/csv" if fmt == "csv" else "application/x-ndjson",
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="products.{fmt}"'
+    return response
+
+
+# ---------------------- Product Media ----------------------
+# How image bytes leave the server (IMAGE_DELIVERY):
+#   "x-accel"    - nginx (the default): return X-Accel-Redirect to an internal location,
+#                  which the nginx config must define, e.g.
+#                      location /_uploads/ { internal; alias /path/to/static/uploads/; }
+#   "x-sendfile" - Apache mod_xsendfile / lighttpd: return X-Sendfile with the file path
+#   "flask"      - stream from Python; what `python app.py` uses unless IMAGE_DELIVERY is
+#                  set, since the development server has no proxy in front of it
+app.config["IMAGE_DELIVERY"] = os.environ.get("IMAGE_DELIVERY", "x-accel")
+app.config["IMAGE_ACCEL_PREFIX"] = os.environ.get("IMAGE_ACCEL_PREFIX", "/_uploads/")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def send_upload(path, mimetype=None):
+    """Response for a file under UPLOAD_FOLDER, handed to the front proxy when configured"""
+    mimetype = mimetype or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    delivery = app.config["IMAGE_DELIVERY"]
+
+    if delivery == "x-accel":
+        relative = os.path.relpath(path, app.config["UPLOAD_FOLDER"]).replace(os.sep, "/")
+        response = Response(status=200, mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = app.config["IMAGE_ACCEL_PREFIX"].rstrip("/") + "/" + quote(relative)
+        return response
+
+    if delivery == "x-sendfile":
+        response = Response(status=200, mimetype=mimetype)
+        response.headers["X-Sendfile"] = os.path.abspath(path)
+        return response
+
+    return send_file(path, mimetype=mimetype, conditional=True)
+
+
+@app.route("/api/media/<variant>/<path:filename>", methods=["GET"])
+def serve_image_variant(variant, filename):
+    """Serve a resized product image, WebP/AVIF when the client accepts it"""
+    if variant not in image_pipeline.VARIANTS:
+        return jsonify({"error": f"Unknown variant '{variant}'"}), 404
+    if secure_filename(filename) != filename:
+        return jsonify({"error": "Invalid filename"}), 400
+
+    # Only types the client names outright; "image/*" or "*/*" is no promise of AVIF support
+    accepted_types = {value.lower() for value, quality in request.accept_mimetypes if quality > 0}
+    path, mimetype = image_pipeline.best_variant_path(
+        app.config["UPLOAD_FOLDER"], filename, variant, accepted_types
+    )
+    if not os.path.isfile(path):
+        return jsonify({"error": "Image not found"}), 404
+
+    response = send_upload(path, mimetype)
+    version = request.args.get("v")
+    if version and version != "0" and version == image_pipeline.fingerprint(app.config["UPLOAD_FOLDER"], filename):
+        # Fingerprinted URL of finished variants: the bytes behind it never change
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    else:
+        # Pending variants or a stale/unversioned URL; let clients revalidate
+        response.headers["Cache-Control"] = "no-cache"
+    # The same URL returns a different encoding depending on Accept
+    response.headers["Vary"] = "Accept"
+    return response
+
+
+@app.route("/api/admin/uploads/gc", methods=["POST"])
+def collect_orphaned_uploads():
+    """Report (or with dry_run=0, delete) uploads nothing references"""
+    dry_run = request.args.get("dry_run", "1").lower() not in ("0", "false", "no")
+    try:
+        grace_hours = float(request.args.get("grace_hours", upload_gc.DEFAULT_GRACE_SECONDS / 3600))
+    except ValueError:
+        return jsonify({"error": "grace_hours must be a number"}), 400
+
+    conn = get_db_connection()
+    if conn is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        summary = upload_gc.collect(
+            conn, app.config["UPLOAD_FOLDER"],
+            grace_seconds=max(0, grace_hours * 3600),
+            dry_run=dry_run,
+        )
+        return jsonify(summary), 200
+    except Exception as e:
+        print("❌ Upload GC failed:", e)
+        return jsonify({"error": "Upload GC failed"}), 500
+    finally:
+        conn.close()
+
+
+# ---------------------- Chunked Uploads ----------------------
+# Large media is sent in chunks (init, PUT each chunk at its offset, complete); the
+# returned upload_id is then passed to add_product (upload_ids) or update_product (upload_id)
+app.config["CHUNKED_UPLOAD_MAX_BYTES"] = 50 * 1024 * 1024
+
+
+def chunked_upload_error(error):
+    return jsonify({"error": str(error)}), error.status
+
+
+@app.route("/api/admin/uploads", methods=["POST"])
+def create_chunked_upload():
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get("filename") or "")
+    if not filename or not allowed_file(filename):
+        return jsonify({"error": "A filename with an allowed image extension is required"}), 400
+
+    try:
+        session = chunked_upload.create(
+            app.config["UPLOAD_FOLDER"], filename, data.get("size"),
+            max_size=app.config["CHUNKED_UPLOAD_MAX_BYTES"],
+            chunk_size=data.get("chunk_size", chunked_upload.DEFAULT_CHUNK_SIZE),
+            sha256=data.get("sha256"),
+        )
+    except chunked_upload.ChunkedUploadError as e:
+        return chunked_upload_error(e)
+    return jsonify(session), 201
+
+
+@app.route("/api/admin/uploads/<upload_id>", methods=["GET"])
+def get_chunked_upload(upload_id):
+    """Which chunks have arrived, so an interrupted client knows what to resend"""
+    try:
+        return jsonify(chunked_upload.status(app.config["UPLOAD_FOLDER"], upload_id)), 200
+    except chunked_upload.ChunkedUploadError as e:
+        return chunked_upload_error(e)
+
+
+@app.route("/api/admin/uploads/<upload_id>", methods=["PUT"])
+def put_upload_chunk(upload_id):
+    """Raw chunk bytes as the body, ?offset=<byte offset>"""
+    try:
+        offset = int(request.args.get("offset", ""))
+    except ValueError:
+        return jsonify({"error": "offset query parameter is required"}), 400
+    if request.content_length is None:
+        return jsonify({"error": "Content-Length is required"}), 411
+
+    try:
+        progress = chunked_upload.write_chunk(
+            app.config["UPLOAD_FOLDER"], upload_id, offset, request.stream, request.content_length
+        )
+    except chunked_upload.ChunkedUploadError as e:
+        return chunked_upload_error(e)
+    return jsonify(progress), 200
+
+
+@app.route("/api/admin/uploads/<upload_id>/complete", methods=["POST"])
+def complete_chunked_upload(upload_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        session = chunked_upload.finalize(app.config["UPLOAD_FOLDER"], upload_id, data.get("sha256"))
+    except chunked_upload.ChunkedUploadError as e:
+        return chunked_upload_error(e)
+    return jsonify(session), 200
+
+
+@app.route("/api/admin/uploads/<upload_id>", methods=["DELETE"])
+def abort_chunked_upload(upload_id):
+    try:
+        chunked_upload.status(app.config["UPLOAD_FOLDER"], upload_id)
+    except chunked_upload.ChunkedUploadError as e:
+        return chunked_upload_error(e)
+    chunked_upload.cleanup(app.config["UPLOAD_FOLDER"], [upload_id])
+    return jsonify({"message": "Upload aborted"}), 200
+
+
 # ---------------------- Colors Endpoints ----------------------
 
 @app.route("/api/colors", methods=["GET"])
+@cached_catalog_read
 def get_colors():
     conn = get_db_connection()
     if conn is None:
@@ -834,6 +1712,7 @@ def add_color():
         # Insert into the 'colors' table
         cursor.execute("INSERT INTO colors (name) VALUES (%s)", (color,))
         conn.commit()
+        catalog_data_changed(conn)
 
         return jsonify({"message": "Color added", "id": cursor.lastrowid}), 201
 
@@ -847,6 +1726,7 @@ def add_color():
 
 
 @app.route("/api/categories", methods=["GET"])
+@cached_catalog_read
 def get_categories():
     conn = get_db_connection()
     if conn is None:
@@ -863,6 +1743,7 @@ def get_categories():
         conn.close()
 
 @app.route("/api/categories/with-products", methods=["GET"])
+@cached_catalog_read
 def get_categories_with_products():
     conn = get_db_connection()
     if conn is None:
@@ -910,6 +1791,7 @@ def add_category():
         # Insert new category
         cursor.execute("INSERT INTO categories (name, created_at) VALUES (%s, NOW())", (name,))
         conn.commit()
+        catalog_changed(conn)
 
         return jsonify({"message": "Category added", "id": cursor.lastrowid}), 201
 
@@ -949,6 +1831,7 @@ def update_category(category_id):
 
         cursor.execute("UPDATE categories SET name = %s WHERE id = %s", (name, category_id))
         conn.commit()
+        catalog_changed(conn, category_id=category_id)
         return jsonify({"message": "Category updated"}), 200
     except Exception as e:
         print("❌", e)
@@ -985,6 +1868,7 @@ def update_color(color_id):
 
         cursor.execute("UPDATE colors SET name = %s WHERE color_id = %s", (name, color_id))
         conn.commit()
+        catalog_data_changed(conn)
         return jsonify({"message": "Color updated"}), 200
     except Exception as e:
         print("❌", e)
@@ -1097,8 +1981,59 @@ def get_addresses(user_id):
             "error": str(e)
         }), 500
 
+# ---------------------- Idempotency ----------------------
+idempotency_store = IdempotencyStore(get_db_connection)
+
+
+def idempotent(scope):
+    """Run the view once per Idempotency-Key header; repeats replay the stored response.
+
+    Requests without the header behave as before. 5xx responses and exceptions are not
+    stored, so the client can retry them with the same key.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get("Idempotency-Key", "").strip()
+            if not key:
+                return view(*args, **kwargs)
+            if len(key) > idempotency.MAX_KEY_LENGTH:
+                return jsonify({"error": "Idempotency-Key is too long"}), 400
+
+            fingerprint = idempotency.request_fingerprint(request.get_data(cache=True))
+            try:
+                outcome, stored = idempotency_store.begin(scope, key, fingerprint)
+            except Exception as e:
+                print(f"❌ Idempotency check failed: {e}")
+                return jsonify({"error": "Could not process Idempotency-Key"}), 503
+
+            if outcome == idempotency.REPLAY:
+                status, body = stored
+                response = Response(body, status=status, mimetype="application/json")
+                response.headers["Idempotent-Replayed"] = "true"
+                return response
+            if outcome == idempotency.MISMATCH:
+                return jsonify({"error": "Idempotency-Key was already used with a different request"}), 422
+            if outcome == idempotency.IN_PROGRESS:
+                return jsonify({"error": "A request with this Idempotency-Key is still in progress"}), 409
+
+            try:
+                response = app.make_response(view(*args, **kwargs))
+            except Exception:
+                idempotency_store.abandon(scope, key)
+                raise
+            if response.status_code >= 500:
+                idempotency_store.abandon(scope, key)
+            else:
+                idempotency_store.complete(scope, key, response.status_code, response.get_data(as_text=True))
+            return response
+        return wrapper
+    return decorator
+
+
 # --- STK Push Endpoint ---
 @app.route('/test-stkpush', methods=['POST'])
+@idempotent("stkpush")
 def test_stkpush():
     data = request.get_json()  # Accept JSON
     phone = data.get("phone")
@@ -1149,10 +2084,36 @@ print(f"Ngrok URL: {public_url}")
 print(f"Callback URL: {app.config['CALLBACK_URL']}")  
 
 
-def generate_order_number():
-    return str(random.randint(100000, 999999))  # 6-digit random number
+order_number_allocator = OrderNumberAllocator(get_db_connection)
+
+@app.route("/api/cart/quote", methods=["POST"])
+def quote_cart():
+    """Price a cart ({"cart_items": [{id, quantity}, ...]}) with current prices, discounts and stock"""
+    data = request.get_json(silent=True) or {}
+    cart_items = data.get("cart_items", [])
+    if not isinstance(cart_items, list):
+        return jsonify({"error": "cart_items must be a list"}), 400
+
+    conn = get_db_connection()
+    if conn is None:
+        return jsonify({"error": "DB connection failed"}), 500
+
+    cursor = conn.cursor()
+    try:
+        quote = pricing.quote_cart(cursor, cart_items)
+        return jsonify(pricing.quote_to_json(quote)), 200
+    except order_stock.CartError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"❌ Error quoting cart: {e}")
+        return jsonify({"error": "Server error"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
 
 @app.route("/api/orders", methods=["POST"])
+@idempotent("orders")
 def create_order():
     data = request.json
     print(f"📦 Received order data: {data}")  # Debug log
@@ -1165,37 +2126,71 @@ def create_order():
 
     print(f"🔍 Parsed fields - user_id: {user_id}, address_id: {address_id}, payment_method: {payment_method}, total_amount: {total_amount}, cart_items: {len(cart_items)}")
 
-    if not user_id or not address_id or not payment_method or not total_amount:
-        error_msg = f"Missing required fields: user_id={user_id}, address_id={address_id}, payment_method={payment_method}, total_amount={total_amount}"
+    # total_amount is accepted for older clients but the order is priced server-side
+    if not user_id or not address_id or not payment_method:
+        error_msg = f"Missing required fields: user_id={user_id}, address_id={address_id}, payment_method={payment_method}"
         print(f"❌ {error_msg}")
         return jsonify({"error": "Missing required fields", "details": error_msg}), 400
 
+    try:
+        quantities = order_stock.aggregate_quantities(cart_items)
+    except order_stock.CartError as e:
+        return jsonify({"error": str(e)}), 400
+    if not quantities:
+        return jsonify({"error": "Cart is empty"}), 400
+
+    # Unique by construction; taken before the order connection because a fresh block
+    # briefly needs a connection of its own
+    try:
+        order_number = order_number_allocator.next()
+    except Exception as e:
+        print(f"❌ Could not allocate an order number: {e}")
+        return jsonify({"error": "Failed to generate order number"}), 500
+    print(f"✅ Using order_number: {order_number}")
+
     conn = get_db_connection()
     if conn is None:
         return jsonify({"error": "DB connection failed"}), 500
 
     try:
         cursor = conn.cursor()
-        
-        # ✅ Generate a unique order_number with retry
-        max_attempts = 5
-        for attempt in range(max_attempts):
-            order_number = generate_order_number()
-            cursor.execute("SELECT id FROM orders WHERE order_number = %s", (order_number,))
-            if not cursor.fetchone():
-                break
-        else:
-            return jsonify({"error": "Failed to generate unique order number"}), 500
 
-        print(f"✅ Using order_number: {order_number}")
+        # ✅ Price the cart from the database, never from client-sent prices
+        quote = pricing.quote_cart(cursor, cart_items)
+        missing = [u for u in quote["unavailable"] if u["reason"] == "not_found"]
+        if missing:
+            conn.rollback()
+            return jsonify({"error": "Some items are no longer available", "unavailable": missing}), 409
+        if total_amount is not None and str(total_amount) != "":
+            try:
+                if abs(Decimal(str(total_amount)) - quote["total"]) >= pricing.CENTS:
+                    print(f"⚠️  Client total {total_amount} differs from server total {quote['total']}")
+            except ArithmeticError:
+                pass
+
+        # ✅ Reserve stock for every line at once; nothing else is written if any falls short
+        try:
+            shortages = order_stock.reserve_stock(conn, cursor, quantities)
+        except order_stock.StockBusy as e:
+            # Retryable, so 503 rather than a 4xx the idempotency layer would replay
+            print(f"⚠️  {e}")
+            response = jsonify({"error": "Checkout is busy, please try again"})
+            response.headers["Retry-After"] = "1"
+            return response, 503
+        if shortages:
+            print(f"❌ Out of stock: {shortages}")
+            return jsonify({"error": "Some items are out of stock", "out_of_stock": shortages}), 409
 
         # Insert into orders table - ADD 'new' for notification column
+        created_at = datetime.now()
+        items_summary = order_items_summary(quote["lines"])
         cursor.execute(
             """
-            INSERT INTO orders (user_id, address_id, payment_method, total_amount, status, created_at, order_number, notification)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            INSERT INTO orders (user_id, address_id, payment_method, total_amount, status, created_at, order_number, notification, items_summary)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
             """,
-            (user_id, address_id, payment_method, total_amount, "Pending", datetime.now(), order_number, "new")  # ADDED 'new' HERE
+            (user_id, address_id, payment_method, quote["total"], "Pending", created_at, order_number, "new",  # ADDED 'new' HERE
+             items_summary)
         )
         order_id = cursor.lastrowid
         print(f"✅ Order created with ID: {order_id}")
@@ -1209,30 +2204,35 @@ def create_order():
             (order_id, "Ordered", datetime.now(), "Order placed successfully")
         )
 
-        # Insert each cart item into order_items and update stock
-        for item in cart_items:
-            print(f"📝 Adding item: {item}")
-            cursor.execute(
-                """
-                INSERT INTO order_items (order_id, product_id, quantity, price)
-                VALUES (%s, %s, %s, %s)
-                """,
-                (order_id, item["id"], item["quantity"], item["price"])
-            )
-
-            # ✅ Deduct stock from products table
-            cursor.execute(
-                """
-                UPDATE products
-                SET stock_quantity = stock_quantity - %s
-                WHERE id = %s
-                """,
-                (item["quantity"], item["id"])
-            )
+        # Insert all priced lines in one batch
+        cursor.executemany(
+            """
+            INSERT INTO order_items (order_id, product_id, quantity, price)
+            VALUES (%s, %s, %s, %s)
+            """,
+            [(order_id, line["product_id"], line["quantity"], line["unit_price"]) for line in quote["lines"]]
+        )
 
         conn.commit()
         print(f"✅ Order {order_id} committed successfully")
-        return jsonify({"success": True, "order_id": order_id, "order_number": order_number}), 201
+        # stock_quantity is part of the product payloads; other workers see the rows'
+        # updated_at move on their next catalog check
+        catalog_cache.invalidate_products(quantities)
+        publish_order_event("order_created", {
+            "order_number": order_number,
+            "user_id": user_id,
+            "payment_method": payment_method,
+            "total_amount": float(quote["total"]),
+            "status": "Pending",
+            "created_at": created_at.isoformat(),
+            "items_summary": items_summary,
+        })
+        return jsonify({
+            "success": True,
+            "order_id": order_id,
+            "order_number": order_number,
+            "total_amount": float(quote["total"]),
+        }), 201
 
     except Exception as e:
         conn.rollback()
@@ -1244,91 +2244,190 @@ def create_order():
         cursor.close()
         conn.close()
 
-@app.route("/api/orders/<int:user_id>")
-def get_user_orders(user_id):
-    conn = get_db_connection()
-    if conn is None:
-        return jsonify({"error": "DB connection failed"}), 500
 
-    try:
-        cursor = conn.cursor(dictionary=True)
+ORDER_ITEMS_BATCH = 500
 
-        # 1) Get orders
-        cursor.execute(
-            """
-            SELECT 
-                o.id,
-                o.order_number,
-                o.total_amount,
-                o.payment_method,
-                o.status,
-                o.created_at,
-                (
-                    SELECT GROUP_CONCAT(CONCAT(p.name, ' x', oi.quantity) SEPARATOR ', ')
-                    FROM order_items oi
-                    JOIN products p ON p.id = oi.product_id
-                    WHERE oi.order_id = o.id
-                ) AS items_summary
-            FROM orders o
-            WHERE o.user_id = %s
-            ORDER BY o.created_at DESC
-            """,
-            (user_id,),
-        )
-        orders = cursor.fetchall()
-        if not orders:
-            return jsonify([])
 
-        # 2) Fetch order items with first image
-        order_ids = [o["id"] for o in orders]
-        placeholders = ",".join(["%s"] * len(order_ids))
-        cursor.execute(
-            f"""
+def order_items_summary(lines):
+    """Summary like 'Name x2, Other x1' for quote lines or order items; create_order snapshots it"""
+    return ", ".join(f"{line.get('name') or line.get('title')} x{line['quantity']}" for line in lines)
+
+
+def load_order_items(cursor, orders):
+    """Attach "items" and "items_summary" to order rows, querying only the given orders' ids"""
+    by_order = defaultdict(list)
+    order_ids = [o["id"] for o in orders]
+    for start in range(0, len(order_ids), ORDER_ITEMS_BATCH):
+        batch = order_ids[start:start + ORDER_ITEMS_BATCH]
+        placeholders = ",".join(["%s"] * len(batch))
+        cursor.execute(f"""
             SELECT 
                 oi.order_id,
                 p.id AS product_id,
                 p.name AS title,
+                oi.price,
                 oi.quantity,
-                (
-                    SELECT pi.image_filename
-                    FROM product_images pi
-                    WHERE pi.product_id = p.id
-                    ORDER BY pi.id ASC
-                    LIMIT 1
-                ) AS image_filename
+                p.primary_image AS image_filename
             FROM order_items oi
             JOIN products p ON p.id = oi.product_id
             WHERE oi.order_id IN ({placeholders})
             ORDER BY oi.order_id, oi.id
-            """,
-            order_ids,
-        )
-        rows = cursor.fetchall()
-
-        by_order = defaultdict(list)
-        for r in rows:
+        """, batch)
+        for r in cursor.fetchall():
             img_file = r.get("image_filename")
-            image_url = url_for("static", filename=f"uploads/{img_file}") if img_file else None
+            image_url = image_variant_url(img_file, "thumb") if img_file else None
             by_order[r["order_id"]].append({
                 "product_id": r["product_id"],
                 "title": r["title"],
+                "price": float(r["price"]) if r["price"] else 0,
                 "quantity": r["quantity"],
                 "image": image_url,
             })
 
+    for o in orders:
+        items = by_order.get(o["id"], [])
+        o["items"] = items
+        if not o.get("items_summary"):
+            # Orders placed before the snapshot column was backfilled
+            o["items_summary"] = order_items_summary(items) or None
+
+
+def user_orders_etag(cursor, user_id):
+    """Validator for a user's order history: changes whenever one of their orders is added,
+    removed or updated (updated_at moves and status is hashed in, for same-second edits),
+    and whenever a product they ordered changes, since items embed its name and image"""
+    cursor.execute("""
+        SELECT COUNT(*) AS order_count,
+               MAX(updated_at) AS last_change,
+               BIT_XOR(CRC32(CONCAT(id, ':', COALESCE(status, '')))) AS state_hash,
+               (SELECT MAX(p.updated_at)
+                FROM orders uo
+                JOIN order_items oi ON oi.order_id = uo.id
+                JOIN products p ON p.id = oi.product_id
+                WHERE uo.user_id = %s) AS product_change
+        FROM orders
+        WHERE user_id = %s
+    """, (user_id, user_id))
+    row = cursor.fetchone()
+    last_change = row["last_change"].strftime("%Y%m%d%H%M%S") if row["last_change"] else "0"
+    product_change = row["product_change"].strftime("%Y%m%d%H%M%S%f") if row["product_change"] else "0"
+    page_key = hashlib.sha1(repr(sorted(request.args.items(multi=True))).encode()).hexdigest()[:12]
+    return (f"orders-{user_id}-{row['order_count']}-{last_change}-{product_change}-"
+            f"{row['state_hash'] or 0:x}-{page_key}")
+
+
+@app.route("/api/orders/<int:user_id>")
+def get_user_orders(user_id):
+    """A user's orders, newest first.
+
+    Without ?limit= the whole history is returned as a plain array (compatibility mode).
+    With ?limit= the response is a page: {"orders", "next_cursor"}, where ?after= takes
+    the previous page's next_cursor.
+
+    Filters: ?status= / ?exclude_status= (repeat or comma-separate values), ?from= / ?to=
+    on created_at (ISO dates; a bare ?to= date includes that day), and ?q= (text found in
+    the order number, payment method, status or item names).
+
+    Responses carry an ETag derived from the user's latest order change and the products in
+    those orders, so a client revalidating with If-None-Match gets a 304 while nothing has
+    changed.
+    """
+    limit = parse_page_limit(request.args.get("limit"))
+    after = request.args.get("after")
+    after_values = None
+    if after:
+        after_values = decode_cursor(after, 2)
+        if after_values is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+        if limit is None:
+            limit = DEFAULT_PAGE_LIMIT
+
+    date_from, error = parse_date_param("from")
+    if error is None:
+        date_to, error = parse_date_param("to", end_of_day=True)
+    if error:
+        return jsonify({"error": error}), 400
+
+    conditions = ["o.user_id = %s"]
+    params = [user_id]
+    statuses = split_param("status")
+    excluded_statuses = split_param("exclude_status")
+    if excluded_statuses:
+        conditions.append(
+            f"(o.status IS NULL OR o.status NOT IN ({','.join(['%s'] * len(excluded_statuses))}))"
+        )
+        params.extend(excluded_statuses)
+    if date_from is not None:
+        conditions.append("o.created_at >= %s")
+        params.append(date_from)
+    if date_to is not None:
+        conditions.append("o.created_at < %s")
+        params.append(date_to)
+    text = request.args.get("q", "").strip()
+    if text:
+        like = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        conditions.append("""(
+            o.order_number LIKE %s OR o.payment_method LIKE %s OR o.status LIKE %s
+            OR o.items_summary LIKE %s
+            OR EXISTS (
+                SELECT 1 FROM order_items oi JOIN products p ON p.id = oi.product_id
+                WHERE oi.order_id = o.id AND p.name LIKE %s
+            )
+        )""")
+        params.extend([like] * 5)
+
+    conn = get_db_connection()
+    if conn is None:
+        return jsonify({"error": "DB connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+
+        # Cheap covering-index lookup first; unchanged histories stop here
+        etag = user_orders_etag(cursor, user_id)
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+
+        query = """
+            SELECT 
+                o.id,
+                o.order_number,
+                o.total_amount,
+                o.payment_method,
+                o.status,
+                o.created_at,
+                o.items_summary
+            FROM orders o
+        """
+
+        # Keyset pagination: continue strictly after the (created_at, id) of the last row
+        if after_values is not None:
+            conditions.append("(o.created_at < %s OR (o.created_at = %s AND o.id < %s))")
+            params.extend([after_values[0], after_values[0], after_values[1]])
+        orders = fetch_orders_newest_first(cursor, query, conditions, params, statuses, limit)
+
+        next_cursor = None
+        if limit is not None and len(orders) > limit:
+            orders = orders[:limit]
+            last = orders[-1]
+            next_cursor = encode_cursor([last["created_at"], last["id"]])
+
+        load_order_items(cursor, orders)
+
         nairobi_tz = pytz.timezone("Africa/Nairobi")
         for o in orders:
             # ✅ CORRECT: Use just 'datetime' since you imported the class directly
             if isinstance(o["created_at"], datetime):
                 o["created_at"] = o["created_at"].astimezone(nairobi_tz).isoformat()
-
-            o["items"] = by_order.get(o["id"], [])
             o.pop("id", None)
 
-        response = jsonify(orders)
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
+        response = jsonify(orders if limit is None else {"orders": orders, "next_cursor": next_cursor})
+        # Let the browser keep a copy but revalidate it on every use
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
         return response
 
     except Error as e:
@@ -1340,6 +2439,8 @@ def get_user_orders(user_id):
 @app.route("/api/orders/<string:order_number>/archive", methods=["DELETE"])
 def archive_order(order_number):
     """Archive an order (soft delete)"""
+    if not is_valid_order_number(order_number):
+        return jsonify({"error": "Order not found"}), 404
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
@@ -1366,6 +2467,8 @@ def archive_order(order_number):
 @app.route("/api/orders/<string:order_number>/cancel", methods=["PUT"])
 def cancel_order(order_number):
     """Cancel an order"""
+    if not is_valid_order_number(order_number):
+        return jsonify({"error": "Order not found"}), 404
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
@@ -1391,34 +2494,41 @@ def cancel_order(order_number):
 
 
 
+# Most product ids accepted by one /api/reviews/summary call
+MAX_RATING_SUMMARY_IDS = 200
+
+
+def fetch_rating_stats(cursor, product_ids):
+    """Average rating and review count per product id, read from product_rating_stats"""
+    stats = {product_id: {"average_rating": 0, "review_count": 0} for product_id in product_ids}
+    if not product_ids:
+        return stats
+
+    placeholders = ",".join(["%s"] * len(product_ids))
+    cursor.execute(f"""
+        SELECT product_id, rating_sum, rating_count
+        FROM product_rating_stats
+        WHERE product_id IN ({placeholders})
+    """, list(product_ids))
+    for row in cursor.fetchall():
+        if row["rating_count"]:
+            stats[row["product_id"]] = {
+                "average_rating": round(row["rating_sum"] / row["rating_count"], 2),
+                "review_count": row["rating_count"],
+            }
+    return stats
+
+
 @app.route("/api/reviews/product/<int:product_id>", methods=["GET"])
 def get_reviews_by_product(product_id):
     conn = get_db_connection()
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
+    cursor = None
     try:
         cursor = conn.cursor(dictionary=True)
-        
-        # Simplified query - only get what we need for star ratings
-        cursor.execute("""
-            SELECT rating
-            FROM reviews 
-            WHERE product_id = %s
-        """, (product_id,))
-        reviews = cursor.fetchall()
-        
-        # Calculate average rating and count
-        cursor.execute("""
-            SELECT AVG(rating) as average_rating, COUNT(*) as review_count
-            FROM reviews 
-            WHERE product_id = %s
-        """, (product_id,))
-        stats = cursor.fetchone()
-        
-        return jsonify({
-            "average_rating": float(stats['average_rating']) if stats['average_rating'] else 0,
-            "review_count": stats['review_count'] or 0
-        }), 200
+        stats = fetch_rating_stats(cursor, [product_id])[product_id]
+        return jsonify(stats), 200
     except Exception as e:
         print(f"❌ Error fetching reviews: {e}")
         return jsonify({"error": "Server error"}), 500
@@ -1428,6 +2538,38 @@ def get_reviews_by_product(product_id):
         if conn:
             conn.close()
 
+
+@app.route("/api/reviews/summary", methods=["GET"])
+def get_review_summaries():
+    """Rating stats for many products at once: ?product_ids=1,2,3"""
+    raw_ids = request.args.get("product_ids", "")
+    try:
+        product_ids = list(dict.fromkeys(int(v) for v in raw_ids.split(",") if v.strip()))
+    except ValueError:
+        return jsonify({"error": "product_ids must be a comma-separated list of integers"}), 422
+
+    if not product_ids:
+        return jsonify({"error": "Missing product_ids parameter"}), 400
+    if len(product_ids) > MAX_RATING_SUMMARY_IDS:
+        return jsonify({"error": f"At most {MAX_RATING_SUMMARY_IDS} product ids per request"}), 422
+
+    conn = get_db_connection()
+    if conn is None:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        stats = fetch_rating_stats(cursor, product_ids)
+        return jsonify({str(product_id): value for product_id, value in stats.items()}), 200
+    except Exception as e:
+        print(f"❌ Error fetching review summaries: {e}")
+        return jsonify({"error": "Server error"}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
 @app.route("/api/reviews", methods=["POST"])
 def submit_review():
     data = request.get_json()
@@ -1484,7 +2626,17 @@ def submit_review():
             data.get("comment")
         ))
 
+        # Keep the running totals in step with the reviews table
+        cursor.execute("""
+            INSERT INTO product_rating_stats (product_id, rating_sum, rating_count)
+            VALUES (%s, %s, 1)
+            ON DUPLICATE KEY UPDATE
+                rating_sum = rating_sum + VALUES(rating_sum),
+                rating_count = rating_count + 1
+        """, (product_id, rating))
+
         conn.commit()
+        catalog_data_changed(conn)  # product payloads can embed rating stats
         return jsonify({"message": "Review submitted successfully"}), 201
 
     except Exception as e:
@@ -1501,6 +2653,8 @@ def submit_review():
 
 @app.route("/api/reviews/order/<order_number>", methods=["GET"])
 def check_order_review(order_number):
+    if not is_valid_order_number(order_number):
+        return jsonify({"error": "Order not found"}), 404
     user_id = request.args.get("user_id")
 
     if not user_id:
@@ -1711,8 +2865,120 @@ def get_messages():
         return jsonify({'success': False, 'message': 'Failed to fetch messages'}), 500
 
 
+def split_param(name):
+    """Values of a repeatable / comma-separated query parameter"""
+    values = []
+    for raw in request.args.getlist(name):
+        values.extend(v.strip() for v in raw.split(",") if v.strip())
+    return values
+
+
+def parse_date_param(name, end_of_day=False):
+    """Parse ?from= / ?to= as an ISO date or datetime; a bare date in ?to= includes the whole day.
+
+    Returns (value, error) where value is None when the parameter is absent.
+    """
+    raw = request.args.get(name, "").strip()
+    if not raw:
+        return None, None
+    try:
+        value = datetime.fromisoformat(raw)
+    except ValueError:
+        return None, f"{name} must be an ISO date (YYYY-MM-DD) or datetime"
+    if end_of_day and len(raw) == 10:
+        value += timedelta(days=1)
+    return value.replace(tzinfo=None), None
+
+
+def fetch_orders_newest_first(cursor, query, conditions, params, statuses, limit):
+    """Run an order listing ordered by (created_at, id) descending, one query per status.
+
+    With `o.status IN (...)` over several values the rows cannot be read in index order,
+    so the server sorts every match before LIMIT applies. Each `o.status = %s` query walks
+    its (..., status, created_at, id) index and stops after limit + 1 rows; the sorted
+    runs are merged here. Returns up to limit + 1 rows (all of them without a limit).
+    """
+    def run(extra_conditions, extra_params):
+        where = conditions + extra_conditions
+        sql = query + (f" WHERE {' AND '.join(where)}" if where else "")
+        sql += " ORDER BY o.created_at DESC, o.id DESC"
+        run_params = params + extra_params
+        if limit is not None:
+            # One extra row tells the caller whether another page exists
+            sql += " LIMIT %s"
+            run_params = run_params + [limit + 1]
+        cursor.execute(sql, run_params)
+        return cursor.fetchall()
+
+    # The status column compares case-insensitively; don't read a status twice
+    statuses = list({status.lower(): status for status in statuses}.values())
+    if len(statuses) <= 1:
+        return run(["o.status = %s"] * len(statuses), statuses)
+    runs = [run(["o.status = %s"], [status]) for status in statuses]
+    merged = heapq.merge(*runs, key=lambda o: (o["created_at"], o["id"]), reverse=True)
+    return list(itertools.islice(merged, limit + 1 if limit is not None else None))
+
+
 @app.route("/api/admin/orders")
 def get_all_orders():
+    """List orders, newest first.
+
+    Without ?limit= every matching order is returned as a plain array (compatibility
+    mode). With ?limit= the response is a page: {"orders", "next_cursor"}, where ?after=
+    takes the previous page's next_cursor; the first page also carries "status_counts"
+    when ?counts=1 is given.
+
+    Filters: ?status= and ?payment_method= (repeat or comma-separate values), ?from= /
+    ?to= on created_at (ISO dates; a bare ?to= date includes that day), and ?customer=
+    (a user id, an order number, or a prefix of the customer's email, name or phone).
+    """
+    limit = parse_page_limit(request.args.get("limit"))
+    after = request.args.get("after")
+    after_values = None
+    if after:
+        after_values = decode_cursor(after, 2)
+        if after_values is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+        if limit is None:
+            limit = DEFAULT_PAGE_LIMIT
+
+    date_from, error = parse_date_param("from")
+    if error is None:
+        date_to, error = parse_date_param("to", end_of_day=True)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Everything but the status filter, which status_counts leaves out
+    conditions = []
+    params = []
+    payment_methods = split_param("payment_method")
+    if payment_methods:
+        conditions.append(f"o.payment_method IN ({','.join(['%s'] * len(payment_methods))})")
+        params.extend(payment_methods)
+    if date_from is not None:
+        conditions.append("o.created_at >= %s")
+        params.append(date_from)
+    if date_to is not None:
+        conditions.append("o.created_at < %s")
+        params.append(date_to)
+    customer = request.args.get("customer", "").strip()
+    if customer:
+        like = customer.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        customer_conditions = [
+            "u.email LIKE %s", "u.first_name LIKE %s", "u.last_name LIKE %s", "u.phone LIKE %s",
+            "o.order_number = %s",
+        ]
+        customer_params = [like, like, like, like, customer]
+        if customer.isdigit():
+            customer_conditions.append("o.user_id = %s")
+            customer_params.append(int(customer))
+        conditions.append(f"({' OR '.join(customer_conditions)})")
+        params.extend(customer_params)
+
+    page_conditions = list(conditions)
+    page_params = list(params)
+    statuses = split_param("status")
+
     conn = get_db_connection()
     if conn is None:
         return jsonify({"error": "DB connection failed"}), 500
@@ -1720,8 +2986,12 @@ def get_all_orders():
     try:
         cursor = conn.cursor(dictionary=True)
 
-        # Get all orders with user information including delivery address details
-        cursor.execute("""
+        from_clause = """
+            FROM orders o
+            LEFT JOIN users u ON u.id = o.user_id
+            LEFT JOIN delivery_addresses da ON da.address_id = o.address_id
+        """
+        query = """
             SELECT 
                 o.id,
                 o.order_number,
@@ -1729,6 +2999,7 @@ def get_all_orders():
                 o.payment_method,
                 o.status,
                 o.created_at,
+                o.items_summary,
                 u.email as user_email,
                 u.first_name,
                 u.last_name,
@@ -1740,66 +3011,84 @@ def get_all_orders():
                 da.town,
                 da.county,
                 da.postal_code,
-                da.country,
-                (
-                    SELECT GROUP_CONCAT(CONCAT(p.name, ' x', oi.quantity) SEPARATOR ', ')
-                    FROM order_items oi
-                    JOIN products p ON p.id = oi.product_id
-                    WHERE oi.order_id = o.id
-                ) AS items_summary
-            FROM orders o
-            LEFT JOIN users u ON u.id = o.user_id
-            LEFT JOIN delivery_addresses da ON da.address_id = o.address_id
-            ORDER BY o.created_at DESC
-        """)
-        orders = cursor.fetchall()
+                da.country
+        """ + from_clause
 
-        # Get order items with images
-        order_ids = [o["id"] for o in orders]
-        if order_ids:
-            placeholders = ",".join(["%s"] * len(order_ids))
-            cursor.execute(f"""
-                SELECT 
-                    oi.order_id,
-                    p.id AS product_id,
-                    p.name AS title,
-                    p.price,
-                    oi.quantity,
-                    (
-                        SELECT pi.image_filename
-                        FROM product_images pi
-                        WHERE pi.product_id = p.id
-                        ORDER BY pi.id ASC
-                        LIMIT 1
-                    ) AS image_filename
-                FROM order_items oi
-                JOIN products p ON p.id = oi.product_id
-                WHERE oi.order_id IN ({placeholders})
-                ORDER BY oi.order_id, oi.id
-            """, order_ids)
-            rows = cursor.fetchall()
-
-            by_order = defaultdict(list)
-            for r in rows:
-                img_file = r.get("image_filename")
-                image_url = url_for("static", filename=f"uploads/{img_file}") if img_file else None
-                by_order[r["order_id"]].append({
-                    "product_id": r["product_id"],
-                    "title": r["title"],
-                    "price": float(r["price"]) if r["price"] else 0,
-                    "quantity": r["quantity"],
-                    "image": image_url,
-                })
-
-        # Convert timezone and attach items
+        # Keyset pagination: continue strictly after the (created_at, id) of the last row
+        if after_values is not None:
+            page_conditions.append("(o.created_at < %s OR (o.created_at = %s AND o.id < %s))")
+            page_params.extend([after_values[0], after_values[0], after_values[1]])
+        orders = fetch_orders_newest_first(cursor, query, page_conditions, page_params, statuses, limit)
+
+        next_cursor = None
+        if limit is not None and len(orders) > limit:
+            orders = orders[:limit]
+            last = orders[-1]
+            next_cursor = encode_cursor([last["created_at"], last["id"]])
+
+        load_order_items(cursor, orders)
+
+        status_counts = None
+        if limit is not None and after_values is None and request.args.get("counts") in ("1", "true"):
+            cursor.execute(
+                "SELECT o.status, COUNT(*) AS count " + from_clause
+                + (f" WHERE {' AND '.join(conditions)}" if conditions else "")
+                + " GROUP BY o.status",
+                params,
+            )
+            status_counts = {}
+            for r in cursor.fetchall():
+                key = (r["status"] or "Pending").lower()
+                status_counts[key] = status_counts.get(key, 0) + r["count"]
+
+        # Convert timezone
         nairobi_tz = pytz.timezone("Africa/Nairobi")
         for o in orders:
             if isinstance(o["created_at"], datetime):
                 o["created_at"] = o["created_at"].astimezone(nairobi_tz).isoformat()
-            o["items"] = by_order.get(o["id"], [])
             o.pop("id", None)
 
-        return jsonify(orders)
+        if limit is None:
+            return jsonify(orders)
+
+        page = {"orders": orders, "next_cursor": next_cursor}
+        if status_counts is not None:
+            page["status_counts"] = status_counts
+        return jsonify(page)
+
+    except Error as e:
+        print(f"Database error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@app.route("/api/admin/orders/summary", methods=["GET"])
+def get_orders_summary():
+    """Order count and revenue per status (lower-cased), plus overall totals, in one GROUP BY"""
+    conn = get_db_connection()
+    if conn is None:
+        return jsonify({"error": "DB connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT status, COUNT(*) AS count, COALESCE(SUM(total_amount), 0) AS revenue
+            FROM orders
+            GROUP BY status
+        """)
+        by_status = {}
+        for r in cursor.fetchall():
+            entry = by_status.setdefault((r["status"] or "Pending").lower(), {"count": 0, "revenue": 0.0})
+            entry["count"] += r["count"]
+            entry["revenue"] += float(r["revenue"])
+
+        return jsonify({
+            "total": sum(e["count"] for e in by_status.values()),
+            "revenue": round(sum(e["revenue"] for e in by_status.values()), 2),
+            "by_status": by_status,
+        })
 
     except Error as e:
         print(f"Database error: {str(e)}")
@@ -1809,8 +3098,60 @@ def get_all_orders():
         conn.close()
 
 
+@app.route("/api/admin/orders/export", methods=["GET"])
+def export_orders():
+    """Stream orders as CSV or NDJSON, oldest first.
+
+    Takes ?format=csv|ndjson, ?status= / ?payment_method= (repeat or comma-separate
+    values) and ?from= / ?to= like the listing. Memory use does not grow with the
+    number of orders; see order_export.py.
+    """
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "Format must be 'csv' or 'ndjson'"}), 400
+
+    date_from, error = parse_date_param("from")
+    if error is None:
+        date_to, error = parse_date_param("to", end_of_day=True)
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        # A dedicated connection: the export may outlive any pooled one's fair share
+        conn = mysql.connector.connect(**mysql_settings)
+    except Error as e:
+        print(f"❌ Order export could not connect: {e}")
+        return jsonify({"error": "DB connection failed"}), 500
+
+    chunks = order_export.iter_export(
+        conn, fmt, tz=pytz.timezone("Africa/Nairobi"),
+        statuses=split_param("status"),
+        payment_methods=split_param("payment_method"),
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+    def generate():
+        try:
+            yield from chunks
+        finally:
+            chunks.close()
+            conn.close()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/csv" if fmt == "csv" else "application/x-ndjson",
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="orders.{fmt}"'
+    # Ask buffering proxies (nginx) to pass chunks through as they are produced
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 @app.route("/api/admin/orders/<order_number>/status", methods=["PUT"])
 def update_order_status(order_number):
+    if not is_valid_order_number(order_number):
+        return jsonify({"error": "Order not found"}), 404
     conn = get_db_connection()
     if conn is None:
         return jsonify({"error": "DB connection failed"}), 500
@@ -1889,33 +3230,87 @@ def get_all_customers():
         conn.close()
 
 
-@app.route("/api/admin/orders/<order_number>/clear-notification", methods=["POST"])
-def clear_notification(order_number):
-    """Clear notification for an order"""
+# ---------------------- Order Notifications ----------------------
+# New orders are pushed to open admin tabs over Server-Sent Events (see order_events.py).
+# "local" suits a single process; with several worker processes use "database", which
+# relays events through the order_events table.
+app.config["ORDER_EVENTS_BROKER"] = os.environ.get("ORDER_EVENTS_BROKER", "local")
+ORDER_STREAM_HEARTBEAT_SECONDS = 15
+# Streams end after a while and EventSource reconnects, so no worker thread is held forever
+ORDER_STREAM_MAX_SECONDS = 300
+MAX_NOTIFICATIONS_PER_REQUEST = 1000
+
+order_event_hub = order_events.OrderEventHub()
+if app.config["ORDER_EVENTS_BROKER"] == "database":
+    order_event_broker = order_events.DatabaseBroker(order_event_hub, get_db_connection)
+else:
+    order_event_broker = order_events.LocalBroker(order_event_hub)
+
+
+def publish_order_event(event_type, data):
+    """Notify admin streams after a committed change; a failure here never fails the request"""
     try:
-        conn = get_db_connection()
-        if conn is None:
-            return jsonify({"error": "Database connection failed"}), 500
-        
-        cursor = conn.cursor()
-        
-        # Update notification to NULL
-        cursor.execute(
-            "UPDATE orders SET notification = NULL WHERE order_number = %s",
-            (order_number,)
-        )
-        
+        order_event_broker.publish(event_type, data)
+    except Exception as e:
+        print(f"⚠️  Could not publish {event_type} event: {e}")
+
+
+def mark_notifications_read(order_numbers):
+    """Clear the 'new' flag on the given orders; returns how many were cleared"""
+    conn = get_db_connection()
+    if conn is None:
+        raise RuntimeError("DB connection failed")
+    cursor = conn.cursor()
+    try:
+        placeholders = ",".join(["%s"] * len(order_numbers))
+        # updated_at keeps its value: reading a notification does not change the order
+        cursor.execute(f"""
+            UPDATE orders SET notification = NULL, updated_at = updated_at
+            WHERE notification = 'new' AND order_number IN ({placeholders})
+        """, list(order_numbers))
+        cleared = cursor.rowcount
         conn.commit()
+    finally:
         cursor.close()
         conn.close()
-        
+    if cleared:
+        publish_order_event("notifications_read", {"order_numbers": list(order_numbers)})
+    return cleared
+
+
+@app.route("/api/admin/orders/<order_number>/clear-notification", methods=["POST"])
+def clear_notification(order_number):
+    """Clear notification for an order"""
+    if not is_valid_order_number(order_number):
+        return jsonify({"error": "Order not found"}), 404
+    try:
+        mark_notifications_read([order_number])
         return jsonify({"success": True, "message": "Notification cleared"}), 200
-        
+
     except Exception as e:
         print(f"Error clearing notification: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/admin/orders/notifications/read", methods=["POST"])
+def read_notifications():
+    """Mark several orders' notifications read in one UPDATE: {"order_numbers": [...]}"""
+    data = request.get_json(silent=True) or {}
+    order_numbers = data.get("order_numbers")
+    if not isinstance(order_numbers, list) or not order_numbers:
+        return jsonify({"error": "order_numbers must be a non-empty list"}), 400
+    order_numbers = list(dict.fromkeys(str(n) for n in order_numbers))
+    if len(order_numbers) > MAX_NOTIFICATIONS_PER_REQUEST:
+        return jsonify({"error": f"At most {MAX_NOTIFICATIONS_PER_REQUEST} order numbers per request"}), 400
+
+    try:
+        cleared = mark_notifications_read(order_numbers)
+        return jsonify({"success": True, "cleared": cleared}), 200
+    except Exception as e:
+        print(f"Error clearing notifications: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/admin/orders/new", methods=["GET"])
 def get_new_orders():
     """Get orders that have notification = 'new'"""
@@ -1926,12 +3321,13 @@ def get_new_orders():
 
         cursor = conn.cursor(dictionary=True)
 
-        # Fetch all orders with notification = 'new'
+        # Fetch all orders with notification = 'new'; the column's collation is
+        # case-insensitive, so a plain comparison matches any casing and uses the index
         cursor.execute("""
             SELECT id, order_number, user_id, address_id, payment_method,
                    total_amount, status, created_at, updated_at, notification
             FROM orders
-            WHERE LOWER(notification) = 'new'
+            WHERE notification = 'new'
             ORDER BY created_at DESC
         """)
 
@@ -1949,7 +3345,35 @@ def get_new_orders():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/admin/orders/stream", methods=["GET"])
+def stream_order_events():
+    """Server-Sent Events: "order_created" and "notifications_read" as they happen.
+
+    A "resync" event means events were dropped for this client; reload /api/admin/orders/new.
+    """
+    subscription = order_event_hub.subscribe()
+    order_event_broker.start()
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            deadline = time.monotonic() + ORDER_STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=ORDER_STREAM_HEARTBEAT_SECONDS)
+                # A comment line keeps proxies from closing an idle stream
+                yield order_events.sse_message(event) if event else ": keep-alive\n\n"
+        finally:
+            subscription.close()
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
     
 if __name__ == "__main__":
+    app.config["IMAGE_DELIVERY"] = os.environ.get("IMAGE_DELIVERY", "flask")
+    warm_catalog_indexes()
     app.run(debug=True)
 
@@ -0,0 +1,98 @@
+# backfill_denormalized.py
+"""Fill products.primary_image and orders.items_summary for rows that predate them.
+
+Walks each table by primary key range, one short transaction per batch, so row locks
+are held for a batch at a time and other writes interleave. Safe to re-run: products
+are recomputed, and orders that already have a summary are left alone. See
+migrations/008_denormalized_order_fields.sql.
+
+    python backfill_denormalized.py --batch-size 1000 --pause 0.05
+"""
+import argparse
+import sys
+import time
+
+from catalog_io import connect
+
+DEFAULT_BATCH_SIZE = 1000
+
+PRIMARY_IMAGE_BATCH = """
+    UPDATE products p
+    LEFT JOIN (
+        SELECT product_id, MIN(id) AS first_image_id
+        FROM product_images
+        WHERE product_id BETWEEN %s AND %s
+        GROUP BY product_id
+    ) fi ON fi.product_id = p.id
+    LEFT JOIN product_images pi ON pi.id = fi.first_image_id
+    SET p.primary_image = COALESCE(pi.image_filename, p.image_url)
+    WHERE p.id BETWEEN %s AND %s
+"""
+
+# updated_at is assigned to itself so ON UPDATE does not mark every old order as changed
+ITEMS_SUMMARY_BATCH = """
+    UPDATE orders o
+    JOIN (
+        SELECT oi.order_id,
+               GROUP_CONCAT(CONCAT(p.name, ' x', oi.quantity) ORDER BY oi.id SEPARATOR ', ') AS summary
+        FROM order_items oi
+        JOIN products p ON p.id = oi.product_id
+        WHERE oi.order_id BETWEEN %s AND %s
+        GROUP BY oi.order_id
+    ) s ON s.order_id = o.id
+    SET o.items_summary = s.summary, o.updated_at = o.updated_at
+    WHERE o.id BETWEEN %s AND %s AND o.items_summary IS NULL
+"""
+
+
+def backfill(conn, table, statement, batch_size, pause):
+    """Run statement over [start, end] id ranges of table; returns the number of rows changed"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT MIN(id), MAX(id) FROM {table}")
+        first_id, last_id = cursor.fetchone()
+        conn.commit()
+        if first_id is None:
+            return 0
+
+        changed = 0
+        for start in range(first_id, last_id + 1, batch_size):
+            end = start + batch_size - 1
+            cursor.execute(statement, (start, end, start, end))
+            changed += cursor.rowcount
+            conn.commit()
+            if pause:
+                time.sleep(pause)
+        return changed
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill products.primary_image and orders.items_summary")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="ids per transaction")
+    parser.add_argument("--pause", type=float, default=0.05, help="seconds to sleep between batches")
+    args = parser.parse_args(argv)
+    batch_size = max(1, args.batch_size)
+
+    conn = connect()
+    try:
+        cursor = conn.cursor()
+        # Long carts must not be cut off at the default 1024 bytes
+        cursor.execute("SET SESSION group_concat_max_len = 65535")
+        cursor.close()
+
+        products = backfill(conn, "products", PRIMARY_IMAGE_BATCH, batch_size, args.pause)
+        print(f"products.primary_image: {products} rows updated")
+        orders = backfill(conn, "orders", ITEMS_SUMMARY_BATCH, batch_size, args.pause)
+        print(f"orders.items_summary: {orders} rows updated")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+# bench_search.py
+"""Compare product search latency: the old four-way LIKE query vs the in-memory BM25 index.
+
+    python bench_search.py                 # LIKE runs on an in-memory SQLite copy
+    python bench_search.py --mysql         # LIKE runs on MySQL temporary tables (DB_* env vars)
+    python bench_search.py --sizes 10000 100000 --rounds 10
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import time
+
+from search_index import ProductSearchIndex
+
+LIKE_QUERY = """
+    SELECT p.id
+    FROM {products} p
+    LEFT JOIN {categories} c ON p.category_id = c.id
+    WHERE p.status = 'active'
+      AND (p.name LIKE {ph}
+      OR p.description LIKE {ph}
+      OR p.brand LIKE {ph}
+      OR c.name LIKE {ph})
+"""
+
+BRANDS = ["HP", "Dell", "Apple", "Lenovo", "Samsung", "Logitech", "Kasuku", "Sandisk", "Asus", "Acer"]
+NOUNS = ["laptop", "mouse", "keyboard", "flash drive", "monitor", "notebook", "pen", "charger",
+         "headset", "printer", "router", "tablet", "backpack", "cable", "speaker", "webcam"]
+ADJECTIVES = ["wireless", "portable", "ergonomic", "compact", "gaming", "slim", "rugged",
+              "premium", "budget", "mechanical", "silent", "fast", "durable", "lightweight"]
+CATEGORIES = ["Top Deals", "Computers", "Accessories", "Stationery", "Storage", "Audio", "Networking"]
+FILLER = ("ideal for office school and home use with a long lasting battery and a two year "
+          "warranty available in several colours and sizes").split()
+
+QUERIES = ["laptop", "wireless mouse", "hp", "gaming keyboard", "storage", "lap", "silent",
+           "portable speaker", "dell laptop", "notebook", "webcam", "charg"]
+
+
+def generate_products(count, seed=42):
+    rng = random.Random(seed)
+    products = []
+    for product_id in range(1, count + 1):
+        brand = rng.choice(BRANDS)
+        noun = rng.choice(NOUNS)
+        name = f"{brand} {rng.choice(ADJECTIVES)} {noun} {rng.randint(100, 999)}"
+        description = " ".join(rng.sample(ADJECTIVES, 2) + [noun] + rng.sample(FILLER, 12))
+        products.append({
+            "id": product_id,
+            "name": name,
+            "description": description,
+            "brand": brand,
+            "category_id": rng.randint(1, len(CATEGORIES)),
+        })
+    return products
+
+
+def load_sqlite(products):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE categories (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("""CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, description TEXT,
+                    brand TEXT, category_id INTEGER, status TEXT)""")
+    conn.executemany("INSERT INTO categories VALUES (?, ?)", list(enumerate(CATEGORIES, start=1)))
+    conn.executemany(
+        "INSERT INTO products VALUES (?, ?, ?, ?, ?, 'active')",
+        [(p["id"], p["name"], p["description"], p["brand"], p["category_id"]) for p in products],
+    )
+    conn.execute("CREATE INDEX idx_category ON products (category_id)")
+    return conn, LIKE_QUERY.format(products="products", categories="categories", ph="?")
+
+
+def load_mysql(products):
+    import mysql.connector
+
+    conn = mysql.connector.connect(
+        host=os.environ.get("DB_HOST", "localhost"),
+        user=os.environ.get("DB_USER", "root"),
+        password=os.environ.get("DB_PASSWORD", ""),
+        database=os.environ.get("DB_NAME", "next_dawn"),
+    )
+    cursor = conn.cursor()
+    # Temporary tables disappear with the session and never touch the real catalog
+    cursor.execute("CREATE TEMPORARY TABLE bench_categories (id INT PRIMARY KEY, name VARCHAR(100))")
+    cursor.execute("""CREATE TEMPORARY TABLE bench_products (id INT PRIMARY KEY, name VARCHAR(255),
+                      description TEXT, brand VARCHAR(100), category_id INT, status VARCHAR(20),
+                      KEY category_id (category_id))""")
+    cursor.executemany("INSERT INTO bench_categories VALUES (%s, %s)", list(enumerate(CATEGORIES, start=1)))
+    rows = [(p["id"], p["name"], p["description"], p["brand"], p["category_id"]) for p in products]
+    for start in range(0, len(rows), 5000):
+        cursor.executemany(
+            "INSERT INTO bench_products VALUES (%s, %s, %s, %s, %s, 'active')",
+            rows[start:start + 5000],
+        )
+    conn.commit()
+    cursor.close()
+    return conn, LIKE_QUERY.format(products="bench_products", categories="bench_categories", ph="%s")
+
+
+def time_calls(fn, queries, rounds):
+    timings = []
+    for _ in range(rounds):
+        for query in queries:
+            started = time.perf_counter()
+            fn(query)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50": statistics.median(timings),
+        "p95": timings[int(len(timings) * 0.95) - 1],
+        "mean": statistics.fmean(timings),
+    }
+
+
+def run(size, use_mysql, rounds):
+    products = generate_products(size)
+    conn, like_sql = (load_mysql if use_mysql else load_sqlite)(products)
+    category_names = dict(enumerate(CATEGORIES, start=1))
+
+    def like_search(query):
+        term = f"%{query}%"
+        cursor = conn.cursor()
+        cursor.execute(like_sql, (term, term, term, term))
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    started = time.perf_counter()
+    index = ProductSearchIndex()
+    index.rebuild({**p, "category_name": category_names[p["category_id"]]} for p in products)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    like_stats = time_calls(like_search, QUERIES, rounds)
+    index_stats = time_calls(index.search, QUERIES, rounds)
+    conn.close()
+
+    backend = "MySQL" if use_mysql else "SQLite"
+    print(f"\n{size:,} products (index build {build_ms:.0f} ms)")
+    print(f"  {'LIKE (' + backend + ')':<16} p50 {like_stats['p50']:8.2f} ms  p95 {like_stats['p95']:8.2f} ms")
+    print(f"  {'BM25 index':<16} p50 {index_stats['p50']:8.2f} ms  p95 {index_stats['p95']:8.2f} ms")
+    print(f"  speedup at p50: {like_stats['p50'] / index_stats['p50']:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--mysql", action="store_true", help="run the LIKE query against MySQL")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.mysql, args.rounds)
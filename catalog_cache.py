@@ -0,0 +1,219 @@
+# catalog_cache.py
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import timedelta
+
+# Product rows that changed this recently are re-read on every check, so a checkout
+# whose transaction commits a little after its UPDATE stamped the row is still seen
+PRODUCT_CHANGE_LOOKBACK_SECONDS = 10
+
+
+class CatalogCache:
+    """LRU cache for catalog read responses, invalidated by a global version counter.
+
+    Every catalog write calls bump(); entries stored under an older version are never
+    served again. Readers pass the version they started with to set() so a response
+    built from data that changed mid-request is dropped instead of cached.
+
+    Stock moves with every order but never changes which products a response lists, so
+    checkouts call invalidate_products() instead: only entries that embed one of those
+    products are dropped. Readers pass the product ids their response embeds and the
+    product_generation they started with, for the same mid-request check.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (version, value, product ids)
+        self._keys_by_product = defaultdict(set)
+        self._product_changes = {}  # product id -> product_generation of its last change
+        self.version = 1
+        self.product_generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self.version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _drop(self, key):
+        _, _, product_ids = self._entries.pop(key)
+        for product_id in product_ids:
+            keys = self._keys_by_product.get(product_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_product[product_id]
+
+    def set(self, key, value, version, product_ids=(), product_generation=None):
+        with self._lock:
+            if version != self.version:
+                return False
+            product_ids = frozenset(product_ids)
+            if product_generation is not None and any(
+                self._product_changes.get(product_id, 0) > product_generation for product_id in product_ids
+            ):
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, value, product_ids)
+            for product_id in product_ids:
+                self._keys_by_product[product_id].add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate_products(self, product_ids):
+        """Drop the entries embedding any of these products; returns how many went"""
+        with self._lock:
+            self.product_generation += 1
+            keys = set()
+            for product_id in product_ids:
+                self._product_changes[product_id] = self.product_generation
+                keys.update(self._keys_by_product.get(product_id, ()))
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            # Everything stored is stale now; drop it rather than waiting for LRU
+            self._entries.clear()
+            self._keys_by_product.clear()
+            self._product_changes.clear()
+            return self.version
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class SharedCatalogVersion:
+    """Catalog version shared by every worker process through the catalog_version row.
+
+    The row holds two counters: `version` moves on any change that cached responses
+    embed (products, stock, ratings, image variants), `index_version` only on product
+    and category writes, which the in-memory search, suggestion and facet indexes are
+    built from. A process bumps them after its own writes and reads them at most once
+    per check_interval before serving catalog reads, so another worker's change is
+    visible here within that interval.
+
+    Stock changes do not bump the row: poll() also reads the ids of products whose
+    updated_at moved since its last check, and the caller drops just those products'
+    cached responses.
+
+    poll() and bump() return (data_changed, index_changed, changed_product_ids) for
+    changes made by other processes since this one last looked (bump() never reports
+    product ids; the next poll() does). bump() runs on the caller's connection when
+    given one, so a request that still holds a pooled connection never takes a second.
+    """
+
+    def __init__(self, get_connection, check_interval=2.0):
+        self.get_connection = get_connection
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._known = None  # (version, index_version) last seen
+        self._checked_at = 0.0
+        self._products_since = None  # newest products.updated_at seen, on the DB's clock
+        self._product_stamps = {}  # product id -> updated_at already reported
+
+    def _changed_products(self, cursor):
+        """Ids of products whose row changed since the last check, each reported once per change"""
+        if self._products_since is None:
+            cursor.execute("SELECT NOW(6)")
+            self._products_since = cursor.fetchone()[0]
+            return []
+        cursor.execute(
+            "SELECT id, updated_at FROM products WHERE updated_at >= %s - INTERVAL %s SECOND",
+            (self._products_since, PRODUCT_CHANGE_LOOKBACK_SECONDS),
+        )
+        changed = []
+        for product_id, updated_at in cursor.fetchall():
+            if self._product_stamps.get(product_id) != updated_at:
+                self._product_stamps[product_id] = updated_at
+                changed.append(product_id)
+            self._products_since = max(self._products_since, updated_at)
+        # Stamps older than the window can never be read again
+        horizon = self._products_since - timedelta(seconds=PRODUCT_CHANGE_LOOKBACK_SECONDS)
+        self._product_stamps = {pid: stamp for pid, stamp in self._product_stamps.items() if stamp >= horizon}
+        return changed
+
+    def _run(self, bump_sql=None, params=(), conn=None, with_products=False):
+        own_connection = conn is None
+        if own_connection:
+            conn = self.get_connection()
+            if conn is None:
+                raise RuntimeError("DB connection failed")
+        cursor = conn.cursor()
+        try:
+            if bump_sql:
+                cursor.execute(bump_sql, params)
+            cursor.execute("SELECT version, index_version FROM catalog_version WHERE id = 1")
+            row = cursor.fetchone()
+            changed_products = self._changed_products(cursor) if with_products else []
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            if own_connection:
+                conn.close()
+        if row is None:
+            raise RuntimeError("catalog_version is not initialised; run migrations/010_catalog_version.sql")
+        return tuple(row), tuple(changed_products)
+
+    def _compare(self, current, own_bump=(0, 0), changed_products=()):
+        """Changes by others between the last known counters and current, minus our own bump"""
+        known, self._known = self._known, current
+        self._checked_at = time.monotonic()
+        if known is None:
+            return False, False, changed_products
+        data_changed = current[0] - known[0] > own_bump[0]
+        index_changed = current[1] - known[1] > own_bump[1]
+        return data_changed or index_changed, index_changed, changed_products
+
+    def poll(self):
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return False, False, ()
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return False, False, ()
+            try:
+                current, changed_products = self._run(with_products=True)
+            except Exception as e:
+                # Try again next interval; reads keep using what this process has
+                self._checked_at = time.monotonic()
+                print(f"⚠️  Catalog version check failed: {e}")
+                return False, False, ()
+            return self._compare(current, changed_products=changed_products)
+
+    def bump(self, index=False, conn=None):
+        """Record a committed write; conn, if given, must have no transaction open"""
+        with self._lock:
+            step = 1 if index else 0
+            current, _ = self._run(
+                "UPDATE catalog_version SET version = version + 1, index_version = index_version + %s WHERE id = 1",
+                (step,),
+                conn,
+            )
+            return self._compare(current, own_bump=(1, step))
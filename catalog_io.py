@@ -0,0 +1,418 @@
+# catalog_io.py
+"""Bulk catalog import/export as CSV or NDJSON.
+
+Used by the /api/admin/products/import and /api/admin/products/export endpoints, and
+from the command line:
+
+    python catalog_io.py import products.csv --batch-size 2000
+    python catalog_io.py export --format ndjson -o products.ndjson
+
+Images are referenced by filename and must already be in the uploads folder.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from werkzeug.utils import secure_filename
+
+import upload_store
+
+# Column order for CSV; NDJSON objects use the same keys
+FIELDS = [
+    "name", "description", "price", "discount", "stock_quantity",
+    "brand", "category", "colors", "sizes", "images",
+]
+LIST_FIELDS = ("colors", "sizes", "images")
+LIST_SEPARATOR = "|"
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+DEFAULT_UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "uploads")
+
+
+def detect_format(filename=None, content_type=None, explicit=None):
+    if explicit:
+        return explicit.lower()
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if content_type and "ndjson" in content_type:
+        return "ndjson"
+    return "csv"
+
+
+def read_rows(binary_stream, fmt):
+    """Yield (line number, row dict) from a binary stream without reading it all into memory"""
+    text = io.TextIOWrapper(binary_stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "ndjson":
+        for line_no, line in enumerate(text, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, {"__error__": f"Invalid JSON: {e}"}
+                continue
+            yield line_no, row if isinstance(row, dict) else {"__error__": "Expected a JSON object"}
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def load_lookups(cursor):
+    """Name -> id maps for categories, colors and sizes: one query each for the whole import"""
+    cursor.execute("SELECT id, name FROM categories")
+    categories = {name.strip().lower(): cid for cid, name in cursor.fetchall()}
+    cursor.execute("SELECT color_id, name FROM colors")
+    colors = {name.strip().lower(): cid for cid, name in cursor.fetchall()}
+    cursor.execute("SELECT size_id, size_name FROM sizes")
+    sizes = {name.strip().lower(): sid for sid, name in cursor.fetchall()}
+    return {"category": categories, "colors": colors, "sizes": sizes}
+
+
+class UploadedFiles:
+    """`filename in uploaded` checks the uploads folder for that one file.
+
+    Only the names the rows reference are looked up (once each), rather than listing a
+    folder that holds every upload and its variants.
+    """
+
+    def __init__(self, upload_folder):
+        self.upload_folder = upload_folder
+        self._known = {}
+
+    def __contains__(self, filename):
+        if filename not in self._known:
+            self._known[filename] = os.path.isfile(os.path.join(self.upload_folder, filename))
+        return self._known[filename]
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value).split(LIST_SEPARATOR) if v.strip()]
+
+
+def _as_decimal(value, field, errors, required=False):
+    if value is None or str(value).strip() == "":
+        if required:
+            errors.append(f"{field} is required")
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        errors.append(f"{field} must be a number")
+        return None
+    if number < 0:
+        errors.append(f"{field} must not be negative")
+    return number
+
+
+def validate_row(row, lookups):
+    """Turn a raw row into an insertable record, or return the list of problems with it"""
+    if "__error__" in row:
+        return None, [row["__error__"]]
+
+    errors = []
+    name = str(row.get("name") or "").strip()
+    description = str(row.get("description") or "").strip()
+    brand = str(row.get("brand") or "").strip()
+    category = str(row.get("category") or "").strip()
+
+    for field, value in (("name", name), ("description", description), ("brand", brand), ("category", category)):
+        if not value:
+            errors.append(f"{field} is required")
+
+    price = _as_decimal(row.get("price"), "price", errors, required=True)
+    discount = _as_decimal(row.get("discount"), "discount", errors)
+    if discount is not None and discount > 100:
+        errors.append("discount must be a percentage between 0 and 100")
+
+    stock_raw = row.get("stock_quantity")
+    stock_quantity = 0
+    if stock_raw not in (None, ""):
+        try:
+            stock_quantity = int(str(stock_raw).strip())
+            if stock_quantity < 0:
+                errors.append("stock_quantity must not be negative")
+        except ValueError:
+            errors.append("stock_quantity must be an integer")
+
+    category_id = lookups["category"].get(category.lower()) if category else None
+    if category and category_id is None:
+        errors.append(f"unknown category '{category}'")
+
+    resolved = {}
+    for field in ("colors", "sizes"):
+        ids = []
+        for value in _as_list(row.get(field)):
+            ref = lookups[field].get(value.lower())
+            if ref is None:
+                errors.append(f"unknown {field[:-1]} '{value}'")
+            else:
+                ids.append(ref)
+        resolved[field] = list(dict.fromkeys(ids))
+
+    images = _as_list(row.get("images"))
+    for filename in images:
+        if secure_filename(filename) != filename:
+            errors.append(f"invalid image filename '{filename}'")
+        elif filename not in lookups["images"]:
+            errors.append(f"image '{filename}' is not in the uploads folder")
+
+    if errors:
+        return None, errors
+
+    return {
+        "name": name,
+        "description": description,
+        "price": price,
+        "discount": discount,
+        "stock_quantity": stock_quantity,
+        "brand": brand,
+        "category_id": category_id,
+        "colors": resolved["colors"],
+        "sizes": resolved["sizes"],
+        "images": images,
+    }, []
+
+
+def _insert_batch(conn, batch):
+    """Insert one batch of validated records in a single transaction"""
+    cursor = conn.cursor()
+    try:
+        # One INSERT per product: a multi-row INSERT's ids are only consecutive under some
+        # auto-increment settings, while each lastrowid is exact
+        product_ids = []
+        for r in batch:
+            cursor.execute("""
+                INSERT INTO products (
+                    name, description, price, category_id, brand,
+                    stock_quantity, discount, primary_image, created_at
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW())
+            """, (r["name"], r["description"], r["price"], r["category_id"], r["brand"],
+                  r["stock_quantity"], r["discount"], r["images"][0] if r["images"] else None))
+            product_ids.append(cursor.lastrowid)
+
+        colors, sizes, images = [], [], []
+        for product_id, record in zip(product_ids, batch):
+            colors.extend((product_id, color_id) for color_id in record["colors"])
+            sizes.extend((product_id, size_id) for size_id in record["sizes"])
+            images.extend((product_id, filename) for filename in record["images"])
+
+        if colors:
+            cursor.executemany("INSERT INTO product_colors (product_id, color_id) VALUES (%s, %s)", colors)
+        if sizes:
+            cursor.executemany("INSERT INTO product_sizes (product_id, size_id) VALUES (%s, %s)", sizes)
+        if images:
+            cursor.executemany("INSERT INTO product_images (product_id, image_filename) VALUES (%s, %s)", images)
+            upload_store.add_references(cursor, [filename for _, filename in images])
+
+        conn.commit()
+        return product_ids
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def import_catalog(conn, rows, upload_folder, batch_size=DEFAULT_BATCH_SIZE):
+    """Validate and insert (line number, row) pairs in batched transactions.
+
+    Invalid rows, including rows naming images that are not in upload_folder, are
+    skipped and reported; a database error stops the import after rolling back the
+    batch in flight, and earlier batches stay committed.
+    """
+    cursor = conn.cursor()
+    try:
+        lookups = load_lookups(cursor)
+    finally:
+        cursor.close()
+    lookups["images"] = UploadedFiles(upload_folder)
+
+    summary = {"imported": 0, "failed": 0, "errors": []}
+
+    def report(line_no, messages):
+        summary["failed"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"line": line_no, "errors": messages})
+
+    batch, batch_lines = [], []
+
+    def flush():
+        try:
+            _insert_batch(conn, batch)
+        except Exception as e:
+            summary["failed"] += len(batch)
+            summary["errors"].append({"line": batch_lines[0], "errors": [f"batch ending at line {batch_lines[-1]} failed: {e}"]})
+            summary["aborted"] = True
+            return False
+        summary["imported"] += len(batch)
+        batch.clear()
+        batch_lines.clear()
+        return True
+
+    for line_no, row in rows:
+        record, errors = validate_row(row, lookups)
+        if errors:
+            report(line_no, errors)
+            continue
+        batch.append(record)
+        batch_lines.append(line_no)
+        if len(batch) >= batch_size and not flush():
+            return summary
+
+    if batch:
+        flush()
+    return summary
+
+
+# --- Export ---
+def _to_cell(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    return "" if value is None else value
+
+
+def iter_export_records(conn, chunk_size=1000):
+    """Yield export records for active products, reading one keyset page at a time"""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        last_id = 0
+        while True:
+            cursor.execute("""
+                SELECT p.id, p.name, p.description, p.price, p.discount, p.stock_quantity,
+                       p.brand, c.name AS category
+                FROM products p
+                LEFT JOIN categories c ON p.category_id = c.id
+                WHERE p.status = 'active' AND p.id > %s
+                ORDER BY p.id
+                LIMIT %s
+            """, (last_id, chunk_size))
+            products = cursor.fetchall()
+            if not products:
+                return
+
+            ids = [p["id"] for p in products]
+            placeholders = ",".join(["%s"] * len(ids))
+            related = {field: defaultdict(list) for field in LIST_FIELDS}
+
+            cursor.execute(f"""
+                SELECT pc.product_id, cl.name FROM product_colors pc
+                JOIN colors cl ON cl.color_id = pc.color_id
+                WHERE pc.product_id IN ({placeholders}) ORDER BY pc.id
+            """, ids)
+            for row in cursor.fetchall():
+                related["colors"][row["product_id"]].append(row["name"])
+            cursor.execute(f"""
+                SELECT ps.product_id, s.size_name FROM product_sizes ps
+                JOIN sizes s ON s.size_id = ps.size_id
+                WHERE ps.product_id IN ({placeholders}) ORDER BY ps.id
+            """, ids)
+            for row in cursor.fetchall():
+                related["sizes"][row["product_id"]].append(row["size_name"])
+            cursor.execute(f"""
+                SELECT product_id, image_filename FROM product_images
+                WHERE product_id IN ({placeholders}) ORDER BY id
+            """, ids)
+            for row in cursor.fetchall():
+                related["images"][row["product_id"]].append(row["image_filename"])
+
+            for p in products:
+                record = {field: _to_cell(p.get(field)) for field in FIELDS if field not in LIST_FIELDS}
+                for field in LIST_FIELDS:
+                    record[field] = related[field].get(p["id"], [])
+                yield record
+
+            last_id = ids[-1]
+    finally:
+        cursor.close()
+
+
+def iter_export(conn, fmt, chunk_size=1000):
+    """Yield the export as text chunks (one per keyset page) in CSV or NDJSON"""
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+        writer.writeheader()
+
+    for count, record in enumerate(iter_export_records(conn, chunk_size), start=1):
+        if fmt == "csv":
+            writer.writerow({
+                **record,
+                **{field: LIST_SEPARATOR.join(record[field]) for field in LIST_FIELDS},
+            })
+        else:
+            buffer.write(json.dumps(record, ensure_ascii=False))
+            buffer.write("\n")
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# --- CLI ---
+def connect():
+    import mysql.connector
+
+    return mysql.connector.connect(
+        host=os.environ.get("DB_HOST", "localhost"),
+        user=os.environ.get("DB_USER", "root"),
+        password=os.environ.get("DB_PASSWORD", ""),
+        database=os.environ.get("DB_NAME", "next_dawn"),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk catalog import/export")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="import products from a CSV or NDJSON file")
+    imp.add_argument("path")
+    imp.add_argument("--format", choices=["csv", "ndjson"])
+    imp.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    imp.add_argument("--upload-folder", default=DEFAULT_UPLOAD_FOLDER,
+                     help="folder the rows' images must already be in (default: static/uploads)")
+
+    exp = sub.add_parser("export", help="export active products")
+    exp.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    exp.add_argument("-o", "--output", help="file to write (default: stdout)")
+
+    args = parser.parse_args(argv)
+    conn = connect()
+    try:
+        if args.command == "import":
+            fmt = detect_format(args.path, explicit=args.format)
+            with open(args.path, "rb") as f:
+                summary = import_catalog(conn, read_rows(f, fmt), args.upload_folder, max(1, args.batch_size))
+            print(json.dumps(summary, indent=2))
+            return 1 if summary.get("aborted") else 0
+
+        out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+        try:
+            for chunk in iter_export(conn, args.format):
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+# checkout_race.py
+"""Hammer POST /api/orders with parallel checkouts and check that stock never oversells.
+
+Optional load tool for a staging server; the stock reservation contract itself is
+covered by tests/test_order_stock.py.
+
+Creates a scratch customer, delivery address and two active products, then runs
+--workers threads that each place --attempts orders against a running server, so every
+checkout goes through create_order itself (pricing, quantity aggregation, stock
+reservation, order rows). Carts alternate between two shapes:
+
+  split   the plentiful product listed as two lines (one per color/size), which
+          create_order must merge before reserving
+  mixed   one unit of the plentiful product plus one of the scarce product; once the
+          scarce product runs out these must fail with 409 and leave the plentiful
+          product's stock untouched
+
+Afterwards it checks that neither product went negative, that each product's stock
+dropped by exactly the units in the orders that succeeded, and that the orders and
+order_items written for the scratch customer match those successes. The scratch rows
+are deleted at the end. Needs the app running (--url) and its MySQL/MariaDB database
+(DB_* env vars).
+
+    python checkout_race.py --url http://localhost:5000 --stock 60 --scarce-stock 10 --workers 16 --attempts 10
+"""
+import argparse
+import json
+import sys
+import threading
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+
+from catalog_io import connect
+
+
+def create_scratch_data(stock, scarce_stock):
+    """Insert the customer, address and products the run orders against"""
+    tag = uuid.uuid4().hex[:12]
+    conn = connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id FROM categories ORDER BY id LIMIT 1")
+        row = cursor.fetchone()
+        if row is None:
+            sys.exit("Need at least one category to create the scratch products")
+        category_id = row[0]
+
+        cursor.execute(
+            "INSERT INTO users (email, username, first_name, password) VALUES (%s, %s, 'checkout race', '!')",
+            (f"checkout-race-{tag}@example.invalid", f"checkout-race-{tag}"),
+        )
+        user_id = cursor.lastrowid
+        cursor.execute("""
+            INSERT INTO delivery_addresses (user_id, contact_name, contact_phone, address_line1, town, county)
+            VALUES (%s, 'checkout race', '0000000000', 'scratch', 'scratch', 'scratch')
+        """, (user_id,))
+        address_id = cursor.lastrowid
+
+        product_ids = []
+        for name, units in (("plentiful", stock), ("scarce", scarce_stock)):
+            cursor.execute("""
+                INSERT INTO products (name, description, price, category_id, brand, stock_quantity, status, created_at)
+                VALUES (%s, 'temporary', 1, %s, 'test', %s, 'active', NOW())
+            """, (f"checkout race {name} {tag}", category_id, units))
+            product_ids.append(cursor.lastrowid)
+        conn.commit()
+        return user_id, address_id, product_ids
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def delete_scratch_data(user_id, product_ids):
+    conn = connect()
+    cursor = conn.cursor()
+    try:
+        # order_items and order_tracking cascade from orders, addresses from users
+        cursor.execute("DELETE FROM orders WHERE user_id = %s", (user_id,))
+        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        cursor.execute(
+            f"DELETE FROM products WHERE id IN ({','.join(['%s'] * len(product_ids))})", product_ids
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def make_cart(attempt, plentiful_id, scarce_id):
+    if attempt % 2 == 0:
+        return [{"id": plentiful_id, "quantity": 1}, {"id": plentiful_id, "quantity": 2}]
+    return [{"id": plentiful_id, "quantity": 1}, {"id": scarce_id, "quantity": 1}]
+
+
+def place_order(url, body):
+    request = urllib.request.Request(
+        f"{url}/api/orders",
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json", "Idempotency-Key": uuid.uuid4().hex},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+
+def worker(args, user_id, address_id, product_ids, results, lock):
+    plentiful_id, scarce_id = product_ids
+    for attempt in range(args.attempts):
+        cart = make_cart(attempt, plentiful_id, scarce_id)
+        status, payload = place_order(args.url, {
+            "user_id": user_id,
+            "address_id": address_id,
+            "payment_method": "cash",
+            "cart_items": cart,
+        })
+        with lock:
+            if status == 201:
+                results["succeeded"].append((payload["order_number"], cart))
+            elif status == 409 and payload.get("out_of_stock"):
+                results["rejected"] += 1
+            else:
+                results["errors"].append((status, payload))
+
+
+def check(args, user_id, product_ids, results):
+    """Compare the database with the orders that succeeded; returns a list of problems"""
+    expected_units = Counter()
+    expected_lines = {}
+    for order_number, cart in results["succeeded"]:
+        lines = Counter()
+        for item in cart:
+            lines[item["id"]] += item["quantity"]
+        expected_units.update(lines)
+        expected_lines[order_number] = dict(lines)
+
+    conn = connect()
+    cursor = conn.cursor()
+    try:
+        placeholders = ",".join(["%s"] * len(product_ids))
+        cursor.execute(f"SELECT id, stock_quantity FROM products WHERE id IN ({placeholders})", product_ids)
+        final_stock = dict(cursor.fetchall())
+        cursor.execute("""
+            SELECT o.order_number, oi.product_id, oi.quantity
+            FROM orders o
+            JOIN order_items oi ON oi.order_id = o.id
+            WHERE o.user_id = %s
+            ORDER BY o.id, oi.id
+        """, (user_id,))
+        written = {}
+        for order_number, product_id, quantity in cursor.fetchall():
+            lines = written.setdefault(str(order_number), {})
+            if product_id in lines:
+                lines[product_id] = None  # a product stored as more than one line
+            else:
+                lines[product_id] = quantity
+    finally:
+        cursor.close()
+        conn.close()
+
+    problems = []
+    for product_id, initial in zip(product_ids, (args.stock, args.scarce_stock)):
+        stock = final_stock[product_id]
+        print(f"product {product_id}: stock {initial} -> {stock} ({expected_units[product_id]} units sold)")
+        if stock < 0:
+            problems.append(f"product {product_id} went negative")
+        if stock != initial - expected_units[product_id]:
+            problems.append(f"product {product_id} stock does not match the successful orders")
+    if written != expected_lines:
+        problems.append(
+            f"orders in the database ({len(written)}) do not match the successful checkouts "
+            f"({len(expected_lines)}) line for line"
+        )
+    if results["errors"]:
+        problems.append(f"{len(results['errors'])} requests failed unexpectedly, e.g. {results['errors'][0]}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5000", help="base URL of the running app")
+    parser.add_argument("--stock", type=int, default=60, help="units of the plentiful product")
+    parser.add_argument("--scarce-stock", type=int, default=10, help="units of the scarce product")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=10, help="checkouts per worker")
+    args = parser.parse_args(argv)
+    args.url = args.url.rstrip("/")
+
+    user_id, address_id, product_ids = create_scratch_data(args.stock, args.scarce_stock)
+    results = {"succeeded": [], "rejected": 0, "errors": []}
+    lock = threading.Lock()
+    try:
+        threads = [
+            threading.Thread(target=worker, args=(args, user_id, address_id, product_ids, results, lock))
+            for _ in range(args.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        print(f"checkouts: {len(results['succeeded'])} succeeded, {results['rejected']} rejected as out of "
+              f"stock, {len(results['errors'])} errors")
+        problems = check(args, user_id, product_ids, results)
+    finally:
+        delete_scratch_data(user_id, product_ids)
+
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if not problems:
+        print("OK: no oversell, rejected carts left no trace")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+# chunked_upload.py
+"""Resumable chunked uploads for large product media.
+
+A session lives in <upload_folder>/.chunked/<upload_id>/ (same filesystem as the final
+files, so finishing is a rename):
+
+    meta.json   filename, size, chunk_size, expected sha256, final content name
+    data        sparse file of the declared size; chunks are written at their offset
+    received    append-only log of chunk indexes, one per line
+
+Appending a short line is atomic, so chunks may arrive in any order and on any worker
+process. A dropped connection only loses the chunk in flight; the client asks for the
+session status and resends what is missing.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+
+from upload_store import StagedUpload, content_filename
+
+SESSIONS_DIRNAME = ".chunked"
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+READ_SIZE = 64 * 1024
+
+UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ChunkedUploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _session_dir(upload_folder, upload_id):
+    if not UPLOAD_ID_RE.match(upload_id or ""):
+        raise ChunkedUploadError("Upload not found", 404)
+    return os.path.join(upload_folder, SESSIONS_DIRNAME, upload_id)
+
+
+def _load_meta(session):
+    try:
+        with open(os.path.join(session, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise ChunkedUploadError("Upload not found", 404)
+
+
+def _save_meta(session, meta):
+    tmp_path = os.path.join(session, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(session, "meta.json"))
+
+
+def _total_chunks(meta):
+    return max(1, -(-meta["size"] // meta["chunk_size"]))
+
+
+def _received(session):
+    try:
+        with open(os.path.join(session, "received"), encoding="ascii") as f:
+            return {int(line) for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def _normalize_sha256(value):
+    value = (value or "").strip().lower()
+    if value and not SHA256_RE.match(value):
+        raise ChunkedUploadError("sha256 must be 64 hex characters")
+    return value or None
+
+
+def create(upload_folder, filename, size, max_size, chunk_size=DEFAULT_CHUNK_SIZE, sha256=None):
+    """Start a session and allocate its sparse data file"""
+    if not isinstance(size, int) or size <= 0:
+        raise ChunkedUploadError("size must be a positive integer")
+    if size > max_size:
+        raise ChunkedUploadError(f"size exceeds the {max_size} byte limit", 413)
+    if not isinstance(chunk_size, int) or not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ChunkedUploadError(f"chunk_size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE}")
+
+    upload_id = uuid.uuid4().hex
+    session = _session_dir(upload_folder, upload_id)
+    os.makedirs(session)
+    with open(os.path.join(session, "data"), "wb") as f:
+        f.truncate(size)  # sparse: no blocks are allocated until chunks land
+
+    meta = {
+        "filename": filename,
+        "size": size,
+        "chunk_size": chunk_size,
+        "sha256": _normalize_sha256(sha256),
+        "content_filename": None,
+        "created_at": int(time.time()),
+    }
+    _save_meta(session, meta)
+    return status(upload_folder, upload_id)
+
+
+def status(upload_folder, upload_id):
+    session = _session_dir(upload_folder, upload_id)
+    meta = _load_meta(session)
+    total = _total_chunks(meta)
+    received = _received(session)
+    return {
+        "upload_id": upload_id,
+        "filename": meta["filename"],
+        "size": meta["size"],
+        "chunk_size": meta["chunk_size"],
+        "total_chunks": total,
+        "received_chunks": len(received),
+        "missing_chunks": [i for i in range(total) if i not in received],
+        "complete": meta["content_filename"] is not None,
+    }
+
+
+def write_chunk(upload_folder, upload_id, offset, stream, length):
+    """Write one chunk at offset from a readable stream of exactly `length` bytes"""
+    session = _session_dir(upload_folder, upload_id)
+    meta = _load_meta(session)
+    if meta["content_filename"] is not None:
+        raise ChunkedUploadError("Upload is already complete", 409)
+
+    chunk_size, size = meta["chunk_size"], meta["size"]
+    if offset < 0 or offset >= size or offset % chunk_size:
+        raise ChunkedUploadError(f"offset must be a multiple of {chunk_size} below {size}")
+    expected = min(chunk_size, size - offset)
+    if length != expected:
+        raise ChunkedUploadError(f"chunk at offset {offset} must be {expected} bytes")
+
+    fd = os.open(os.path.join(session, "data"), os.O_WRONLY)
+    try:
+        position, remaining = offset, length
+        while remaining:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                raise ChunkedUploadError("chunk body ended early")
+            os.pwrite(fd, data, position)
+            position += len(data)
+            remaining -= len(data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+    # Record the chunk only once its bytes are durable
+    with open(os.path.join(session, "received"), "a", encoding="ascii") as log:
+        log.write(f"{offset // chunk_size}\n")
+
+    received = _received(session)
+    return {"received_chunks": len(received), "total_chunks": _total_chunks(meta)}
+
+
+def finalize(upload_folder, upload_id, sha256=None):
+    """Check every chunk arrived and the content matches the expected checksum"""
+    session = _session_dir(upload_folder, upload_id)
+    meta = _load_meta(session)
+    if meta["content_filename"] is not None:
+        return status(upload_folder, upload_id)
+
+    missing = _total_chunks(meta) - len(_received(session))
+    if missing:
+        raise ChunkedUploadError(f"{missing} chunks are still missing", 409)
+
+    expected = _normalize_sha256(sha256) or meta["sha256"]
+    if expected is None:
+        raise ChunkedUploadError("sha256 is required to finish an upload")
+
+    digest = hashlib.sha256()
+    with open(os.path.join(session, "data"), "rb") as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""):
+            digest.update(block)
+    if digest.hexdigest() != expected:
+        # Some chunk was corrupted; the client has to resend the whole file
+        os.remove(os.path.join(session, "received"))
+        raise ChunkedUploadError("Checksum mismatch; all chunks must be uploaded again", 422)
+
+    meta["sha256"] = expected
+    meta["content_filename"] = content_filename(expected, meta["filename"])
+    _save_meta(session, meta)
+    return status(upload_folder, upload_id)
+
+
+def stage(upload_folder, upload_id):
+    """A StagedUpload for a finished session, for add_product / update_product.
+
+    The session keeps its data if the product write fails, so the same upload_id can be
+    used again; call cleanup() once the product has committed.
+    """
+    session = _session_dir(upload_folder, upload_id)
+    meta = _load_meta(session)
+    if meta["content_filename"] is None:
+        raise ChunkedUploadError(f"Upload {upload_id} is not complete", 409)
+    data_path = os.path.join(session, "data")
+    if not os.path.exists(data_path):
+        raise ChunkedUploadError(f"Upload {upload_id} was already used", 409)
+    return StagedUpload(meta["content_filename"], data_path, meta["size"], keep_on_discard=True)
+
+
+def cleanup(upload_folder, upload_ids):
+    for upload_id in upload_ids:
+        try:
+            shutil.rmtree(_session_dir(upload_folder, upload_id), ignore_errors=True)
+        except ChunkedUploadError:
+            pass
+
+
+def expire(upload_folder, max_age_seconds):
+    """Remove sessions untouched for max_age_seconds; returns how many were removed"""
+    root = os.path.join(upload_folder, SESSIONS_DIRNAME)
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            with os.scandir(entry.path) as files:
+                latest = max(
+                    (f.stat(follow_symlinks=False).st_mtime for f in files),
+                    default=entry.stat(follow_symlinks=False).st_mtime,
+                )
+            if latest < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+    return removed
@@ -0,0 +1 @@
+# Lets tests/ import the top-level modules when pytest runs from the repo root.
@@ -0,0 +1,183 @@
+# facet_index.py
+import threading
+from bisect import bisect_left, bisect_right
+
+# Facets backed by one bitmap per value
+FACETS = ("category_id", "color_id", "size_id", "brand")
+
+
+def brand_key(brand):
+    """How brands are compared everywhere (facets, suggestions): trimmed and lowercased"""
+    return (brand or "").strip().lower()
+
+
+def bits_to_slots(mask):
+    """Positions of the set bits in mask, lowest first"""
+    if not mask:
+        return []
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    slots = []
+    for byte_index, byte in enumerate(data):
+        if byte:
+            base = byte_index << 3
+            for bit in range(8):
+                if byte >> bit & 1:
+                    slots.append(base + bit)
+    return slots
+
+
+def slots_to_bits(slots):
+    """Build a bitmap from slot positions without creating one big int per slot"""
+    slots = list(slots)
+    if not slots:
+        return 0
+    buf = bytearray(max(slots) // 8 + 1)
+    for slot in slots:
+        buf[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(buf, "little")
+
+
+class ProductFacetIndex:
+    """Bitmap indexes over active products for faceted filtering.
+
+    Each product gets a slot (bit position); every facet value keeps a Python int whose
+    set bits are the products carrying that value. A filter is an OR within a facet and
+    an AND across facets, and facet counts are popcounts of the same masks.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.generation = 0
+        self._built_generation = None
+
+    def _reset(self):
+        self._ids = []
+        self._slot_of = {}
+        self._bitmaps = {facet: {} for facet in FACETS}
+        self._brand_labels = {}  # brand_key -> the spelling first seen, for facet counts
+        self._prices = []       # sorted effective prices
+        self._price_slots = []  # slot for each entry of _prices
+        self._all = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def built(self):
+        return self._built_generation == self.generation
+
+    def invalidate(self):
+        """Mark the bitmaps stale after a catalog write; the next query rebuilds them"""
+        with self._lock:
+            self.generation += 1
+
+    def rebuild(self, products, colors, sizes, generation):
+        """products: rows with id, category_id, brand, price, discount.
+        colors / sizes: (product_id, color_id) / (product_id, size_id) pairs.
+        generation is the value of self.generation read before the rows were loaded,
+        so a rebuild that raced with a write stays marked stale."""
+        with self._lock:
+            self._reset()
+            members = {facet: {} for facet in FACETS}
+
+            def add(facet, value, slot):
+                if value is not None:
+                    members[facet].setdefault(value, []).append(slot)
+
+            priced = []
+            for product in products:
+                slot = len(self._ids)
+                self._ids.append(product["id"])
+                self._slot_of[product["id"]] = slot
+                add("category_id", product["category_id"], slot)
+                key = brand_key(product["brand"])
+                if key:
+                    self._brand_labels.setdefault(key, product["brand"].strip())
+                add("brand", key or None, slot)
+                price = float(product["price"] or 0)
+                discount = float(product["discount"] or 0)
+                priced.append((price * (1 - discount / 100), slot))
+
+            for product_id, color_id in colors:
+                slot = self._slot_of.get(product_id)
+                if slot is not None:
+                    add("color_id", color_id, slot)
+            for product_id, size_id in sizes:
+                slot = self._slot_of.get(product_id)
+                if slot is not None:
+                    add("size_id", size_id, slot)
+
+            for facet, values in members.items():
+                self._bitmaps[facet] = {value: slots_to_bits(slots) for value, slots in values.items()}
+
+            priced.sort()
+            self._prices = [price for price, _ in priced]
+            self._price_slots = [slot for _, slot in priced]
+            self._all = (1 << len(self._ids)) - 1
+            self._built_generation = generation
+
+    def mask_for_ids(self, product_ids):
+        with self._lock:
+            return slots_to_bits(self._slot_of[pid] for pid in product_ids if pid in self._slot_of)
+
+    def _price_mask(self, min_price, max_price):
+        lo = 0 if min_price is None else bisect_left(self._prices, min_price)
+        hi = len(self._prices) if max_price is None else bisect_right(self._prices, max_price)
+        return slots_to_bits(self._price_slots[lo:hi])
+
+    def _facet_mask(self, facet, values):
+        bitmaps = self._bitmaps[facet]
+        mask = 0
+        for value in values:
+            mask |= bitmaps.get(brand_key(value) if facet == "brand" else value, 0)
+        return mask
+
+    def query(self, selections, min_price=None, max_price=None, base_mask=None, with_counts=False):
+        """Return (product ids, facet counts or None) for the selected facet values.
+
+        selections maps a facet name to the values picked for it. Counts for a facet
+        apply every other facet's filter but not its own, so picking one brand still
+        shows how many results the other brands would have.
+        """
+        with self._lock:
+            base = self._all if base_mask is None else base_mask & self._all
+            if min_price is not None or max_price is not None:
+                base &= self._price_mask(min_price, max_price)
+
+            facet_masks = {
+                facet: self._facet_mask(facet, values)
+                for facet, values in selections.items() if values
+            }
+
+            mask = base
+            for facet_mask in facet_masks.values():
+                mask &= facet_mask
+
+            slots = bits_to_slots(mask)
+            ids = [self._ids[slot] for slot in slots]
+            if not with_counts:
+                return ids, None
+
+            counts = {}
+            for facet in FACETS:
+                others = base
+                for other, facet_mask in facet_masks.items():
+                    if other != facet:
+                        others &= facet_mask
+                labels = self._brand_labels if facet == "brand" else {}
+                counts[facet] = {
+                    labels.get(value, value): (bitmap & others).bit_count()
+                    for value, bitmap in self._bitmaps[facet].items()
+                    if bitmap & others
+                }
+
+            counts["price"] = self._price_stats(slots)
+            return ids, counts
+
+    def _price_stats(self, slots):
+        matched = set(slots)
+        prices = [price for price, slot in zip(self._prices, self._price_slots) if slot in matched]
+        if not prices:
+            return {"min": None, "max": None}
+        return {"min": round(prices[0], 2), "max": round(prices[-1], 2)}
@@ -52,13 +52,13 @@ const AdminDashboard = () => {
 
       // Fetch all data in parallel
       const [
-        ordersRes,
+        orderSummaryRes,
         customersRes,
         messagesRes,
         recentOrdersRes,
         recentMessagesRes,
       ] = await Promise.all([
-        axios.get("/api/admin/orders", {
+        axios.get("/api/admin/orders/summary", {
           headers: { Authorization: `Bearer ${token}` },
         }),
         axios.get("/api/admin/customers", {
@@ -76,7 +76,7 @@ const AdminDashboard = () => {
       ]);
 
       // Process statistics
-      const orders = ordersRes.data;
+      const orderSummary = orderSummaryRes.data;
       const customers = customersRes.data;
       const messages = messagesRes.data.messages || [];
 
@@ -85,13 +85,10 @@ const AdminDashboard = () => {
 
       setStats({
         orders: {
-          total: orders.length,
-          pending: orders.filter((o) => o.status === "pending").length,
-          delivered: orders.filter((o) => o.status === "delivered").length,
-          revenue: orders.reduce(
-            (sum, order) => sum + (parseFloat(order.total_amount) || 0),
-            0
-          ),
+          total: orderSummary.total,
+          pending: orderSummary.by_status.pending?.count || 0,
+          delivered: orderSummary.by_status.delivered?.count || 0,
+          revenue: orderSummary.revenue,
         },
         customers: {
           total: customers.length,
@@ -111,7 +108,7 @@ const AdminDashboard = () => {
       });
 
       // Set recent data
-      setRecentOrders(recentOrdersRes.data.slice(0, 5));
+      setRecentOrders(recentOrdersRes.data.orders);
       setRecentMessages((recentMessagesRes.data.messages || []).slice(0, 5));
     } catch (error) {
       console.error("Error fetching dashboard data:", error);
@@ -1,9 +1,11 @@
-import React, { useEffect, useState, useMemo } from "react";
+import React, { useEffect, useState } from "react";
 import axios from "axios";
 import { toast } from "react-toastify";
 import "./css/AdminOrders.css";
 import { useNavigate, useLocation } from "react-router-dom";
 
+const ORDERS_PAGE_SIZE = 50;
+
 const AdminOrders = () => {
   const navigate = useNavigate();
   const [orders, setOrders] = useState([]);
@@ -12,6 +14,9 @@ const AdminOrders = () => {
   const [showModal, setShowModal] = useState(false);
   const [statusFilter, setStatusFilter] = useState("all");
   const [searchQuery, setSearchQuery] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
+  const [statusCounts, setStatusCounts] = useState({});
+  const [loadingMore, setLoadingMore] = useState(false);
   const location = useLocation();
 
   useEffect(() => {
@@ -46,23 +51,39 @@ const AdminOrders = () => {
     }
   }, []);
 
+  // Filters run on the server; re-fetch the first page when they change
   useEffect(() => {
-    fetchAllOrders();
-  }, []);
+    const timer = setTimeout(() => fetchOrders(), searchQuery ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [statusFilter, searchQuery]);
 
-  const fetchAllOrders = async () => {
+  const fetchOrders = async (after = null) => {
     try {
-      setLoading(true);
+      if (after) setLoadingMore(true);
       const token = localStorage.getItem("token");
+      const params = { limit: ORDERS_PAGE_SIZE };
+      if (after) params.after = after;
+      else params.counts = 1;
+      if (statusFilter !== "all") params.status = statusFilter;
+      if (searchQuery.trim()) params.customer = searchQuery.trim();
+
       const response = await axios.get("/api/admin/orders", {
+        params,
         headers: { Authorization: `Bearer ${token}` },
       });
-      setOrders(response.data);
+      setOrders((prev) =>
+        after ? [...prev, ...response.data.orders] : response.data.orders
+      );
+      setNextCursor(response.data.next_cursor);
+      if (response.data.status_counts) {
+        setStatusCounts(response.data.status_counts);
+      }
     } catch (error) {
       console.error("Error fetching orders:", error);
       toast.error("Failed to load orders");
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -89,34 +110,8 @@ const AdminOrders = () => {
     }
   };
 
-  const filteredOrders = useMemo(() => {
-    let filtered = orders;
-
-    // Apply status filter
-    if (statusFilter !== "all") {
-      filtered = filtered.filter(
-        (order) => order.status?.toLowerCase() === statusFilter.toLowerCase()
-      );
-    }
-
-    // Apply search filter
-    if (searchQuery) {
-      const query = searchQuery.toLowerCase();
-      filtered = filtered.filter(
-        (order) =>
-          order.order_number?.toLowerCase().includes(query) ||
-          order.user_email?.toLowerCase().includes(query) ||
-          order.items_summary?.toLowerCase().includes(query) ||
-          (order.first_name &&
-            order.first_name.toLowerCase().includes(query)) ||
-          (order.last_name && order.last_name.toLowerCase().includes(query))
-      );
-    }
-
-    return filtered.sort(
-      (a, b) => new Date(b.created_at) - new Date(a.created_at)
-    );
-  }, [orders, statusFilter, searchQuery]);
+  // Orders arrive filtered and newest first from the server
+  const filteredOrders = orders;
 
   const handleViewDetails = (order) => {
     setSelectedOrder(order);
@@ -161,15 +156,15 @@ const AdminOrders = () => {
     return "N/A";
   };
 
-  // Statistics for all statuses
+  // Statistics for all statuses (counted on the server across every page)
   const statusStats = {
-    total: orders.length,
-    pending: orders.filter((o) => o.status === "pending").length,
-    confirmed: orders.filter((o) => o.status === "confirmed").length,
-    processing: orders.filter((o) => o.status === "processing").length,
-    shipped: orders.filter((o) => o.status === "shipped").length,
-    delivered: orders.filter((o) => o.status === "delivered").length,
-    cancelled: orders.filter((o) => o.status === "cancelled").length,
+    total: Object.values(statusCounts).reduce((sum, n) => sum + n, 0),
+    pending: statusCounts.pending || 0,
+    confirmed: statusCounts.confirmed || 0,
+    processing: statusCounts.processing || 0,
+    shipped: statusCounts.shipped || 0,
+    delivered: statusCounts.delivered || 0,
+    cancelled: statusCounts.cancelled || 0,
   };
 
   if (loading) {
@@ -222,7 +217,7 @@ const AdminOrders = () => {
         <div className="search-box">
           <input
             type="text"
-            placeholder="Search by order number, email, name..."
+            placeholder="Search by order number, email, name, phone..."
             value={searchQuery}
             onChange={(e) => setSearchQuery(e.target.value)}
           />
@@ -310,6 +305,15 @@ const AdminOrders = () => {
             </tbody>
           </table>
         )}
+        {nextCursor && (
+          <button
+            className="btn-view load-more"
+            onClick={() => fetchOrders(nextCursor)}
+            disabled={loadingMore}
+          >
+            {loadingMore ? "Loading..." : "Load more orders"}
+          </button>
+        )}
       </div>
 
       {/* Order Details Modal */}
@@ -7,6 +7,26 @@ import { useNavigate } from "react-router-dom";
 import Header from "./Header";
 import Footer from "./Footer";
 
+// Newest products scanned when suggesting similar items for the cart
+const SIMILAR_PRODUCTS_LIMIT = 100;
+
+// Let the server narrow the catalog to the cart's categories
+const similarProductsUrl = (items) => {
+  const params = new URLSearchParams({
+    limit: String(SIMILAR_PRODUCTS_LIMIT),
+    sort: "created_at",
+    order: "desc",
+    include: "ratings",
+  });
+  const categoryIds = [
+    ...new Set(items.map((item) => item.category_id).filter((id) => id != null)),
+  ];
+  if (categoryIds.length > 0) {
+    params.set("category_id", categoryIds.join(","));
+  }
+  return `/api/products?${params}`;
+};
+
 // Star Rating Component
 const StarRating = ({ rating, size = 16 }) => {
   const fullStars = Math.floor(rating);
@@ -43,22 +63,20 @@ const CartPage = () => {
   const allSelected = cart.length > 0 && selectedItems.length === cart.length;
   const navigate = useNavigate();
 
-  // Fetch reviews for cart items
+  // Fetch rating summaries for all cart items in one request
   useEffect(() => {
     const fetchReviewsForCart = async () => {
-      const reviews = {};
-      for (const item of cart) {
-        try {
-          const response = await fetch(`/api/reviews/product/${item.id}`);
-          if (response.ok) {
-            const data = await response.json();
-            reviews[item.id] = data;
-          }
-        } catch (error) {
-          console.error(`Error fetching reviews for product ${item.id}:`, error);
+      const productIds = [...new Set(cart.map((item) => item.id))];
+      try {
+        const response = await fetch(
+          `/api/reviews/summary?product_ids=${productIds.join(",")}`
+        );
+        if (response.ok) {
+          setProductReviews(await response.json());
         }
+      } catch (error) {
+        console.error("Error fetching reviews for cart:", error);
       }
-      setProductReviews(reviews);
     };
 
     if (cart.length > 0) {
@@ -93,10 +111,10 @@ const CartPage = () => {
     if (stored.length > 0) {
       const categories = [...new Set(stored.map((item) => item.category_name))];
 
-      fetch("/api/products")
+      fetch(similarProductsUrl(stored))
         .then((res) => res.json())
         .then((data) => {
-          const filtered = data.filter(
+          const filtered = data.products.filter(
             (product) =>
               categories.includes(product.category_name) &&
               !stored.some((cartItem) => cartItem.id === product.id)
@@ -187,7 +205,35 @@ const CartPage = () => {
     localStorage.setItem("cart", JSON.stringify(updated));
   };
 
-  const totalPrice = cart
+  // Server-side price for the selected items; the local sum below only covers the
+  // moment before the quote arrives (or if it fails)
+  const [quote, setQuote] = useState(null);
+
+  useEffect(() => {
+    const items = cart
+      .filter((item) => selectedItems.includes(item.id))
+      .map((item) => ({ id: item.id, quantity: item.quantity }));
+    if (items.length === 0) {
+      setQuote(null);
+      return;
+    }
+
+    const controller = new AbortController();
+    fetch("/api/cart/quote", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ cart_items: items }),
+      signal: controller.signal,
+    })
+      .then((res) => (res.ok ? res.json() : null))
+      .then((data) => setQuote(data))
+      .catch((err) => {
+        if (err.name !== "AbortError") console.error("Error pricing cart:", err);
+      });
+    return () => controller.abort();
+  }, [cart, selectedItems]);
+
+  const localTotal = cart
     .filter((item) => selectedItems.includes(item.id))
     .reduce((sum, item) => {
       const price = item.discount
@@ -195,6 +241,7 @@ const CartPage = () => {
         : item.price;
       return sum + price * item.quantity;
     }, 0);
+  const totalPrice = quote ? quote.subtotal : localTotal;
 
   const [fullscreenImages, setFullscreenImages] = useState([]);
   const [currentImageIndex, setCurrentImageIndex] = useState(0);
@@ -240,10 +287,10 @@ const CartPage = () => {
 
     const categories = [...new Set(cart.map((item) => item.category_name))];
 
-    fetch("/api/products")
+    fetch(similarProductsUrl(cart))
       .then((res) => res.json())
       .then((data) => {
-        const filtered = data.filter(
+        const filtered = data.products.filter(
           (product) =>
             categories.includes(product.category_name) &&
             !cart.some((cartItem) => cartItem.id === product.id)
@@ -463,7 +510,7 @@ const CartPage = () => {
                   const images = product.images || [];
                   const colors = product.colors || [];
                   const stock = product.stock_quantity || 0;
-                  const reviews = productReviews[product.id];
+                  const reviews = productReviews[product.id] || product.rating;
                   const averageRating = reviews?.average_rating || 0;
                   const reviewCount = reviews?.review_count || 0;
 
@@ -5,6 +5,26 @@ import axios from "axios";
 import "./css/CheckoutPage.css";
 import Header from "./Header";
 
+const POST_RETRIES = 3;
+
+const newIdempotencyKey = () =>
+  window.crypto?.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+// Retries only when no response came back; the same Idempotency-Key lets the
+// server hand back the first result instead of running the request again
+const postIdempotent = async (url, body, key) => {
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await axios.post(url, body, { headers: { "Idempotency-Key": key } });
+    } catch (err) {
+      if (err.response || attempt >= POST_RETRIES) throw err;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * attempt));
+    }
+  }
+};
+
 const CheckoutPage = () => {
   const [cart, setCart] = useState([]);
   const [addresses, setAddresses] = useState([]);
@@ -105,13 +125,26 @@ const CheckoutPage = () => {
     fetchAddresses();
   }, [token]);
 
-  // ✅ Calculate totals
-  const subtotal = cart.reduce(
+  // ✅ Totals come from the server quote (same pricing the order will be charged at)
+  const [quote, setQuote] = useState(null);
+
+  useEffect(() => {
+    if (cart.length === 0) return;
+    axios
+      .post("/api/cart/quote", {
+        cart_items: cart.map((item) => ({ id: item.id, quantity: item.quantity })),
+      })
+      .then((res) => setQuote(res.data))
+      .catch((err) => console.error("Error pricing cart:", err));
+  }, [cart]);
+
+  const localSubtotal = cart.reduce(
     (sum, item) => sum + item.price * item.quantity,
     0
   );
-  const tax = subtotal * 0.16; // 16% VAT
-  const total = subtotal + tax;
+  const subtotal = quote ? quote.subtotal : localSubtotal;
+  const tax = quote ? quote.tax : subtotal * 0.16; // 16% VAT
+  const total = quote ? quote.total : subtotal + tax;
 
   // ✅ Place order
   const handlePlaceOrder = async () => {
@@ -132,10 +165,13 @@ const CheckoutPage = () => {
 
       setIsLoading(true);
       try {
-        const res = await axios.post("/test-stkpush", {
-          phone: formattedPhone,
-          amount: total,
-        });
+        // One key per checkout attempt, shared by the payment and the order it creates
+        const checkoutKey = newIdempotencyKey();
+        const res = await postIdempotent(
+          "/test-stkpush",
+          { phone: formattedPhone, amount: total },
+          `${checkoutKey}:stkpush`
+        );
 
         const checkout_id = res.data.checkout_id;
         toast.info("STK Push sent! Check your phone to complete payment.");
@@ -166,17 +202,21 @@ const CheckoutPage = () => {
                   })),
                 });
 
-                const orderResponse = await axios.post("/api/orders", {
-                  user_id: userId, // Use the correct user ID from JWT
-                  address_id: selectedAddress.address_id,
-                  payment_method: paymentMethod,
-                  total_amount: total,
-                  cart_items: cart.map((item) => ({
-                    id: item.id,
-                    quantity: item.quantity,
-                    price: item.price,
-                  })),
-                });
+                const orderResponse = await postIdempotent(
+                  "/api/orders",
+                  {
+                    user_id: userId, // Use the correct user ID from JWT
+                    address_id: selectedAddress.address_id,
+                    payment_method: paymentMethod,
+                    total_amount: total,
+                    cart_items: cart.map((item) => ({
+                      id: item.id,
+                      quantity: item.quantity,
+                      price: item.price,
+                    })),
+                  },
+                  `${checkoutKey}:order`
+                );
 
                 console.log("Order created successfully:", orderResponse.data);
 
@@ -185,9 +225,14 @@ const CheckoutPage = () => {
               } catch (err) {
                 console.error("Failed to save order:", err);
                 console.error("Error details:", err.response?.data);
+                const outOfStock = err.response?.data?.out_of_stock;
                 toast.error(
                   "Failed to save order: " +
-                    (err.response?.data?.error || err.message)
+                    (outOfStock
+                      ? outOfStock
+                          .map((s) => `${s.name || `Product ${s.product_id}`} (only ${s.available ?? 0} left)`)
+                          .join(", ")
+                      : err.response?.data?.error || err.message)
                 );
               }
 
@@ -9,6 +9,8 @@ import Header from "./Header";
 import Footer from "./Footer";
 import { useSearch } from "./SearchContext"; // ADD THIS IMPORT
 
+const PRODUCT_PAGE_SIZE = 24;
+
 function useQuery() {
   return new URLSearchParams(useLocation().search);
 }
@@ -81,6 +83,7 @@ const Home = () => {
   const [topDeals, setTopDeals] = useState([]);
   const [otherProducts, setOtherProducts] = useState([]);
   const [allProducts, setAllProducts] = useState([]);
+  const [productTotal, setProductTotal] = useState(null);
   const [loading, setLoading] = useState(true);
   const location = useLocation();
   const query = useQuery();
@@ -163,52 +166,85 @@ const Home = () => {
     }
   }, [location.search, query]);
 
-  // Fetch all products
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // Category links carry the name; the API filters by id
+  const selectedCategoryId = selectedCategory
+    ? categories.find(
+        (c) => c.name.toLowerCase() === selectedCategory.toLowerCase()
+      )?.id ?? null
+    : null;
+  const waitingForCategories =
+    !searchTerm && !!selectedCategory && categories.length === 0;
+
+  const applyProducts = (data) => {
+    setAllProducts(data);
+    const top = data.filter(
+      (product) =>
+        product.category_name &&
+        product.category_name.toLowerCase() === "top deals"
+    );
+    const rest = data.filter(
+      (product) =>
+        !product.category_name ||
+        product.category_name.toLowerCase() !== "top deals"
+    );
+    setTopDeals(top);
+    setOtherProducts(rest);
+  };
+
+  // Search and category filters run on the server; one page is fetched at a time
+  const fetchProductPage = (after) => {
+    const params = new URLSearchParams({ limit: String(PRODUCT_PAGE_SIZE) });
+    if (after) params.set("after", after);
+    if (searchTerm) params.set("search", searchTerm);
+    else if (selectedCategoryId !== null)
+      params.set("category_id", String(selectedCategoryId));
+    return fetch(`/api/products?${params}`).then((res) => res.json());
+  };
+
   useEffect(() => {
-    fetch("/api/products")
-      .then((res) => res.json())
+    if (waitingForCategories) return;
+    let cancelled = false;
+    setLoading(true);
+
+    fetchProductPage(null)
       .then((data) => {
-        setAllProducts(data);
-        const top = data.filter(
-          (product) =>
-            product.category_name &&
-            product.category_name.toLowerCase() === "top deals"
-        );
-        const rest = data.filter(
-          (product) =>
-            !product.category_name ||
-            product.category_name.toLowerCase() !== "top deals"
-        );
-        setTopDeals(top);
-        setOtherProducts(rest);
+        if (cancelled) return;
+        if (!searchTerm && !selectedCategoryId && data.total != null) {
+          setProductTotal(data.total);
+        }
+        applyProducts(data.products || []);
+        setNextCursor(data.next_cursor || null);
         setLoading(false);
       })
       .catch((err) => {
         console.error("Failed to fetch products:", err);
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       });
-  }, []);
 
-  // Filter products when category changes
-  const filteredProducts = selectedCategory
-    ? allProducts.filter(
-        (product) =>
-          product.category_name &&
-          product.category_name.toLowerCase() === selectedCategory.toLowerCase()
-      )
-    : [];
-
-  // ADD THIS: Filter products for search
-  const searchResults = searchTerm
-    ? allProducts.filter(
-        (product) =>
-          product.name?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-          product.category_name
-            ?.toLowerCase()
-            .includes(searchTerm.toLowerCase()) ||
-          product.description?.toLowerCase().includes(searchTerm.toLowerCase())
-      )
-    : [];
+    return () => {
+      cancelled = true;
+    };
+  }, [searchTerm, selectedCategoryId, waitingForCategories]);
+
+  const loadMoreProducts = () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    fetchProductPage(nextCursor)
+      .then((data) => {
+        applyProducts([...allProducts, ...(data.products || [])]);
+        setNextCursor(data.next_cursor || null);
+      })
+      .catch((err) => console.error("Failed to fetch more products:", err))
+      .finally(() => setLoadingMore(false));
+  };
+
+  // The loaded pages already match the selected category / search term
+  const filteredProducts =
+    selectedCategory && selectedCategoryId !== null ? allProducts : [];
+  const searchResults = searchTerm ? allProducts : [];
 
   // Wishlist functions
   const addToWishlist = (product) => {
@@ -286,9 +322,10 @@ const Home = () => {
 
           {images.length > 0 && (
             <img
-              src={`../static/uploads/${images[0]}`}
+              src={product.image_variants?.[0]?.card || `../static/uploads/${images[0]}`}
               alt={product.name || "Product"}
               className="home-product-image"
+              loading="lazy"
               onError={(e) => {
                 e.target.src = "/static/images/fallback.jpg";
               }}
@@ -477,7 +514,7 @@ const Home = () => {
                   >
                     <span className="category-name">All Products</span>
                     <span className="product-count">
-                      ({allProducts.length})
+                      ({productTotal ?? allProducts.length})
                     </span>
                   </button>
 
@@ -600,6 +637,19 @@ const Home = () => {
               )}
           </>
         )}
+
+        {!loading && nextCursor && (
+          <div style={{ textAlign: "center", margin: "20px 0" }}>
+            <button
+              onClick={loadMoreProducts}
+              className="home-add-to-cart-btn"
+              style={{ width: "auto", padding: "8px 24px" }}
+              disabled={loadingMore}
+            >
+              {loadingMore ? "Loading..." : "Load More Products"}
+            </button>
+          </div>
+        )}
       </div>
       <Footer />
     </div>
@@ -15,10 +15,10 @@ import "./css/AdminLayout.css";
 
 const Layout = () => {
   const [isSidebarOpen, setIsSidebarOpen] = useState(false);
-  const [notificationCount, setNotificationCount] = useState(0);
   const [showNotificationDropdown, setShowNotificationDropdown] =
     useState(false);
   const [newOrders, setNewOrders] = useState([]);
+  const notificationCount = newOrders.length;
   const navigate = useNavigate();
 
   // Fetch new orders count
@@ -32,21 +32,50 @@ const Layout = () => {
       const ordersWithNotification = response.data.orders; // Already filtered by backend
 
       setNewOrders(ordersWithNotification);
-      setNotificationCount(response.data.count);
     } catch (error) {
       console.error("Error fetching new orders:", error);
     }
   };
 
-  // Initial fetch and periodic polling
+  // New orders are pushed over Server-Sent Events; the list is (re)loaded whenever
+  // the stream (re)connects or the server says this tab missed events
   useEffect(() => {
-    fetchNewOrders();
+    const source = new EventSource("/api/admin/orders/stream");
 
-    // Poll every 30 seconds for new orders
-    const interval = setInterval(fetchNewOrders, 30000);
-    return () => clearInterval(interval);
+    source.onopen = () => fetchNewOrders();
+    source.addEventListener("resync", () => fetchNewOrders());
+
+    source.addEventListener("order_created", (e) => {
+      const order = JSON.parse(e.data);
+      setNewOrders((prev) =>
+        prev.some((o) => o.order_number === order.order_number)
+          ? prev
+          : [order, ...prev]
+      );
+    });
+
+    source.addEventListener("notifications_read", (e) => {
+      const { order_numbers } = JSON.parse(e.data);
+      setNewOrders((prev) =>
+        prev.filter((o) => !order_numbers.includes(o.order_number))
+      );
+    });
+
+    return () => source.close();
   }, []);
 
+  const markNotificationsRead = (orderNumbers) => {
+    const token = localStorage.getItem("token");
+    setNewOrders((prev) =>
+      prev.filter((o) => !orderNumbers.includes(o.order_number))
+    );
+    return axios.post(
+      "/api/admin/orders/notifications/read",
+      { order_numbers: orderNumbers },
+      { headers: { Authorization: `Bearer ${token}` } }
+    );
+  };
+
   const handleLogout = () => {
     localStorage.clear();
     navigate("/login");
@@ -60,23 +89,14 @@ const Layout = () => {
 
   const handleNotificationClick = async (order) => {
     try {
-      const token = localStorage.getItem("token");
-
-      // Clear the notification in the backend
-      await axios.post(
-        `/api/admin/orders/${order.order_number}/clear-notification`,
-        {},
-        { headers: { Authorization: `Bearer ${token}` } }
-      );
+      // Clear the notification in the backend (other admin tabs hear about it too)
+      await markNotificationsRead([order.order_number]);
 
       // Navigate to the orders page with highlight query
       navigate(`/layout/orders?highlight=${order.order_number}`);
 
       // Close dropdown
       setShowNotificationDropdown(false);
-
-      // Refresh notification count
-      fetchNewOrders();
     } catch (error) {
       console.error("Error clearing notification:", error);
     }
@@ -158,6 +178,20 @@ const Layout = () => {
                 <div className="notification-dropdown">
                   <div className="notification-header">
                     <h4>New Orders ({notificationCount})</h4>
+                    {newOrders.length > 0 && (
+                      <button
+                        className="mark-all-read"
+                        onClick={() =>
+                          markNotificationsRead(
+                            newOrders.map((o) => o.order_number)
+                          ).catch((error) =>
+                            console.error("Error clearing notifications:", error)
+                          )
+                        }
+                      >
+                        Mark all as read
+                      </button>
+                    )}
                   </div>
                   <div className="notification-list">
                     {newOrders.length > 0 ? (
@@ -7,12 +7,31 @@ import ReviewModal from "./ReviewModal";
 import ProductDetailsModal from "./ProductDetailsModal"; // Add this import
 import { toast } from "react-toastify";
 
+const ORDERS_PAGE_SIZE = 20;
+
+// Tab filters, applied by the server so they cover every order, not just loaded pages
+const TAB_PARAMS = {
+  all: { exclude_status: "archived" },
+  open: { status: "pending,confirmed,processing,shipped" },
+  cancelled: { status: "cancelled,failed" },
+  archived: { status: "archived" },
+};
+
+// Local calendar date as YYYY-MM-DD, the format ?from= / ?to= take
+const isoDate = (d) =>
+  `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, "0")}-${String(
+    d.getDate()
+  ).padStart(2, "0")}`;
+
 const OrdersPage = () => {
   const [orders, setOrders] = useState([]);
   const [query, setQuery] = useState("");
+  const [debouncedQuery, setDebouncedQuery] = useState("");
   const [tab, setTab] = useState("all");
   const [range, setRange] = useState("3m");
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const token = localStorage.getItem("token");
   const navigate = useNavigate();
   const [reviewingOrder, setReviewingOrder] = useState(null); // Add this state
@@ -32,6 +51,56 @@ const OrdersPage = () => {
     }
   }
 
+  const rangeBounds = useMemo(() => {
+    const now = new Date();
+    switch (range) {
+      case "30d": {
+        const start = new Date(now);
+        start.setDate(start.getDate() - 30);
+        return { start, end: null };
+      }
+      case "3m": {
+        const start = new Date(now);
+        start.setMonth(start.getMonth() - 3);
+        return { start, end: null };
+      }
+      case "6m": {
+        const start = new Date(now);
+        start.setMonth(start.getMonth() - 6);
+        return { start, end: null };
+      }
+      case "y2025":
+        return {
+          start: new Date(2025, 0, 1),
+          end: new Date(2025, 11, 31, 23, 59, 59),
+        };
+      case "y2024":
+        return {
+          start: new Date(2024, 0, 1),
+          end: new Date(2024, 11, 31, 23, 59, 59),
+        };
+      case "all":
+      default:
+        return null;
+    }
+  }, [range]);
+
+  // Wait for a pause in typing before asking the server again
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedQuery(query.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [query]);
+
+  const filterParams = useMemo(() => {
+    const params = { ...TAB_PARAMS[tab] };
+    if (rangeBounds) {
+      params.from = isoDate(rangeBounds.start);
+      if (rangeBounds.end) params.to = isoDate(rangeBounds.end);
+    }
+    if (debouncedQuery) params.q = debouncedQuery;
+    return params;
+  }, [tab, rangeBounds, debouncedQuery]);
+
   useEffect(() => {
     if (!token) {
       navigate("/login");
@@ -45,23 +114,28 @@ const OrdersPage = () => {
       return;
     }
 
+    // A newer filter selection supersedes any request still in flight
+    let stale = false;
+
     const fetchOrders = async () => {
       try {
-        setLoading(true);
         console.log("Fetching orders for user:", decoded.sub);
 
         const res = await axios.get(`/api/orders/${decoded.sub}`, {
+          params: { ...filterParams, limit: ORDERS_PAGE_SIZE },
           headers: { Authorization: `Bearer ${token}` },
         });
 
+        if (stale) return;
         console.log("Orders API response:", res.data);
 
-        // Your backend returns the array directly
-        const ordersData = Array.isArray(res.data) ? res.data : [];
+        const ordersData = Array.isArray(res.data?.orders) ? res.data.orders : [];
 
         console.log("Processed orders data:", ordersData);
         setOrders(ordersData);
+        setNextCursor(res.data?.next_cursor || null);
       } catch (err) {
+        if (stale) return;
         console.error("Error fetching orders:", err);
         console.error("Error response:", err.response?.data);
 
@@ -76,7 +150,30 @@ const OrdersPage = () => {
     };
 
     fetchOrders();
-  }, [token, navigate]);
+    return () => {
+      stale = true;
+    };
+  }, [token, navigate, filterParams]);
+
+  // ✅ Older orders are fetched a page at a time
+  const loadMoreOrders = async () => {
+    const decoded = parseJwt(token);
+    if (!decoded || !nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const res = await axios.get(`/api/orders/${decoded.sub}`, {
+        params: { ...filterParams, limit: ORDERS_PAGE_SIZE, after: nextCursor },
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      setOrders((prev) => [...prev, ...(res.data?.orders || [])]);
+      setNextCursor(res.data?.next_cursor || null);
+    } catch (err) {
+      console.error("Error fetching more orders:", err);
+      toast.error("Failed to load more orders");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const handleCancelOrder = async (orderNumber) => {
     try {
@@ -287,92 +384,20 @@ const OrdersPage = () => {
     return "status-pending";
   };
 
-  // Filtering
-  const rangeBounds = useMemo(() => {
-    const now = new Date();
-    switch (range) {
-      case "30d": {
-        const start = new Date(now);
-        start.setDate(start.getDate() - 30);
-        return { start, end: now };
-      }
-      case "3m": {
-        const start = new Date(now);
-        start.setMonth(start.getMonth() - 3);
-        return { start, end: now };
-      }
-      case "6m": {
-        const start = new Date(now);
-        start.setMonth(start.getMonth() - 6);
-        return { start, end: now };
-      }
-      case "y2025":
-        return {
-          start: new Date(2025, 0, 1),
-          end: new Date(2025, 11, 31, 23, 59, 59),
-        };
-      case "y2024":
-        return {
-          start: new Date(2024, 0, 1),
-          end: new Date(2024, 11, 31, 23, 59, 59),
-        };
-      case "all":
-      default:
-        return null;
-    }
-  }, [range]);
 
+  // The server already applied the tab, date range and search; drop rows a local
+  // cancel/archive moved out of the current tab
   const filtered = useMemo(() => {
-    const q = query.trim().toLowerCase();
-
     const ordersArray = Array.isArray(orders) ? orders : [];
-    console.log("Filtering orders:", ordersArray.length);
-
-    return ordersArray
-      .filter((o) => {
-        if (!rangeBounds || !o) return true;
-        const created = parseDateEAT(o.created_at);
-        if (!created) return true;
-        return created >= rangeBounds.start && created <= rangeBounds.end;
-      })
-      .filter((o) => {
-        if (!o) return false;
-        const s = String(o.status || "").toLowerCase();
-
-        if (tab === "all") return s !== "archived";
-        if (tab === "open")
-          return (
-            s === "pending" ||
-            s === "confirmed" ||
-            s === "processing" ||
-            s === "shipped"
-          );
-        if (tab === "cancelled") return s === "cancelled" || s === "failed";
-        if (tab === "archived") return s === "archived";
-
-        return true;
-      })
-      .filter((o) => {
-        if (!q || !o) return true;
-        const items = normalizeItems(o);
-        const text =
-          [
-            o.order_number,
-            o.payment_method,
-            o.status,
-            ...items.map((i) => i?.title || i?.name || ""),
-          ]
-            .join(" ")
-            .toLowerCase() || "";
-        return text.includes(q);
-      })
-      .sort((a, b) => {
-        const dateA = parseDateEAT(a?.created_at);
-        const dateB = parseDateEAT(b?.created_at);
-        if (!dateA || !dateB) return 0;
-        return dateB - dateA;
-      });
-  }, [orders, query, tab, range]);
+    const tabParams = TAB_PARAMS[tab] || {};
+    return ordersArray.filter((o) => {
+      if (!o) return false;
+      const s = String(o.status || "").toLowerCase();
+      if (tabParams.exclude_status) return s !== tabParams.exclude_status;
+      if (tabParams.status) return tabParams.status.split(",").includes(s);
+      return true;
+    });
+  }, [orders, tab]);
 
   if (loading) {
     return (
@@ -442,7 +467,7 @@ const OrdersPage = () => {
 
         {filtered.length === 0 ? (
           <p className="orders-empty">
-            {orders.length === 0
+            {tab === "all" && range === "all" && !debouncedQuery
               ? "You haven't placed any orders yet."
               : "No orders found for the current filters."}
           </p>
@@ -598,6 +623,14 @@ const OrdersPage = () => {
             })}
           </div>
         )}
+
+        {nextCursor && (
+          <div className="orders-load-more">
+            <button className="btn" onClick={loadMoreOrders} disabled={loadingMore}>
+              {loadingMore ? "Loading..." : "Show older orders"}
+            </button>
+          </div>
+        )}
       </div>
 
       {reviewingOrder && (
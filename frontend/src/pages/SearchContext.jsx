@@ -28,14 +28,9 @@ const fetchSearchSuggestions = async (query) => {
 
   try {
     setIsSearching(true);
-    const response = await axios.get(`/api/products?search=${encodeURIComponent(query)}`);
-    const products = response.data;
-    
-    const matches = products.filter(product =>
-      product.name?.toLowerCase().includes(query.toLowerCase()) ||
-      product.category_name?.toLowerCase().includes(query.toLowerCase()) ||
-      product.description?.toLowerCase().includes(query.toLowerCase())
-    );
+    // Ranked prefix matches over product names, brands and categories
+    const response = await axios.get(`/api/products/suggest?q=${encodeURIComponent(query)}`);
+    const matches = response.data.suggestions || [];
 
     setSearchResults(matches);
     
@@ -39,10 +39,10 @@ const UniversalSearch = () => {
     performSearch(searchTerm, navigate);
   };
 
-  const handleSuggestionClick = (product, e) => {
+  const handleSuggestionClick = (suggestion, e) => {
     e?.stopPropagation(); // Prevent event bubbling
     setShowSuggestions(false);
-    performSearch(product.name, navigate);
+    performSearch(suggestion.text, navigate);
   };
 
   const handleKeyDown = (e) => {
@@ -72,31 +72,39 @@ const UniversalSearch = () => {
 
         {showSuggestions && searchResults.length > 0 && (
           <div className="universal-search-suggestions">
-            {searchResults.slice(0, 8).map((product) => (
+            {searchResults.slice(0, 8).map((suggestion) => (
               <div
-                key={product.id}
+                key={`${suggestion.type}-${suggestion.id ?? suggestion.text}`}
                 className="suggestion-item"
-                onClick={(e) => handleSuggestionClick(product, e)} // Updated here
+                onClick={(e) => handleSuggestionClick(suggestion, e)} // Updated here
               >
                 <div className="suggestion-image">
-                  {product.images?.[0] ? (
+                  {suggestion.image ? (
                     <img 
-                      src={`../static/uploads/${product.images[0]}`} 
-                      alt={product.name}
+                      src={`/api/media/thumb/${suggestion.image}?v=${suggestion.image_version}`} 
+                      alt={suggestion.text}
                       onError={(e) => {
                         e.target.src = '/static/images/fallback.jpg';
                       }}
                     />
                   ) : (
-                    <div className="suggestion-placeholder">📦</div>
+                    <div className="suggestion-placeholder">
+                      {suggestion.type === 'category' ? '🗂️' : suggestion.type === 'brand' ? '🏷️' : '📦'}
+                    </div>
                   )}
                 </div>
                 <div className="suggestion-details">
-                  <div className="suggestion-name">{product.name}</div>
-                  <div className="suggestion-category">{product.category_name}</div>
-                  <div className="suggestion-price">
-                    KES {product.price?.toLocaleString()}
+                  <div className="suggestion-name">{suggestion.text}</div>
+                  <div className="suggestion-category">
+                    {suggestion.type === 'product'
+                      ? suggestion.category_name
+                      : suggestion.type === 'brand' ? 'Brand' : 'Category'}
                   </div>
+                  {suggestion.type === 'product' && (
+                    <div className="suggestion-price">
+                      KES {suggestion.price?.toLocaleString()}
+                    </div>
+                  )}
                 </div>
               </div>
             ))}
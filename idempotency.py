@@ -0,0 +1,149 @@
+# idempotency.py
+"""Idempotency-Key support for endpoints that must not run twice.
+
+The first request carrying a key inserts an `in_progress` row into `idempotency_keys`.
+The primary key makes that insert the lock: a concurrent duplicate, on any worker
+process, fails to insert and waits until the owner stores its response, then replays
+it. A stored response lives for the TTL; an `in_progress` row whose owner died is
+reclaimable once its short lease runs out. Expired rows are purged in small batches.
+"""
+import hashlib
+import threading
+import time
+
+import mysql.connector
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_LEASE_SECONDS = 60
+MAX_KEY_LENGTH = 255
+PURGE_INTERVAL_SECONDS = 60
+PURGE_BATCH = 1000
+
+# begin() outcomes
+NEW = "new"
+REPLAY = "replay"
+MISMATCH = "mismatch"
+IN_PROGRESS = "in_progress"
+_RETRY = object()
+
+
+def request_fingerprint(body):
+    return hashlib.sha256(body or b"").hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, get_connection, ttl_seconds=DEFAULT_TTL_SECONDS, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 wait_seconds=30, poll_interval=0.1):
+        self.get_connection = get_connection
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_interval = poll_interval
+        self._purge_lock = threading.Lock()
+        self._attempt_slot = threading.Lock()
+        self._last_purge = 0.0
+
+    def _connect(self):
+        conn = self.get_connection()
+        if conn is None:
+            raise RuntimeError("DB connection failed")
+        return conn
+
+    def begin(self, scope, key, fingerprint):
+        """Claim a key. Returns (outcome, stored) where stored is (status, body) for REPLAY.
+
+        Every attempt borrows a connection just for its statements and gives it back
+        before sleeping, so waiting duplicates never pin pool connections. Attempts in
+        this process also run one at a time (each is a couple of millisecond-long
+        statements), so a burst of duplicates uses at most one connection between them
+        and the requests doing real work keep the rest of the pool.
+        """
+        self._maybe_purge()
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            with self._attempt_slot:
+                result = self._attempt(scope, key, fingerprint)
+            if result is _RETRY:
+                continue
+            if result is not None:
+                return result
+            if time.monotonic() >= deadline:
+                return IN_PROGRESS, None
+            time.sleep(self.poll_interval)
+
+    def _attempt(self, scope, key, fingerprint):
+        """One claim-or-inspect round. Returns an outcome pair, None while the owner is
+        still working, or _RETRY to try again straight away."""
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            try:
+                cursor.execute("""
+                    INSERT INTO idempotency_keys (scope, idem_key, fingerprint, state, expires_at)
+                    VALUES (%s, %s, %s, 'in_progress', NOW() + INTERVAL %s SECOND)
+                """, (scope, key, fingerprint, self.lease_seconds))
+                conn.commit()
+                return NEW, None
+            except mysql.connector.IntegrityError:
+                conn.rollback()
+
+            cursor.execute("""
+                SELECT fingerprint, state, response_status, response_body, expires_at < NOW()
+                FROM idempotency_keys WHERE scope = %s AND idem_key = %s
+            """, (scope, key))
+            row = cursor.fetchone()
+            conn.commit()  # don't carry a snapshot back into the pool
+            if row is None:
+                return _RETRY  # purged between our insert and select
+
+            stored_fingerprint, state, status, body, expired = row
+            if expired:
+                # Stale entry (finished past its TTL, or an owner that died); reclaim it
+                cursor.execute(
+                    "DELETE FROM idempotency_keys WHERE scope = %s AND idem_key = %s AND expires_at < NOW()",
+                    (scope, key),
+                )
+                conn.commit()
+                return _RETRY
+            if stored_fingerprint != fingerprint:
+                return MISMATCH, None
+            if state == "done":
+                return REPLAY, (status, body)
+            return None
+        finally:
+            cursor.close()
+            conn.close()
+
+    def complete(self, scope, key, status, body):
+        """Store the response so repeats of the key replay it until the TTL runs out"""
+        self._execute("""
+            UPDATE idempotency_keys
+            SET state = 'done', response_status = %s, response_body = %s,
+                expires_at = NOW() + INTERVAL %s SECOND
+            WHERE scope = %s AND idem_key = %s
+        """, (status, body, self.ttl_seconds, scope, key))
+
+    def abandon(self, scope, key):
+        """Forget a key whose request failed, so a retry runs it again"""
+        self._execute("DELETE FROM idempotency_keys WHERE scope = %s AND idem_key = %s", (scope, key))
+
+    def _execute(self, sql, params):
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _maybe_purge(self):
+        now = time.monotonic()
+        with self._purge_lock:
+            if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+                return
+            self._last_purge = now
+        try:
+            self._execute("DELETE FROM idempotency_keys WHERE expires_at < NOW() LIMIT %s", (PURGE_BATCH,))
+        except Exception as e:
+            print(f"⚠️  Idempotency key purge failed: {e}")
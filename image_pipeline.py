@@ -0,0 +1,239 @@
+# image_pipeline.py
+"""Processing for product image uploads.
+
+Metadata (EXIF with GPS position and camera serials, XMP, comments, PNG text) is
+stripped by strip_metadata() while an upload is still staged, before it is named after
+the SHA-256 of its bytes (upload_store), so the stored original is already clean and is
+never modified afterwards.
+
+In the background each upload then gets a full-size copy ("full") plus thumb, card and
+detail resizes, each written as WebP, AVIF (when the installed Pillow supports it) and
+a JPEG/PNG fallback. Work runs in a process pool so uploads never wait on it; until a
+variant exists the original is served in its place.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is optional; without it originals are served as-is
+    Image = None
+
+# Longest edge in pixels for each variant (None keeps the original size)
+VARIANTS = {
+    "full": None,
+    "thumb": 160,
+    "card": 480,
+    "detail": 1200,
+}
+
+# Preferred first; the fallback (jpg/png, matching the source) is always written
+MODERN_FORMATS = [
+    ("avif", "image/avif", "AVIF", {"quality": 50}),
+    ("webp", "image/webp", "WEBP", {"quality": 80, "method": 4}),
+]
+
+VARIANTS_DIRNAME = "variants"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def available():
+    return Image is not None
+
+
+def supported_formats():
+    """Modern formats this Pillow build can encode"""
+    if Image is None:
+        return []
+    return [fmt for fmt in MODERN_FORMATS if features.check(fmt[0])]
+
+
+def variant_dir(upload_folder, filename):
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(upload_folder, VARIANTS_DIRNAME, stem)
+
+
+def fallback_extension(filename):
+    return "png" if filename.lower().endswith((".png", ".gif")) else "jpg"
+
+
+def _save_atomic(image, path, fmt, **params):
+    tmp_path = f"{path}.tmp"
+    image.save(tmp_path, fmt, **params)
+    os.replace(tmp_path, path)
+
+
+# Image.info keys that describe the photo or its owner; ICC profiles and transparency stay
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop", "iptc")
+
+
+def strip_metadata(source, dest):
+    """Write a copy of a JPEG/PNG upload to dest without its metadata, orientation baked in.
+
+    Returns False, writing nothing, when there is nothing to remove, the file is another
+    format, or Pillow is missing.
+    """
+    if Image is None:
+        return False
+    with Image.open(source) as original:
+        if original.format not in ("JPEG", "PNG"):
+            return False
+        exif = original.getexif()
+        text = original.text if original.format == "PNG" else {}
+        if not exif and not text and not any(key in original.info for key in METADATA_KEYS):
+            return False
+        original.load()
+
+        params = {}
+        if original.info.get("icc_profile"):
+            params["icc_profile"] = original.info["icc_profile"]
+        if exif.get(0x0112, 1) != 1:
+            image = ImageOps.exif_transpose(original)
+            if original.format == "JPEG":
+                params["quality"] = 90
+        else:
+            image = original
+            if original.format == "JPEG":
+                # Reuse the source's quantisation tables so the pixels barely change
+                params.update(quality="keep", subsampling="keep")
+        # Some encoders fall back to image.info (JPEG comments), so clear it as well
+        image.info = {key: value for key, value in image.info.items() if key not in METADATA_KEYS}
+        image.save(dest, original.format, **params)
+    return True
+
+
+def process_image(upload_folder, filename):
+    """Write all variants of one upload, none of them carrying its metadata. Runs in a worker process."""
+    source = os.path.join(upload_folder, filename)
+    out_dir = variant_dir(upload_folder, filename)
+    os.makedirs(out_dir, exist_ok=True)
+
+    with Image.open(source) as original:
+        original.load()
+        # Bake the EXIF orientation into the pixels, then drop EXIF (GPS, camera serials)
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    fallback_ext = fallback_extension(filename)
+    written = []
+    for variant, max_edge in VARIANTS.items():
+        resized = image.copy()
+        if max_edge is not None:
+            resized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        for ext, _, fmt, params in supported_formats():
+            path = os.path.join(out_dir, f"{variant}.{ext}")
+            _save_atomic(resized, path, fmt, **params)
+            written.append(path)
+
+        path = os.path.join(out_dir, f"{variant}.{fallback_ext}")
+        if fallback_ext == "jpg":
+            _save_atomic(resized.convert("RGB"), path, "JPEG", quality=85, optimize=True, progressive=True)
+        else:
+            _save_atomic(resized, path, "PNG", optimize=True)
+        written.append(path)
+
+    return written
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2))
+        return _executor
+
+
+def _on_done(filename, on_ready):
+    def callback(future):
+        error = future.exception()
+        if error is not None:
+            print(f"⚠️  Image processing failed for '{filename}': {error}")
+        elif on_ready is not None:
+            on_ready(filename)
+    return callback
+
+
+def submit(upload_folder, filenames, on_ready=None):
+    """Queue uploads for processing and return immediately.
+
+    on_ready(filename) is called from a pool thread once an upload's variants exist.
+    """
+    if Image is None:
+        return
+    executor = _get_executor()
+    for filename in filenames:
+        future = executor.submit(process_image, upload_folder, filename)
+        future.add_done_callback(_on_done(filename, on_ready))
+
+
+def fingerprint(upload_folder, filename):
+    """Short token that changes whenever the bytes served for an upload's variants change.
+
+    The detail fallback is the last file process_image writes, so its mtime marks a
+    finished run; "0" means variants are still pending and the original is served.
+    """
+    marker = os.path.join(variant_dir(upload_folder, filename), f"detail.{fallback_extension(filename)}")
+    try:
+        return format(os.stat(marker).st_mtime_ns // 1_000_000, "x")
+    except OSError:
+        return "0"
+
+
+def best_variant_path(upload_folder, filename, variant, accepted_types):
+    """Pick the best ready file for a variant given the image types the client accepts.
+
+    accepted_types holds the media types the Accept header names explicitly with q > 0.
+    Returns (path, mimetype); falls back to the (already metadata-free) original upload
+    while variants are pending.
+    """
+    out_dir = variant_dir(upload_folder, filename)
+    for ext, mimetype, _, _ in MODERN_FORMATS:
+        if mimetype in accepted_types:
+            path = os.path.join(out_dir, f"{variant}.{ext}")
+            if os.path.exists(path):
+                return path, mimetype
+
+    ext = fallback_extension(filename)
+    path = os.path.join(out_dir, f"{variant}.{ext}")
+    if os.path.exists(path):
+        return path, "image/png" if ext == "png" else "image/jpeg"
+
+    return os.path.join(upload_folder, filename), None
+
+
+def delete_variants(upload_folder, filename):
+    """Remove all generated variants for an upload (best effort)"""
+    out_dir = variant_dir(upload_folder, filename)
+    if not os.path.isdir(out_dir):
+        return
+    for entry in os.scandir(out_dir):
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+    try:
+        os.rmdir(out_dir)
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    # Backfill variants for uploads that predate the pipeline:  python image_pipeline.py [upload_folder]
+    import sys
+
+    if Image is None:
+        sys.exit("Pillow is not installed")
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "static", "uploads")
+    pending = [
+        entry.name for entry in os.scandir(folder)
+        if entry.is_file() and not os.path.isdir(variant_dir(folder, entry.name))
+    ]
+    with ProcessPoolExecutor() as pool:
+        for name, _ in zip(pending, pool.map(process_image, [folder] * len(pending), pending)):
+            print(f"processed {name}")
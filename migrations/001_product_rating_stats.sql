@@ -0,0 +1,20 @@
+-- Running rating totals per product, kept up to date by submit_review.
+-- Lets rating lookups read one row instead of aggregating `reviews`.
+
+CREATE TABLE IF NOT EXISTS `product_rating_stats` (
+  `product_id` int(11) NOT NULL,
+  `rating_sum` int(11) NOT NULL DEFAULT 0,
+  `rating_count` int(11) NOT NULL DEFAULT 0,
+  `updated_at` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  PRIMARY KEY (`product_id`),
+  CONSTRAINT `product_rating_stats_ibfk_1` FOREIGN KEY (`product_id`) REFERENCES `products` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Backfill from existing reviews
+INSERT INTO `product_rating_stats` (`product_id`, `rating_sum`, `rating_count`)
+SELECT `product_id`, SUM(`rating`), COUNT(*)
+FROM `reviews`
+GROUP BY `product_id`
+ON DUPLICATE KEY UPDATE
+  `rating_sum` = VALUES(`rating_sum`),
+  `rating_count` = VALUES(`rating_count`);
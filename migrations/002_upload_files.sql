@@ -0,0 +1,24 @@
+-- Reference counts for content-addressed uploads in static/uploads.
+-- One reference per product_images row or products.image_url naming the file;
+-- the file is deleted when its count drops to zero.
+
+CREATE TABLE IF NOT EXISTS `upload_files` (
+  `filename` varchar(255) NOT NULL,
+  `ref_count` int(11) NOT NULL DEFAULT 0,
+  `created_at` timestamp NOT NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`filename`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+ALTER TABLE `product_images`
+  ADD INDEX IF NOT EXISTS `idx_product_images_filename` (`image_filename`);
+
+-- Backfill from existing references (uuid-named files keep their names)
+INSERT INTO `upload_files` (`filename`, `ref_count`)
+SELECT `filename`, COUNT(*)
+FROM (
+  SELECT `image_filename` AS `filename` FROM `product_images`
+  UNION ALL
+  SELECT `image_url` FROM `products` WHERE `image_url` IS NOT NULL AND `image_url` <> ''
+) AS refs
+GROUP BY `filename`
+ON DUPLICATE KEY UPDATE `ref_count` = VALUES(`ref_count`);
@@ -0,0 +1,5 @@
+-- Lets the orphaned-upload GC (upload_gc.py) look up image_url references by IN-list
+-- instead of scanning products once per batch.
+
+ALTER TABLE `products`
+  ADD INDEX IF NOT EXISTS `idx_products_image_url` (`image_url`);
@@ -0,0 +1,16 @@
+-- Counter that order_numbers.OrderNumberAllocator reserves blocks from.
+-- New order numbers start at 1000000 (plus a check digit), clear of the six-digit
+-- random numbers issued before.
+
+CREATE TABLE IF NOT EXISTS `order_number_blocks` (
+  `id` tinyint(4) NOT NULL,
+  `next_value` bigint(20) NOT NULL,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+INSERT IGNORE INTO `order_number_blocks` (`id`, `next_value`) VALUES (1, 1000000);
+
+-- Safety net; older databases may predate this key. If it fails, find duplicates with:
+--   SELECT order_number, COUNT(*) FROM orders GROUP BY order_number HAVING COUNT(*) > 1;
+ALTER TABLE `orders`
+  ADD UNIQUE INDEX IF NOT EXISTS `order_number` (`order_number`);
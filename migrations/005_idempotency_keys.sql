@@ -0,0 +1,15 @@
+-- Responses remembered per Idempotency-Key (see idempotency.py).
+-- expires_at is the lease while a request is in progress and the TTL once it is done.
+
+CREATE TABLE IF NOT EXISTS `idempotency_keys` (
+  `scope` varchar(64) NOT NULL,
+  `idem_key` varchar(255) NOT NULL,
+  `fingerprint` char(64) NOT NULL,
+  `state` enum('in_progress','done') NOT NULL DEFAULT 'in_progress',
+  `response_status` smallint(6) DEFAULT NULL,
+  `response_body` mediumtext DEFAULT NULL,
+  `created_at` timestamp NOT NULL DEFAULT current_timestamp(),
+  `expires_at` datetime NOT NULL,
+  PRIMARY KEY (`scope`, `idem_key`),
+  KEY `idx_idempotency_keys_expires_at` (`expires_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,8 @@
+-- Keyset pagination and filters for /api/admin/orders: pages walk (created_at, id)
+-- newest first, and the status / payment_method filters and status counts can range
+-- over their own indexes instead of scanning every order.
+
+ALTER TABLE `orders`
+  ADD INDEX IF NOT EXISTS `idx_orders_created` (`created_at`, `id`),
+  ADD INDEX IF NOT EXISTS `idx_orders_status_created` (`status`, `created_at`, `id`),
+  ADD INDEX IF NOT EXISTS `idx_orders_payment_created` (`payment_method`, `created_at`, `id`);
@@ -0,0 +1,7 @@
+-- User order history (/api/orders/<user_id>): pages walk (user_id, created_at, id), and
+-- the ETag validator (count, latest updated_at, status hash) is answered from the
+-- second index alone.
+
+ALTER TABLE `orders`
+  ADD INDEX IF NOT EXISTS `idx_orders_user_created` (`user_id`, `created_at`, `id`),
+  ADD INDEX IF NOT EXISTS `idx_orders_user_updated` (`user_id`, `updated_at`, `status`);
@@ -0,0 +1,14 @@
+-- Denormalized read fields, so order and suggestion queries are plain joins:
+--   products.primary_image  first product_images file (or image_url), kept by the product writes
+--   orders.items_summary    "Name x2, Other x1" snapshot written once by create_order
+--
+-- Both columns are appended, which MariaDB 10.3+ does instantly without a table copy.
+-- Existing rows are filled afterwards in small committed batches:
+--
+--     python backfill_denormalized.py
+
+ALTER TABLE `products`
+  ADD COLUMN IF NOT EXISTS `primary_image` varchar(255) DEFAULT NULL;
+
+ALTER TABLE `orders`
+  ADD COLUMN IF NOT EXISTS `items_summary` text DEFAULT NULL;
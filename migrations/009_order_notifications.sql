@@ -0,0 +1,17 @@
+-- Admin new-order notifications.
+-- /api/admin/orders/new now filters on notification = 'new' (the column's collation is
+-- case-insensitive) instead of LOWER(notification), so this index serves it.
+-- order_events is the relay used by ORDER_EVENTS_BROKER=database (see order_events.py);
+-- rows are read by id and purged after an hour.
+
+ALTER TABLE `orders`
+  ADD INDEX IF NOT EXISTS `idx_orders_notification` (`notification`, `created_at`);
+
+CREATE TABLE IF NOT EXISTS `order_events` (
+  `id` bigint(20) NOT NULL AUTO_INCREMENT,
+  `event_type` varchar(64) NOT NULL,
+  `payload` text NOT NULL,
+  `created_at` timestamp NOT NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`id`),
+  KEY `idx_order_events_created_at` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,12 @@
+-- Catalog version shared by all worker processes (see catalog_cache.SharedCatalogVersion).
+-- Workers bump it after catalog writes and poll it every CATALOG_VERSION_CHECK_SECONDS
+-- to drop cached responses and in-memory indexes that another worker made stale.
+
+CREATE TABLE IF NOT EXISTS `catalog_version` (
+  `id` tinyint(4) NOT NULL,
+  `version` bigint(20) NOT NULL DEFAULT 0,
+  `index_version` bigint(20) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+INSERT IGNORE INTO `catalog_version` (`id`, `version`, `index_version`) VALUES (1, 0, 0);
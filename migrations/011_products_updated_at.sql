@@ -0,0 +1,10 @@
+-- products.updated_at moves on every write to a product row, including the stock
+-- decrement at checkout. Worker processes read the recently changed ids (see
+-- catalog_cache.SharedCatalogVersion) to drop cached responses for just those
+-- products, instead of bumping the shared catalog version on every order.
+--
+-- Appended column plus an index; existing rows start at the migration time.
+
+ALTER TABLE `products`
+  ADD COLUMN IF NOT EXISTS `updated_at` timestamp(6) NOT NULL DEFAULT current_timestamp(6) ON UPDATE current_timestamp(6),
+  ADD INDEX IF NOT EXISTS `idx_products_updated_at` (`updated_at`);
@@ -0,0 +1,7 @@
+-- A user's order history filtered by status (/api/orders/<user_id>?status=): each
+-- status is read as its own (user_id, status, created_at, id) range, newest first, and
+-- the per-status runs are merged in the app (see fetch_orders_newest_first), so no
+-- filesort is needed. The admin listing does the same over idx_orders_status_created.
+
+ALTER TABLE `orders`
+  ADD INDEX IF NOT EXISTS `idx_orders_user_status_created` (`user_id`, `status`, `created_at`, `id`);
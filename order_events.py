@@ -0,0 +1,206 @@
+# order_events.py
+"""New-order notifications pushed to admin browsers.
+
+Every open admin tab holds a Server-Sent Events stream (/api/admin/orders/stream) that
+reads from a subscription on the process's OrderEventHub, so nothing polls the orders
+table. create_order publishes through a broker after its transaction commits; the
+broker decides how the event reaches the hubs:
+
+  LocalBroker     one process (app.run, a single worker): publish hands the event
+                  straight to the hub.
+  DatabaseBroker  several worker processes: publish appends a row to order_events, and
+                  each process with open streams runs one poller thread that reads new
+                  rows by primary key and feeds its hub. A stand-in for a real pub/sub
+                  server that needs nothing beyond the database.
+
+Ids are allocated at INSERT but become visible at COMMIT, so a lower id can show up
+after a higher one. The poller remembers the ids it skipped over and asks for them
+again for GAP_TIMEOUT_SECONDS, delivering each event once whenever it appears; an id
+that never shows up (a rolled-back insert) is then forgotten.
+
+Events are best effort: a client that reconnects, or falls behind, re-reads the
+current list from /api/admin/orders/new.
+"""
+import itertools
+import json
+import queue
+import threading
+import time
+
+SUBSCRIBER_QUEUE_SIZE = 100
+RESYNC = "resync"
+GAP_TIMEOUT_SECONDS = 5.0
+MAX_TRACKED_GAPS = 1000
+
+
+class Subscription:
+    def __init__(self, hub):
+        self._hub = hub
+        self._queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def offer(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # A stalled client: drop its backlog and have it reload the list instead
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._queue.put_nowait({"id": event["id"], "type": RESYNC, "data": {}})
+
+    def get(self, timeout):
+        """Next event, or None if none arrived within timeout seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._hub.unsubscribe(self)
+
+
+class OrderEventHub:
+    """In-process fan-out of events to every open subscription"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self):
+        subscription = Subscription(self)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.offer(event)
+
+
+class LocalBroker:
+    def __init__(self, hub):
+        self.hub = hub
+        self._ids = itertools.count(1)
+
+    def start(self):
+        pass
+
+    def publish(self, event_type, data):
+        self.hub.dispatch({"id": next(self._ids), "type": event_type, "data": data})
+
+
+class DatabaseBroker:
+    """Relays events between worker processes through the order_events table"""
+
+    def __init__(self, hub, get_connection, poll_interval=1.0, retention_seconds=3600, purge_interval=300):
+        self.hub = hub
+        self.get_connection = get_connection
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _connect(self):
+        conn = self.get_connection()
+        if conn is None:
+            raise RuntimeError("DB connection failed")
+        return conn
+
+    def publish(self, event_type, data):
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO order_events (event_type, payload) VALUES (%s, %s)",
+                (event_type, json.dumps(data, default=str)),
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def start(self):
+        """Start this process's poller; called when a stream opens, so idle workers never poll"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="order-events", daemon=True)
+            self._thread.start()
+
+    def _read(self, cursor, last_id, gaps):
+        """Rows after last_id, plus any of the skipped ids that have committed since"""
+        sql = "SELECT id, event_type, payload FROM order_events WHERE id > %s"
+        params = [last_id]
+        if gaps:
+            sql += f" OR id IN ({','.join(['%s'] * len(gaps))})"
+            params.extend(sorted(gaps))
+        cursor.execute(sql + " ORDER BY id LIMIT 500", params)
+        return cursor.fetchall()
+
+    def _run(self):
+        last_id = None
+        gaps = {}  # skipped id -> when it was first skipped
+        last_purge = 0.0
+        while True:
+            if len(self.hub) == 0:
+                # Nobody listening in this process. Events published meanwhile went to no
+                # one here, so the next stream starts from the newest event, not a replay
+                last_id = None
+                gaps.clear()
+                time.sleep(self.poll_interval)
+                continue
+            try:
+                now = time.monotonic()
+                for gap_id, skipped_at in list(gaps.items()):
+                    if now - skipped_at > GAP_TIMEOUT_SECONDS:
+                        del gaps[gap_id]
+                conn = self._connect()
+                cursor = conn.cursor()
+                try:
+                    if last_id is None:
+                        # Only events published from the first subscriber on
+                        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM order_events")
+                        last_id = cursor.fetchone()[0]
+                    rows = self._read(cursor, last_id, gaps)
+                    if now - last_purge >= self.purge_interval:
+                        last_purge = now
+                        cursor.execute(
+                            "DELETE FROM order_events WHERE created_at < NOW() - INTERVAL %s SECOND LIMIT 1000",
+                            (self.retention_seconds,),
+                        )
+                    conn.commit()
+                finally:
+                    cursor.close()
+                    conn.close()
+                for event_id, event_type, payload in rows:
+                    if event_id <= last_id:
+                        if gaps.pop(event_id, None) is None:
+                            continue  # already delivered
+                    else:
+                        for skipped in range(max(last_id + 1, event_id - MAX_TRACKED_GAPS), event_id):
+                            gaps[skipped] = now
+                        last_id = event_id
+                    self.hub.dispatch({"id": event_id, "type": event_type, "data": json.loads(payload)})
+                while len(gaps) > MAX_TRACKED_GAPS:
+                    del gaps[min(gaps)]
+            except Exception as e:
+                print(f"⚠️  Order event poll failed: {e}")
+            time.sleep(self.poll_interval)
+
+
+def sse_message(event):
+    """Format an event for a text/event-stream response"""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
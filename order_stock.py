@@ -0,0 +1,115 @@
+# order_stock.py
+"""Stock reservation for checkout.
+
+All cart lines are checked and decremented by one conditional multi-row UPDATE: a
+product's row only changes if its stock covers the requested quantity, and InnoDB
+row locks serialize concurrent checkouts on the same product, so stock can never go
+negative. If any product falls short the caller rolls back and reports the shortages.
+
+Rows are requested in product id order so two carts holding the same products lock
+them in the same order; a deadlock or lock wait timeout that happens anyway is retried
+once and then reported as StockBusy.
+"""
+from collections import OrderedDict
+
+# MySQL/MariaDB error numbers: the transaction can simply be run again
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_LOCK_DEADLOCK = 1213
+LOCK_CONFLICT_ERRORS = (ER_LOCK_WAIT_TIMEOUT, ER_LOCK_DEADLOCK)
+
+
+class CartError(ValueError):
+    pass
+
+
+class StockBusy(RuntimeError):
+    """Stock rows stayed locked by concurrent checkouts; the client should retry"""
+
+
+def aggregate_quantities(cart_items):
+    """Total quantity per product id, in first-seen order (one cart can list a product
+    once per color/size)"""
+    quantities = OrderedDict()
+    for item in cart_items:
+        try:
+            product_id = int(item["id"])
+            quantity = int(item["quantity"])
+        except (KeyError, TypeError, ValueError):
+            raise CartError(f"Invalid cart item: {item}")
+        if quantity <= 0:
+            raise CartError(f"Quantity for product {product_id} must be positive")
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+def _decrement(cursor, quantities):
+    requested = " UNION ALL ".join(["SELECT %s AS product_id, %s AS quantity"] * len(quantities))
+    params = [value for pair in sorted(quantities.items()) for value in pair]
+    cursor.execute(f"""
+        UPDATE products p
+        JOIN ({requested}) req ON req.product_id = p.id
+        SET p.stock_quantity = p.stock_quantity - req.quantity
+        WHERE p.stock_quantity >= req.quantity
+    """, params)
+    return cursor.rowcount == len(quantities)
+
+
+def _shortages(cursor, quantities):
+    placeholders = ",".join(["%s"] * len(quantities))
+    cursor.execute(
+        f"SELECT id, name, stock_quantity FROM products WHERE id IN ({placeholders})",
+        list(quantities),
+    )
+    found = {row[0]: (row[1], row[2] or 0) for row in cursor.fetchall()}
+
+    shortages = []
+    for product_id, quantity in quantities.items():
+        name, available = found.get(product_id, (None, 0))
+        if available < quantity:
+            shortages.append({
+                "product_id": product_id,
+                "name": name,
+                "requested": quantity,
+                "available": max(available, 0),
+            })
+    return shortages
+
+
+def _decrement_with_retry(conn, cursor, quantities):
+    for retry in (True, False):
+        try:
+            return _decrement(cursor, quantities)
+        except Exception as e:
+            if getattr(e, "errno", None) not in LOCK_CONFLICT_ERRORS:
+                raise
+            # A deadlock already rolled the transaction back; a lock wait timeout only
+            # the statement, so roll back explicitly before trying again
+            conn.rollback()
+            if not retry:
+                raise StockBusy("Stock is being updated by other checkouts") from e
+
+
+def reserve_stock(conn, cursor, quantities, attempts=3):
+    """Decrement stock for every product in one conditional UPDATE.
+
+    Call first in the order transaction. Returns a list of shortages
+    ({product_id, name, requested, available}); an empty list means every product was
+    decremented. On shortages the transaction has already been rolled back. Raises
+    StockBusy (also rolled back) if lock conflicts persist after one retry.
+    """
+    if not quantities:
+        return []
+
+    shortages = []
+    for _ in range(attempts):
+        if _decrement_with_retry(conn, cursor, quantities):
+            return []
+        # Undo the rows that did change, then report against current stock
+        conn.rollback()
+        shortages = _shortages(cursor, quantities)
+        if shortages:
+            return shortages
+        # Stock was replenished between the two statements; try again
+
+    return [{"product_id": product_id, "name": None, "requested": quantity, "available": None}
+            for product_id, quantity in quantities.items()]
@@ -0,0 +1,99 @@
+# pricing.py
+"""Server-side cart pricing.
+
+Prices, discounts and stock for every product in the cart are read in one query and
+all totals are computed in Decimal, rounded to cents once per line and once for tax,
+so the client never supplies a price the order relies on.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from order_stock import aggregate_quantities
+
+VAT_RATE = Decimal("0.16")
+CENTS = Decimal("0.01")
+HUNDRED = Decimal(100)
+
+
+def to_cents(value):
+    return value.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def unit_price(price, discount):
+    """Price after a percentage discount, rounded to cents"""
+    price = Decimal(price or 0)
+    discount = Decimal(discount or 0)
+    if discount <= 0:
+        return to_cents(price)
+    return to_cents(price * (HUNDRED - min(discount, HUNDRED)) / HUNDRED)
+
+
+def load_products(cursor, product_ids):
+    placeholders = ",".join(["%s"] * len(product_ids))
+    cursor.execute(f"""
+        SELECT id, name, price, discount, stock_quantity
+        FROM products
+        WHERE id IN ({placeholders}) AND status = 'active'
+    """, list(product_ids))
+    return {row[0]: row for row in cursor.fetchall()}
+
+
+def quote_cart(cursor, cart_items):
+    """Price a cart given as [{id, quantity}, ...]; repeated products are merged.
+
+    Raises order_stock.CartError for malformed items. Returns a dict with one line per
+    product, the subtotal, VAT and total, and the ids of products that are missing,
+    inactive or short on stock.
+    """
+    quantities = aggregate_quantities(cart_items)
+    products = load_products(cursor, quantities) if quantities else {}
+
+    lines = []
+    unavailable = []
+    subtotal = Decimal(0)
+    for product_id, quantity in quantities.items():
+        row = products.get(product_id)
+        if row is None:
+            unavailable.append({"product_id": product_id, "reason": "not_found"})
+            continue
+
+        _, name, price, discount, stock = row
+        price_each = unit_price(price, discount)
+        line_total = price_each * quantity
+        subtotal += line_total
+        in_stock = (stock or 0) >= quantity
+        if not in_stock:
+            unavailable.append({"product_id": product_id, "reason": "insufficient_stock",
+                                "requested": quantity, "available": max(stock or 0, 0)})
+        lines.append({
+            "product_id": product_id,
+            "name": name,
+            "quantity": quantity,
+            "list_price": to_cents(Decimal(price or 0)),
+            "discount": Decimal(discount or 0),
+            "unit_price": price_each,
+            "line_total": line_total,
+            "in_stock": in_stock,
+        })
+
+    tax = to_cents(subtotal * VAT_RATE)
+    return {
+        "lines": lines,
+        "subtotal": subtotal,
+        "tax": tax,
+        "total": subtotal + tax,
+        "vat_rate": VAT_RATE,
+        "unavailable": unavailable,
+    }
+
+
+def quote_to_json(quote):
+    """Decimals to floats for API responses (every amount is already whole cents)"""
+    def convert(value):
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, dict):
+            return {k: convert(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [convert(v) for v in value]
+        return value
+    return convert(quote)
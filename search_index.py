@@ -0,0 +1,272 @@
+# search_index.py
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+    "is", "it", "of", "on", "or", "the", "to", "with",
+}
+
+# Matches in the name count more than matches in the description
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "brand": 2.0,
+    "category_name": 2.0,
+    "description": 1.0,
+}
+
+
+VOWELS = frozenset("aeiouy")
+
+
+# --- Tokenizing ---
+def _keeps_word(base):
+    """Only strip a verb suffix if what remains still looks like a word ('string' is not 'str')"""
+    return len(base) >= 3 and any(ch in VOWELS for ch in base)
+
+
+def stem(token):
+    """Light suffix stripping so 'laptops', 'charges', 'charging' and 'charged' match their base word"""
+    if len(token) <= 3 or token.isdigit():
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith("sses"):
+        return token[:-2]
+    if token.endswith("ing") and _keeps_word(token[:-3]):
+        return token[:-3]
+    # 'speed', 'need': the -ed is part of the word
+    if token.endswith("ed") and not token.endswith("eed") and _keeps_word(token[:-2]):
+        return token[:-2]
+    if token.endswith("es") and token[-3] in "sxz":
+        return token[:-2]
+    if token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+    # 'charge' goes where 'charging' and 'charged' went; 'free' keeps its e
+    if token.endswith("e") and not token.endswith("ee") and _keeps_word(token[:-1]):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [stem(t) for t in TOKEN_RE.findall(str(text).lower()) if t not in STOP_WORDS]
+
+
+# --- Inverted index ---
+class ProductSearchIndex:
+    """In-memory inverted index over active products, ranked with BM25.
+
+    Each product is a dict with id, name, description, brand and category_name.
+    Writers call upsert()/remove() so the index stays current without a rebuild.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)  # term -> {product_id: weighted tf}
+        self._doc_terms = {}                # product_id -> {term: weighted tf}
+        self._doc_lengths = {}              # product_id -> weighted length
+        self._total_length = 0.0
+        self._sorted_terms = []
+        self._terms_dirty = False
+        self.built = False
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def rebuild(self, products):
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._doc_terms = {}
+            self._doc_lengths = {}
+            self._total_length = 0.0
+            for product in products:
+                self._add(product)
+            self._terms_dirty = True
+            self.built = True
+
+    def upsert(self, product):
+        with self._lock:
+            self._remove(product["id"])
+            self._add(product)
+            self._terms_dirty = True
+
+    def remove(self, product_id):
+        with self._lock:
+            if self._remove(product_id):
+                self._terms_dirty = True
+
+    def _add(self, product):
+        weighted = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(product.get(field)):
+                weighted[term] += weight
+        if not weighted:
+            return
+
+        product_id = product["id"]
+        for term, tf in weighted.items():
+            self._postings[term][product_id] = tf
+        self._doc_terms[product_id] = dict(weighted)
+        length = sum(weighted.values())
+        self._doc_lengths[product_id] = length
+        self._total_length += length
+
+    def _remove(self, product_id):
+        terms = self._doc_terms.pop(product_id, None)
+        if terms is None:
+            return False
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(product_id)
+        return True
+
+    def _expand_prefix(self, prefix):
+        """All indexed terms starting with prefix, so partially typed words still match"""
+        if self._terms_dirty:
+            self._sorted_terms = sorted(self._postings)
+            self._terms_dirty = False
+        start = bisect_left(self._sorted_terms, prefix)
+        matches = []
+        for term in self._sorted_terms[start:]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def search(self, query, limit=None):
+        """Return product ids matching every query word, best BM25 score first.
+
+        The last word is treated as a prefix so results keep up while the user is typing.
+        """
+        raw_words = [t for t in TOKEN_RE.findall(str(query).lower()) if t not in STOP_WORDS]
+        if not raw_words:
+            return []
+
+        with self._lock:
+            doc_count = len(self._doc_terms)
+            if doc_count == 0:
+                return []
+            avg_length = self._total_length / doc_count
+            lengths = self._doc_lengths
+            k1_plus_one = self.k1 + 1
+            norm_base = self.k1 * (1 - self.b)
+            norm_scale = self.k1 * self.b / avg_length
+
+            scores = None
+            for position, word in enumerate(raw_words):
+                if position == len(raw_words) - 1:
+                    terms = set(self._expand_prefix(word))
+                    terms.add(stem(word))
+                else:
+                    terms = {stem(word)}
+
+                word_scores = defaultdict(float)
+                for term in terms:
+                    postings = self._postings.get(term)
+                    if not postings:
+                        continue
+                    df = len(postings)
+                    idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                    for product_id, tf in postings.items():
+                        score = idf * tf * k1_plus_one / (tf + norm_base + norm_scale * lengths[product_id])
+                        # Keep the best-scoring expansion of a word rather than summing them
+                        if score > word_scores[product_id]:
+                            word_scores[product_id] = score
+
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {pid: s + word_scores[pid] for pid, s in scores.items() if pid in word_scores}
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [product_id for product_id, _ in ranked]
+
+
+# --- Autocomplete ---
+def normalize_phrase(text):
+    return " ".join(TOKEN_RE.findall(str(text or "").lower()))
+
+
+class PrefixSuggester:
+    """Sorted-array prefix index for autocomplete over product names, brands and categories.
+
+    Every word start of a phrase is a key, so 'mou' finds 'HP Wireless Mouse'. Matches are
+    ranked by popularity. Top-k lists for short prefixes, whose bisect ranges are the widest,
+    are precomputed at build time so every lookup only touches a handful of entries.
+    """
+
+    CACHED_PREFIX_LENGTH = 3
+
+    def __init__(self, k=8):
+        self.k = k
+        self._lock = threading.Lock()
+        self._entries = []
+        self._keys = []
+        self._refs = []
+        self._top_by_prefix = {}
+        self.built = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _rank(self, entry_index):
+        entry = self._entries[entry_index]
+        return (-entry.get("popularity", 0), entry["text"].lower(), entry_index)
+
+    def rebuild(self, entries):
+        entries = [e for e in entries if normalize_phrase(e.get("text"))]
+
+        keyed = []
+        for entry_index, entry in enumerate(entries):
+            words = normalize_phrase(entry["text"]).split(" ")
+            for start in range(len(words)):
+                keyed.append((" ".join(words[start:]), entry_index))
+        keyed.sort()
+
+        by_prefix = defaultdict(set)
+        for key, entry_index in keyed:
+            for length in range(1, min(len(key), self.CACHED_PREFIX_LENGTH) + 1):
+                by_prefix[key[:length]].add(entry_index)
+
+        with self._lock:
+            self._entries = entries
+            self._keys = [key for key, _ in keyed]
+            self._refs = [entry_index for _, entry_index in keyed]
+            self._top_by_prefix = {
+                prefix: sorted(indexes, key=self._rank)[:self.k]
+                for prefix, indexes in by_prefix.items()
+            }
+            self.built = True
+
+    def suggest(self, query, k=None):
+        k = k or self.k
+        prefix = normalize_phrase(query)
+        if not prefix:
+            return []
+
+        with self._lock:
+            if len(prefix) <= self.CACHED_PREFIX_LENGTH and k <= self.k:
+                top = self._top_by_prefix.get(prefix, [])[:k]
+            else:
+                lo = bisect_left(self._keys, prefix)
+                hi = bisect_left(self._keys, prefix + "\uffff", lo)
+                top = sorted(set(self._refs[lo:hi]), key=self._rank)[:k]
+            entries = self._entries
+            return [{key: value for key, value in entries[i].items() if key != "popularity"} for i in top]
@@ -0,0 +1,127 @@
+# strip_upload_metadata.py
+"""Strip metadata from uploads stored before add_product/update_product did it.
+
+New uploads lose their EXIF (GPS position, camera serials), XMP and comments before they
+are named (see image_pipeline.strip_metadata). Older files in static/uploads still carry
+theirs and are served as-is at /static/uploads/<name>. For each such file this writes the
+clean copy under its own content name, repoints every column that references the old
+name and moves its upload_files reference count in one transaction, then deletes the
+old file and its variants and builds variants for the new one. Finally the shared
+catalog version is bumped so running workers drop responses that embed the old names.
+
+    python strip_upload_metadata.py --dry-run
+    python strip_upload_metadata.py [--upload-folder static/uploads]
+"""
+import argparse
+import json
+import os
+import sys
+
+import image_pipeline
+import upload_store
+from catalog_io import DEFAULT_UPLOAD_FOLDER, connect
+from upload_gc import available_sources, is_managed
+
+# Denormalized copies of an upload name that the garbage collector need not check
+EXTRA_SOURCES = [("products", "primary_image")]
+
+
+def repoint(conn, sources, old_name, new_name):
+    """Move every reference from old_name to new_name, reference count included"""
+    cursor = conn.cursor()
+    try:
+        for table, column in sources:
+            cursor.execute(f"UPDATE `{table}` SET `{column}` = %s WHERE `{column}` = %s", (new_name, old_name))
+        cursor.execute("SELECT ref_count FROM upload_files WHERE filename = %s FOR UPDATE", (old_name,))
+        row = cursor.fetchone()
+        if row is not None:
+            cursor.execute("""
+                INSERT INTO upload_files (filename, ref_count) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE ref_count = ref_count + VALUES(ref_count)
+            """, (new_name, row[0]))
+            cursor.execute("DELETE FROM upload_files WHERE filename = %s", (old_name,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def strip_folder(conn, upload_folder, dry_run=True):
+    cursor = conn.cursor()
+    try:
+        sources = available_sources(cursor) + EXTRA_SOURCES
+    finally:
+        cursor.close()
+
+    summary = {"scanned": 0, "stripped": 0, "failed": 0, "dry_run": dry_run}
+    names = []
+    with os.scandir(upload_folder) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and is_managed(entry.name) \
+                    and not entry.name.startswith(upload_store.INCOMING_PREFIX):
+                names.append(entry.name)
+
+    for old_name in names:
+        summary["scanned"] += 1
+        old_path = os.path.join(upload_folder, old_name)
+        temp_path = upload_store.new_temp_path(upload_folder)
+        try:
+            if not image_pipeline.strip_metadata(old_path, temp_path):
+                continue
+            new_name = upload_store.content_filename(upload_store.hash_file(temp_path), old_name)
+            summary["stripped"] += 1
+            if dry_run:
+                print(f"would replace {old_name} -> {new_name}")
+                continue
+
+            new_path = os.path.join(upload_folder, new_name)
+            if os.path.exists(new_path):
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, new_path)
+            repoint(conn, sources, old_name, new_name)
+            os.remove(old_path)
+            image_pipeline.delete_variants(upload_folder, old_name)
+            if not os.path.isdir(image_pipeline.variant_dir(upload_folder, new_name)):
+                image_pipeline.process_image(upload_folder, new_name)
+            print(f"replaced {old_name} -> {new_name}")
+        except Exception as e:
+            summary["failed"] += 1
+            print(f"⚠️  {old_name}: {e}")
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    if summary["stripped"] and not dry_run:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "UPDATE catalog_version SET version = version + 1, index_version = index_version + 1 WHERE id = 1"
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--upload-folder", default=DEFAULT_UPLOAD_FOLDER)
+    parser.add_argument("--dry-run", action="store_true", help="only list the files that would change")
+    args = parser.parse_args(argv)
+
+    if not image_pipeline.available():
+        sys.exit("Pillow is not installed")
+    conn = connect()
+    try:
+        summary = strip_folder(conn, args.upload_folder, dry_run=args.dry_run)
+    finally:
+        conn.close()
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""catalog_io row validation: image filenames must be safe and already uploaded."""
+from catalog_io import UploadedFiles, validate_row
+
+LOOKUPS = {
+    "category": {"shoes": 1},
+    "colors": {"red": 10},
+    "sizes": {"42": 20},
+    "images": {"abc123.jpg", "def456.png"},
+}
+
+
+def make_row(**overrides):
+    row = {
+        "name": "Runner", "description": "Light shoe", "price": "49.90", "brand": "Acme",
+        "category": "Shoes", "colors": "Red", "sizes": "42", "images": "abc123.jpg|def456.png",
+    }
+    row.update(overrides)
+    return row
+
+
+def test_uploaded_images_are_accepted():
+    record, errors = validate_row(make_row(), LOOKUPS)
+    assert errors == []
+    assert record["images"] == ["abc123.jpg", "def456.png"]
+
+
+def test_unsafe_image_filenames_are_rejected():
+    for filename in ("../app.py", "sub/abc123.jpg", "bad name.jpg"):
+        record, errors = validate_row(make_row(images=filename), LOOKUPS)
+        assert record is None
+        assert errors == [f"invalid image filename '{filename}'"]
+
+
+def test_missing_images_are_rejected():
+    record, errors = validate_row(make_row(images=["abc123.jpg", "missing.jpg"]), LOOKUPS)
+    assert record is None
+    assert errors == ["image 'missing.jpg' is not in the uploads folder"]
+
+
+def test_uploaded_files_finds_files_only(tmp_path):
+    (tmp_path / "abc123.jpg").write_bytes(b"x")
+    (tmp_path / "variants").mkdir()
+    uploaded = UploadedFiles(tmp_path)
+    assert "abc123.jpg" in uploaded
+    assert "variants" not in uploaded
+    assert "missing.jpg" not in uploaded
+    assert "abc123.jpg" not in UploadedFiles(tmp_path / "absent")
+
+
+def test_rows_are_checked_against_the_folder(tmp_path):
+    (tmp_path / "abc123.jpg").write_bytes(b"x")
+    lookups = dict(LOOKUPS, images=UploadedFiles(tmp_path))
+    record, errors = validate_row(make_row(images="abc123.jpg|def456.png"), lookups)
+    assert record is None
+    assert errors == ["image 'def456.png' is not in the uploads folder"]
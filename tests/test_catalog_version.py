@@ -0,0 +1,147 @@
+"""SharedCatalogVersion between two processes' worth of instances over one fake row."""
+import threading
+from datetime import datetime, timedelta
+
+from catalog_cache import CatalogCache, SharedCatalogVersion
+
+
+class FakeRow:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = [0, 0]
+        self.now = datetime(2026, 1, 1)
+        self.products = {}  # id -> updated_at
+
+    def touch(self, product_id):
+        with self.lock:
+            self.now += timedelta(milliseconds=1)
+            self.products[product_id] = self.now
+
+
+class FakeCursor:
+    def __init__(self, row):
+        self.row = row
+        self.result = None
+
+    def execute(self, sql, params=()):
+        with self.row.lock:
+            if sql.startswith("UPDATE catalog_version"):
+                self.row.values[0] += 1
+                self.row.values[1] += params[0]
+            elif sql.startswith("SELECT NOW"):
+                self.result = [(self.row.now,)]
+            elif sql.startswith("SELECT id, updated_at FROM products"):
+                since = params[0] - timedelta(seconds=params[1])
+                self.result = [(pid, stamp) for pid, stamp in self.row.products.items() if stamp >= since]
+            else:
+                self.result = [tuple(self.row.values)]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return list(self.result)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, row):
+        self.row = row
+
+    def cursor(self):
+        return FakeCursor(self.row)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_pair():
+    row = FakeRow()
+    return (SharedCatalogVersion(lambda: FakeConnection(row), check_interval=0),
+            SharedCatalogVersion(lambda: FakeConnection(row), check_interval=0))
+
+
+def test_other_workers_writes_are_seen_and_own_writes_are_not():
+    a, b = make_pair()
+    assert a.poll() == (False, False, ())  # first look only records the counters
+    assert b.poll() == (False, False, ())
+
+    assert b.bump() == (False, False, ())
+    assert a.poll() == (True, False, ())  # stock/rating change: cache only
+    assert b.poll() == (False, False, ())
+
+    b.bump(index=True)
+    assert a.poll() == (True, True, ())   # product write: indexes too
+
+
+def test_bump_reports_a_concurrent_remote_change():
+    a, b = make_pair()
+    a.poll()
+    b.poll()
+    b.bump(index=True)
+    assert a.bump() == (True, True, ())
+
+
+def test_poll_is_rate_limited():
+    row = FakeRow()
+    a = SharedCatalogVersion(lambda: FakeConnection(row), check_interval=60)
+    b = SharedCatalogVersion(lambda: FakeConnection(row), check_interval=0)
+    a.poll()
+    b.bump()
+    assert a.poll() == (False, False, ())
+
+
+def test_bump_on_the_callers_connection_leaves_it_open():
+    row = FakeRow()
+    opened = []
+
+    def get_connection():
+        opened.append(True)
+        return FakeConnection(row)
+
+    closed = []
+    conn = FakeConnection(row)
+    conn.close = lambda: closed.append(True)
+    a = SharedCatalogVersion(get_connection, check_interval=0)
+    a.bump(conn=conn)
+    assert opened == [] and closed == []
+    assert row.values == [1, 0]
+
+
+def test_changed_products_are_reported_once_per_change():
+    row = FakeRow()
+    a = SharedCatalogVersion(lambda: FakeConnection(row), check_interval=0)
+    a.poll()
+    row.touch(7)
+    row.touch(9)
+    assert a.poll() == (False, False, (7, 9))
+    assert a.poll() == (False, False, ())  # still inside the lookback window
+    row.touch(7)
+    assert a.poll() == (False, False, (7,))
+
+
+def test_invalidate_products_drops_only_entries_embedding_them():
+    cache = CatalogCache()
+    cache.set("page-1", "a", cache.version, {1, 2})
+    cache.set("page-2", "b", cache.version, {3})
+    cache.set("colors", "c", cache.version)
+    assert cache.invalidate_products([2]) == 1
+    assert cache.get("page-1") is None
+    assert cache.get("page-2") == "b"
+    assert cache.get("colors") == "c"
+
+
+def test_response_built_across_a_product_change_is_not_cached():
+    cache = CatalogCache()
+    version, generation = cache.version, cache.product_generation
+    cache.invalidate_products([5])  # a checkout commits while the response is built
+    assert not cache.set("page-1", "stale", version, {5, 6}, generation)
+    assert cache.set("page-2", "fresh", version, {6}, generation)
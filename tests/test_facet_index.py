@@ -0,0 +1,24 @@
+"""ProductFacetIndex brand facet: brands compare like the suggester's, trimmed and lowercased."""
+from facet_index import ProductFacetIndex
+
+PRODUCTS = [
+    {"id": 1, "category_id": 1, "brand": "Acme", "price": 10, "discount": None},
+    {"id": 2, "category_id": 1, "brand": "acme ", "price": 20, "discount": None},
+    {"id": 3, "category_id": 2, "brand": "Zeta", "price": 30, "discount": None},
+]
+
+
+def build():
+    index = ProductFacetIndex()
+    index.rebuild(PRODUCTS, [], [], index.generation)
+    return index
+
+
+def test_brand_filter_ignores_case_and_spacing():
+    ids, _ = build().query({"brand": ["ACME"]})
+    assert ids == [1, 2]
+
+
+def test_brand_counts_merge_spellings_under_the_first_seen():
+    _, counts = build().query({}, with_counts=True)
+    assert counts["brand"] == {"Acme": 2, "Zeta": 1}
@@ -0,0 +1,142 @@
+"""IdempotencyStore against an in-memory stand-in for a small connection pool.
+
+The fake connection understands just the idempotency_keys statements the store issues.
+"""
+import threading
+import time
+
+import mysql.connector
+
+import idempotency
+from idempotency import IdempotencyStore
+
+
+class FakeTable:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = {}  # (scope, key) -> dict
+
+
+class FakeCursor:
+    def __init__(self, table):
+        self.table = table
+        self.result = None
+
+    def execute(self, sql, params=()):
+        time.sleep(0.002)  # long enough for polls to overlap
+        sql = " ".join(sql.split())
+        now = time.time()
+        with self.table.lock:
+            rows = self.table.rows
+            if sql.startswith("INSERT INTO idempotency_keys"):
+                scope, key, fingerprint, lease = params
+                if (scope, key) in rows:
+                    raise mysql.connector.IntegrityError("Duplicate entry")
+                rows[(scope, key)] = {"fingerprint": fingerprint, "state": "in_progress",
+                                      "status": None, "body": None, "expires": now + lease}
+            elif sql.startswith("SELECT fingerprint"):
+                row = rows.get(tuple(params))
+                self.result = None if row is None else (
+                    row["fingerprint"], row["state"], row["status"], row["body"], row["expires"] < now)
+            elif sql.startswith("UPDATE idempotency_keys SET state = 'done'"):
+                status, body, ttl, scope, key = params
+                rows[(scope, key)].update(state="done", status=status, body=body, expires=now + ttl)
+            elif sql.startswith("DELETE FROM idempotency_keys WHERE scope"):
+                row = rows.get(tuple(params[:2]))
+                if row is not None and ("expires_at < NOW()" not in sql or row["expires"] < now):
+                    del rows[tuple(params[:2])]
+            elif sql.startswith("DELETE FROM idempotency_keys WHERE expires_at"):
+                for k in [k for k, r in rows.items() if r["expires"] < now]:
+                    del rows[k]
+            else:
+                raise AssertionError(f"unexpected SQL: {sql}")
+
+    def fetchone(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return FakeCursor(self.pool.table)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.pool.release()
+
+
+class FakePool:
+    """Like get_db_connection over a pool of `size`: None when every connection is out"""
+
+    def __init__(self, size):
+        self.table = FakeTable()
+        self.lock = threading.Lock()
+        self.free = size
+        self.exhausted = 0
+
+    def get_connection(self):
+        with self.lock:
+            if self.free == 0:
+                self.exhausted += 1
+                return None
+            self.free -= 1
+        return FakeConnection(self)
+
+    def release(self):
+        with self.lock:
+            self.free += 1
+
+
+def test_concurrent_duplicates_do_not_exhaust_a_small_pool():
+    pool = FakePool(size=2)
+    store = IdempotencyStore(pool.get_connection, wait_seconds=5, poll_interval=0.01)
+
+    assert store.begin("orders", "k1", "fp") == (idempotency.NEW, None)
+
+    results = []
+    errors = []
+
+    def duplicate():
+        try:
+            results.append(store.begin("orders", "k1", "fp"))
+        except Exception as e:  # a pool miss surfaces as RuntimeError
+            errors.append(e)
+
+    waiters = [threading.Thread(target=duplicate) for _ in range(8)]
+    for thread in waiters:
+        thread.start()
+
+    # The original request still gets connections while its duplicates wait
+    time.sleep(0.1)
+    conn = pool.get_connection()
+    assert conn is not None
+    conn.close()
+    store.complete("orders", "k1", 201, '{"ok": true}')
+
+    for thread in waiters:
+        thread.join()
+
+    assert errors == []
+    assert pool.exhausted == 0
+    assert results == [(idempotency.REPLAY, (201, '{"ok": true}'))] * 8
+    assert pool.free == 2
+
+
+def test_waiter_gives_up_while_owner_is_still_running():
+    pool = FakePool(size=2)
+    store = IdempotencyStore(pool.get_connection, wait_seconds=0.05, poll_interval=0.01)
+
+    assert store.begin("stkpush", "k2", "fp")[0] == idempotency.NEW
+    assert store.begin("stkpush", "k2", "fp") == (idempotency.IN_PROGRESS, None)
+    assert store.begin("stkpush", "k2", "other") == (idempotency.MISMATCH, None)
+    assert pool.free == 2
@@ -0,0 +1,118 @@
+"""DatabaseBroker over a fake order_events table: streams start at the newest event and
+late-committing rows are delivered once."""
+import json
+import threading
+import time
+
+from order_events import DatabaseBroker, OrderEventHub
+
+
+class FakeTable:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = []  # (id, event_type, payload)
+        self.uncommitted = set()  # ids allocated by an insert that has not committed yet
+
+
+class FakeCursor:
+    def __init__(self, table):
+        self.table = table
+        self.result = []
+
+    def execute(self, sql, params=()):
+        with self.table.lock:
+            if sql.startswith("INSERT INTO order_events"):
+                self.table.rows.append((len(self.table.rows) + 1, *params))
+            elif sql.startswith("SELECT COALESCE(MAX(id)"):
+                self.result = [(len(self.table.rows),)]
+            elif sql.startswith("SELECT id, event_type"):
+                assert ("OR id IN" in sql) == (len(params) > 1)
+                self.result = [
+                    row for row in self.table.rows
+                    if row[0] not in self.table.uncommitted and (row[0] > params[0] or row[0] in params[1:])
+                ]
+            else:
+                self.result = []
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return list(self.result)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, table):
+        self.table = table
+
+    def cursor(self):
+        return FakeCursor(self.table)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_stream_after_idle_period_skips_events_published_while_idle():
+    table = FakeTable()
+    hub = OrderEventHub()
+    broker = DatabaseBroker(hub, lambda: FakeConnection(table), poll_interval=0.01)
+    broker.start()
+
+    first = hub.subscribe()
+    time.sleep(0.05)  # let the poller take its place
+    broker.publish("order_created", {"order_number": "1"})
+    event = first.get(timeout=2)
+    assert event["data"] == {"order_number": "1"}
+    first.close()
+
+    # Published while this process has no streams open
+    broker.publish("order_created", {"order_number": "2"})
+    broker.publish("order_created", {"order_number": "3"})
+    time.sleep(0.05)
+
+    second = hub.subscribe()
+    time.sleep(0.05)
+    broker.publish("order_created", {"order_number": "4"})
+    assert wait_for(lambda: len(table.rows) == 4)
+    event = second.get(timeout=2)
+    assert event["data"] == {"order_number": "4"}
+    assert second.get(timeout=0.05) is None
+    second.close()
+
+    assert [json.loads(row[2])["order_number"] for row in table.rows] == ["1", "2", "3", "4"]
+
+
+def test_event_committed_after_a_higher_id_is_delivered_once():
+    table = FakeTable()
+    hub = OrderEventHub()
+    broker = DatabaseBroker(hub, lambda: FakeConnection(table), poll_interval=0.01)
+    subscription = hub.subscribe()
+    broker.start()
+    time.sleep(0.05)
+
+    # id 1 is allocated first but its transaction commits after id 2's
+    table.uncommitted.add(1)
+    broker.publish("order_created", {"order_number": "slow"})
+    broker.publish("order_created", {"order_number": "fast"})
+    assert subscription.get(timeout=2)["data"] == {"order_number": "fast"}
+    time.sleep(0.05)
+
+    table.uncommitted.clear()
+    assert subscription.get(timeout=2)["data"] == {"order_number": "slow"}
+    assert subscription.get(timeout=0.1) is None
+    subscription.close()
@@ -0,0 +1,25 @@
+"""Order number check digits, and the legacy six-digit numbers that predate them."""
+from order_numbers import format_order_number, is_valid_order_number
+
+
+def test_issued_numbers_are_valid():
+    for value in (1000000, 1000001, 1234567, 99999999):
+        assert is_valid_order_number(format_order_number(value))
+
+
+def test_mistyped_numbers_are_rejected():
+    number = format_order_number(1234567)
+    wrong_digit = number[:-1] + str((int(number[-1]) + 1) % 10)
+    swapped = number[0] + number[2] + number[1] + number[3:]
+    assert not is_valid_order_number(wrong_digit)
+    assert not is_valid_order_number(swapped)
+
+
+def test_legacy_random_numbers_stay_valid():
+    assert is_valid_order_number("482913")
+    assert is_valid_order_number(100000)
+
+
+def test_malformed_numbers_are_rejected():
+    for value in ("", "12", "1234567", "012345", "48291a", "../1", "10000007x"):
+        assert not is_valid_order_number(value)
@@ -0,0 +1,149 @@
+"""order_stock.reserve_stock against a fake products table that honours the conditional UPDATE."""
+import threading
+
+import pytest
+
+import order_stock
+from order_stock import StockBusy, aggregate_quantities, reserve_stock
+
+
+class LockConflict(Exception):
+    def __init__(self, errno):
+        super().__init__(f"lock conflict {errno}")
+        self.errno = errno
+
+
+class FakeProducts:
+    """products rows; UPDATEs apply at once and are undone on rollback"""
+
+    def __init__(self, stock):
+        self.lock = threading.Lock()
+        self.stock = dict(stock)
+        self.statements = []
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+        self.result = []
+
+    def execute(self, sql, params=()):
+        table = self.conn.table
+        with table.lock:
+            table.statements.append((" ".join(sql.split()), list(params)))
+            if sql.lstrip().startswith("UPDATE products"):
+                if self.conn.failures:
+                    raise LockConflict(self.conn.failures.pop(0))
+                assert "WHERE p.stock_quantity >= req.quantity" in " ".join(sql.split())
+                pairs = list(zip(params[::2], params[1::2]))
+                self.rowcount = 0
+                for product_id, quantity in pairs:
+                    if table.stock.get(product_id, 0) >= quantity:
+                        table.stock[product_id] -= quantity
+                        self.conn.undo.append((product_id, quantity))
+                        self.rowcount += 1
+                if self.conn.after_update:
+                    self.conn.after_update()
+            else:
+                self.result = [(pid, f"product {pid}", table.stock[pid]) for pid in params if pid in table.stock]
+
+    def fetchall(self):
+        return list(self.result)
+
+
+class FakeConnection:
+    def __init__(self, table, failures=(), after_update=None):
+        self.table = table
+        self.undo = []
+        self.failures = list(failures)
+        self.after_update = after_update
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.undo.clear()
+
+    def rollback(self):
+        with self.table.lock:
+            for product_id, quantity in self.undo:
+                self.table.stock[product_id] += quantity
+        self.undo.clear()
+        self.rollbacks += 1
+
+
+def test_one_conditional_update_with_rows_in_id_order():
+    table = FakeProducts({1: 5, 2: 5, 3: 5})
+    conn = FakeConnection(table)
+    quantities = aggregate_quantities([{"id": 3, "quantity": 1}, {"id": 1, "quantity": 2}, {"id": 3, "quantity": 1}])
+
+    assert reserve_stock(conn, conn.cursor(), quantities) == []
+    assert len(table.statements) == 1
+    sql, params = table.statements[0]
+    assert sql.startswith("UPDATE products p JOIN")
+    assert params == [1, 2, 3, 2]
+    assert table.stock == {1: 3, 2: 5, 3: 3}
+
+
+def test_short_rowcount_rolls_back_the_rows_that_did_change():
+    table = FakeProducts({1: 5, 2: 1})
+    conn = FakeConnection(table)
+
+    shortages = reserve_stock(conn, conn.cursor(), {1: 2, 2: 3})
+
+    assert shortages == [{"product_id": 2, "name": "product 2", "requested": 3, "available": 1}]
+    assert table.stock == {1: 5, 2: 1}
+    assert conn.rollbacks == 1
+
+
+def test_stock_replenished_between_statements_is_retried():
+    table = FakeProducts({1: 5, 2: 0})
+    restock = iter([lambda: table.stock.update({2: 4})])
+    conn = FakeConnection(table, after_update=lambda: next(restock, lambda: None)())
+
+    assert reserve_stock(conn, conn.cursor(), {1: 1, 2: 1}) == []
+    assert table.stock == {1: 4, 2: 3}
+
+
+def test_a_deadlock_is_retried_once():
+    table = FakeProducts({1: 5})
+    conn = FakeConnection(table, failures=[order_stock.ER_LOCK_DEADLOCK])
+
+    assert reserve_stock(conn, conn.cursor(), {1: 1}) == []
+    assert table.stock == {1: 4}
+    assert conn.rollbacks == 1
+
+
+def test_repeated_lock_conflicts_raise_stock_busy():
+    table = FakeProducts({1: 5})
+    conn = FakeConnection(table, failures=[order_stock.ER_LOCK_WAIT_TIMEOUT, order_stock.ER_LOCK_DEADLOCK])
+
+    with pytest.raises(StockBusy):
+        reserve_stock(conn, conn.cursor(), {1: 1})
+    assert table.stock == {1: 5}
+
+
+def test_parallel_checkouts_never_oversell():
+    table = FakeProducts({1: 30, 2: 100})
+    sold = []
+    lock = threading.Lock()
+
+    def checkout():
+        conn = FakeConnection(table)
+        cursor = conn.cursor()
+        for _ in range(10):
+            if not reserve_stock(conn, cursor, {1: 2, 2: 1}):
+                conn.commit()
+                with lock:
+                    sold.append(1)
+
+    threads = [threading.Thread(target=checkout) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(sold) == 15
+    assert table.stock == {1: 0, 2: 85}
@@ -0,0 +1,17 @@
+"""search_index.stem: suffixes come off only where a real word remains."""
+from search_index import stem
+
+
+def test_plurals_and_verb_forms_share_a_stem():
+    assert stem("laptops") == stem("laptop") == "laptop"
+    assert stem("charge") == stem("charges") == stem("charging") == stem("charged") == "charg"
+    assert stem("size") == stem("sizes")
+    assert stem("batteries") == "battery"
+
+
+def test_words_that_only_look_suffixed_are_kept():
+    assert stem("speed") == "speed"
+    assert stem("speeds") == "speed"
+    assert stem("need") == "need"
+    assert stem("string") == "string"
+    assert stem("bring") == "bring"
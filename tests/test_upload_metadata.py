@@ -0,0 +1,61 @@
+"""Uploads lose their metadata before they are named, so the name hashes the stored bytes."""
+import hashlib
+import os
+
+import pytest
+
+import image_pipeline
+import upload_store
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def jpeg_with_gps(path):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees
+    exif[0x010F] = "CameraMaker"
+    exif[0x8825] = {1: "N", 2: (1.0, 17.0, 30.0)}
+    Image.new("RGB", (40, 20), "red").save(path, "JPEG", exif=exif, comment=b"private note")
+
+
+def test_persist_replaces_the_staged_file_with_a_clean_copy(tmp_path):
+    source = tmp_path / "incoming.jpg"
+    jpeg_with_gps(source)
+    staged = upload_store.StagedUpload(
+        upload_store.content_filename(upload_store.hash_file(source), "photo.jpg"), str(source), source.stat().st_size
+    )
+    original_name = staged.filename
+
+    upload_store.persist([staged], str(tmp_path), image_pipeline.strip_metadata)
+
+    assert staged.filename != original_name
+    assert not source.exists()
+    data = open(staged.temp_path, "rb").read()
+    assert staged.filename == hashlib.sha256(data).hexdigest() + ".jpg"
+    assert b"CameraMaker" not in data and b"private note" not in data
+    with Image.open(staged.temp_path) as clean:
+        assert clean.size == (20, 40)
+        assert not clean.getexif()
+
+
+def test_files_without_metadata_keep_their_name(tmp_path):
+    source = tmp_path / "incoming.png"
+    Image.new("RGBA", (8, 8)).save(source)
+    staged = upload_store.StagedUpload("same.png", str(source), source.stat().st_size)
+
+    upload_store.persist([staged], str(tmp_path), image_pipeline.strip_metadata)
+
+    assert staged.filename == "same.png"
+    assert staged.temp_path == str(source)
+    assert os.listdir(tmp_path) == ["incoming.png"]
+
+
+def test_a_chunked_sessions_data_is_left_for_its_cleanup(tmp_path):
+    source = tmp_path / "data"
+    jpeg_with_gps(source)
+    staged = upload_store.StagedUpload("x.jpg", str(source), source.stat().st_size, keep_on_discard=True)
+
+    upload_store.persist([staged], str(tmp_path), image_pipeline.strip_metadata)
+
+    assert source.exists()
+    assert staged.temp_path != str(source) and not staged.keep_on_discard
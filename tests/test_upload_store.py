@@ -0,0 +1,40 @@
+"""upload_store.place/unplace: a failed transaction leaves no new files behind."""
+import os
+
+import pytest
+
+import upload_store
+
+
+def staged_file(folder, name, data):
+    path = upload_store.new_temp_path(str(folder))
+    with open(path, "wb") as f:
+        f.write(data)
+    return upload_store.StagedUpload(name, path, len(data))
+
+
+def test_place_skips_content_that_is_already_stored(tmp_path):
+    (tmp_path / "old.jpg").write_bytes(b"old")
+    staged = [staged_file(tmp_path, "old.jpg", b"old"), staged_file(tmp_path, "new.jpg", b"new")]
+
+    assert upload_store.place(str(tmp_path), staged) == ["new.jpg"]
+    assert sorted(os.listdir(tmp_path)) == ["new.jpg", "old.jpg"]
+
+
+def test_unplace_removes_only_what_place_wrote(tmp_path):
+    (tmp_path / "old.jpg").write_bytes(b"old")
+    staged = [staged_file(tmp_path, "old.jpg", b"old"), staged_file(tmp_path, "new.jpg", b"new")]
+
+    upload_store.unplace(str(tmp_path), upload_store.place(str(tmp_path), staged))
+
+    assert os.listdir(tmp_path) == ["old.jpg"]
+
+
+def test_a_failing_place_takes_back_its_earlier_files(tmp_path):
+    first = staged_file(tmp_path, "first.jpg", b"1")
+    broken = upload_store.StagedUpload("second.jpg", str(tmp_path / "gone"), 1)
+
+    with pytest.raises(OSError):
+        upload_store.place(str(tmp_path), [first, broken])
+
+    assert os.listdir(tmp_path) == []
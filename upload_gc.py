@@ -0,0 +1,201 @@
+# upload_gc.py
+"""Garbage collection for files in static/uploads that nothing references.
+
+The uploads directory is streamed with os.scandir in fixed-size batches; each batch is
+checked against product_images, products.image_url (and blogs.blog_image when that
+table exists) with indexed IN-list lookups, so memory stays bounded by the batch size
+no matter how many files there are. Files younger than the grace period are never
+touched, which covers uploads whose transaction has not committed yet.
+
+    python upload_gc.py --dry-run
+    python upload_gc.py --grace-hours 48 --batch-size 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import chunked_upload
+import image_pipeline
+from catalog_io import connect
+from upload_store import INCOMING_PREFIX
+
+DEFAULT_GRACE_SECONDS = 24 * 60 * 60
+DEFAULT_BATCH_SIZE = 1000
+
+# (table, column) pairs that hold upload filenames
+REFERENCE_SOURCES = [
+    ("product_images", "image_filename"),
+    ("products", "image_url"),
+    ("blogs", "blog_image"),
+]
+
+
+def is_managed(name):
+    """Only files the upload code names are candidates; hand-placed assets are left alone"""
+    if name.startswith(INCOMING_PREFIX):
+        return True
+    stem, ext = os.path.splitext(name)
+    if not ext:
+        return False
+    # <sha256>.<ext> (content-addressed)
+    if len(stem) == 64 and all(c in "0123456789abcdef" for c in stem):
+        return True
+    # <uuid4 hex>_<original name> (legacy)
+    prefix, sep, _ = stem.partition("_")
+    return bool(sep) and len(prefix) == 32 and all(c in "0123456789abcdef" for c in prefix)
+
+
+def available_sources(cursor):
+    cursor.execute("""
+        SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+    """)
+    existing = {(table, column) for table, column in cursor.fetchall()}
+    return [source for source in REFERENCE_SOURCES if source in existing]
+
+
+def iter_candidate_batches(upload_folder, batch_size, cutoff, stats):
+    """Yield lists of (name, size) for managed files older than cutoff"""
+    batch = []
+    with os.scandir(upload_folder) as entries:
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            stats["scanned"] += 1
+            if not is_managed(entry.name):
+                stats["unmanaged"] += 1
+                continue
+            st = entry.stat(follow_symlinks=False)
+            if st.st_mtime > cutoff:
+                stats["within_grace"] += 1
+                continue
+            batch.append((entry.name, st.st_size))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def referenced_names(cursor, sources, names):
+    """The subset of names that some row still points at"""
+    placeholders = ",".join(["%s"] * len(names))
+    found = set()
+    for table, column in sources:
+        cursor.execute(f"SELECT DISTINCT `{column}` FROM `{table}` WHERE `{column}` IN ({placeholders})", names)
+        found.update(row[0] for row in cursor.fetchall())
+    cursor.execute(
+        f"SELECT filename FROM upload_files WHERE ref_count > 0 AND filename IN ({placeholders})", names
+    )
+    found.update(row[0] for row in cursor.fetchall())
+    return found
+
+
+def delete_orphan(conn, cursor, upload_folder, sources, name):
+    """Re-check one file under its upload_files row lock and delete it if still unreferenced.
+
+    Holding the row lock makes a concurrent upload of the same content wait, so it
+    re-creates the file after we are done instead of referencing one we just removed.
+    """
+    cursor.execute("""
+        INSERT INTO upload_files (filename, ref_count) VALUES (%s, 0)
+        ON DUPLICATE KEY UPDATE ref_count = ref_count
+    """, (name,))
+    if referenced_names(cursor, sources, [name]):
+        cursor.execute("DELETE FROM upload_files WHERE filename = %s AND ref_count = 0", (name,))
+        conn.commit()
+        return False
+
+    path = os.path.join(upload_folder, name)
+    if os.path.exists(path):
+        os.remove(path)
+    image_pipeline.delete_variants(upload_folder, name)
+    cursor.execute("DELETE FROM upload_files WHERE filename = %s", (name,))
+    conn.commit()
+    return True
+
+
+def collect(conn, upload_folder, grace_seconds=DEFAULT_GRACE_SECONDS, dry_run=True,
+            batch_size=DEFAULT_BATCH_SIZE, report_limit=100):
+    """Find (and unless dry_run, delete) unreferenced uploads. Returns a summary dict."""
+    stats = {
+        "scanned": 0,
+        "unmanaged": 0,
+        "within_grace": 0,
+        "referenced": 0,
+        "orphaned": 0,
+        "orphaned_bytes": 0,
+        "deleted": 0,
+        "expired_chunked_uploads": 0,
+        "dry_run": dry_run,
+        "grace_seconds": grace_seconds,
+        "orphans": [],
+    }
+    cutoff = time.time() - grace_seconds
+    if not dry_run:
+        # Abandoned resumable uploads idle for longer than the grace period
+        stats["expired_chunked_uploads"] = chunked_upload.expire(upload_folder, grace_seconds)
+    cursor = conn.cursor()
+    try:
+        sources = available_sources(cursor)
+        for batch in iter_candidate_batches(upload_folder, batch_size, cutoff, stats):
+            sizes = dict(batch)
+            # Temp files from interrupted uploads are never referenced
+            names = [name for name in sizes if not name.startswith(INCOMING_PREFIX)]
+            referenced = referenced_names(cursor, sources, names) if names else set()
+            conn.commit()  # end the read snapshot so the next batch sees fresh rows
+
+            orphans = sizes.keys() - referenced
+            stats["referenced"] += len(sizes) - len(orphans)
+            for name in sorted(orphans):
+                stats["orphaned"] += 1
+                stats["orphaned_bytes"] += sizes[name]
+                if len(stats["orphans"]) < report_limit:
+                    stats["orphans"].append(name)
+                if dry_run:
+                    continue
+
+                if name.startswith(INCOMING_PREFIX):
+                    os.remove(os.path.join(upload_folder, name))
+                    stats["deleted"] += 1
+                elif delete_orphan(conn, cursor, upload_folder, sources, name):
+                    stats["deleted"] += 1
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete uploads that no product references")
+    parser.add_argument("--upload-folder",
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "uploads"))
+    parser.add_argument("--dry-run", action="store_true", help="report orphans without deleting them")
+    parser.add_argument("--grace-hours", type=float, default=DEFAULT_GRACE_SECONDS / 3600,
+                        help="skip files modified more recently than this (default: 24)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--report-limit", type=int, default=100,
+                        help="maximum number of orphan names listed in the report")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        summary = collect(
+            conn, args.upload_folder,
+            grace_seconds=max(0, args.grace_hours * 3600),
+            dry_run=args.dry_run,
+            batch_size=max(1, args.batch_size),
+            report_limit=max(0, args.report_limit),
+        )
+    finally:
+        conn.close()
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+# upload_store.py
+"""Content-addressed storage for product image uploads.
+
+Uploads are named after the SHA-256 of their bytes plus the original extension, so the
+same photo uploaded for ten products is stored once. The `upload_files` table keeps a
+reference count per stored file (one per product_images row or products.image_url that
+names it); a file is only deleted when its last reference goes away.
+
+An upload is staged first: multipart file parts are spooled straight into a hashing
+temp file in the upload folder (see HashingSpool), so spooling and hashing happen as the
+request body is parsed, one part after another, and nothing is copied afterwards.
+persist() is the only step that runs in parallel: each file, on its own pool thread,
+has its image metadata stripped (replacing the temp file and its name when anything
+was removed, so the name always hashes the stored bytes) and is flushed to disk.
+
+The caller then counts references inside the transaction that inserts the referencing
+rows and places the files before committing it. Counting a reference locks the file's
+upload_files row, and release() unlinks only while holding that lock and only at zero
+references, so a committed reference can never lose its file. If the transaction fails
+before its commit, unplace() removes the new files while the locks are still held; if
+the commit itself fails, the files are left to upload_gc.py.
+"""
+import hashlib
+import os
+import threading
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_SIZE = 64 * 1024
+INCOMING_PREFIX = ".incoming-"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="upload-store")
+        return _pool
+
+
+def new_temp_path(upload_folder):
+    return os.path.join(upload_folder, f"{INCOMING_PREFIX}{uuid.uuid4().hex}")
+
+
+class HashingSpool:
+    """Writable temp file in the upload folder that hashes everything written to it.
+
+    Used as the multipart stream for file parts. Unless stage() takes ownership, the
+    file is removed when the request closes it.
+    """
+
+    def __init__(self, upload_folder):
+        self.path = new_temp_path(upload_folder)
+        self._file = open(self.path, "w+b")
+        self._digest = hashlib.sha256()
+        self.size = 0
+        self.owned = False
+
+    def write(self, data):
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+    def close(self):
+        self._file.close()
+        if not self.owned and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        # read/seek/tell/flush etc. go to the underlying file
+        return getattr(self._file, name)
+
+
+class StagedUpload:
+    """An upload hashed and written to a temp file, not yet placed"""
+
+    def __init__(self, filename, temp_path, size, keep_on_discard=False):
+        self.filename = filename
+        self.temp_path = temp_path
+        self.size = size
+        # Set for files owned by someone else (e.g. a chunked upload session)
+        self.keep_on_discard = keep_on_discard
+
+    def discard(self):
+        if self.temp_path and not self.keep_on_discard and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        self.temp_path = None
+
+
+def content_filename(digest, original_filename):
+    ext = os.path.splitext(original_filename)[1].lower()
+    if ext == ".jpeg":
+        ext = ".jpg"
+    return f"{digest}{ext}"
+
+
+def stage(file_storage, upload_folder, original_filename):
+    """Stage an uploaded file, hashing it on the way through.
+
+    Parts already spooled into a HashingSpool are adopted as-is; other streams are copied
+    to a temp file in chunks.
+    """
+    stream = file_storage.stream
+    if isinstance(stream, HashingSpool):
+        stream.flush()
+        stream.owned = True
+        return StagedUpload(content_filename(stream.hexdigest(), original_filename), stream.path, stream.size)
+
+    temp_path = new_temp_path(upload_folder)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return StagedUpload(content_filename(digest.hexdigest(), original_filename), temp_path, size)
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _strip(staged, upload_folder, strip):
+    """Swap a staged file for its metadata-free copy, renamed after the new bytes"""
+    temp_path = new_temp_path(upload_folder)
+    try:
+        changed = strip(staged.temp_path, temp_path)
+    except Exception as e:
+        # Not a decodable image; the background pipeline reports it
+        print(f"⚠️  Could not strip metadata from '{staged.filename}': {e}")
+        changed = False
+    if not changed:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return
+    digest = hash_file(temp_path)
+    staged.discard()  # our temp file; a chunked session keeps its own data
+    staged.filename = content_filename(digest, staged.filename)
+    staged.temp_path = temp_path
+    staged.size = os.path.getsize(temp_path)
+    staged.keep_on_discard = False
+
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _finish(staged, upload_folder, strip):
+    if strip is not None:
+        _strip(staged, upload_folder, strip)
+    _fsync(staged.temp_path)
+
+
+def persist(staged_uploads, upload_folder, strip=None):
+    """Strip metadata with strip(source, dest) -> changed, then fsync; one file per pool
+    thread. The files are already hashed and spooled; filenames may change, read them after."""
+    staged_uploads = [s for s in staged_uploads if s.temp_path]
+    if len(staged_uploads) == 1:
+        _finish(staged_uploads[0], upload_folder, strip)
+    elif staged_uploads:
+        list(_get_pool().map(lambda staged: _finish(staged, upload_folder, strip), staged_uploads))
+
+
+def add_references(cursor, filenames):
+    """Count one reference per entry in filenames (repeats count more than once)"""
+    counts = Counter(f for f in filenames if f)
+    if not counts:
+        return
+    # Sorted so concurrent writers lock rows in the same order
+    cursor.executemany("""
+        INSERT INTO upload_files (filename, ref_count) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE ref_count = ref_count + VALUES(ref_count)
+    """, sorted(counts.items()))
+
+
+def place(upload_folder, staged_uploads):
+    """Rename staged uploads into place once add_references() has run, before the commit.
+
+    Content that is already stored is skipped and its temp file dropped. Returns the
+    filenames that were newly written, i.e. the ones that still need processing.
+    """
+    written = []
+    try:
+        for staged in staged_uploads:
+            if staged.temp_path is None:
+                continue
+            target = os.path.join(upload_folder, staged.filename)
+            if os.path.exists(target):
+                staged.discard()
+            else:
+                os.replace(staged.temp_path, target)
+                staged.temp_path = None
+                written.append(staged.filename)
+    except Exception:
+        unplace(upload_folder, written)
+        raise
+    return written
+
+
+def unplace(upload_folder, filenames):
+    """Remove files place() wrote for a transaction that is about to roll back.
+
+    Call before the rollback, while the transaction still holds the files' upload_files
+    row locks, so no other writer can have counted a reference to them meanwhile.
+    """
+    for filename in filenames:
+        path = os.path.join(upload_folder, filename)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def release(conn, upload_folder, filenames, on_delete=None):
+    """Drop one reference per entry in filenames, deleting files nobody references.
+
+    Call after the transaction that removed the referencing rows has committed. Returns
+    the filenames whose files were deleted.
+    """
+    counts = Counter(f for f in filenames if f)
+    deleted = []
+    if not counts:
+        return deleted
+
+    cursor = conn.cursor()
+    try:
+        for filename, count in sorted(counts.items()):
+            cursor.execute(
+                "SELECT ref_count FROM upload_files WHERE filename = %s FOR UPDATE", (filename,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                # Not tracked (e.g. written before this table existed); leave it to the GC
+                conn.commit()
+                continue
+
+            remaining = row[0] - count
+            if remaining > 0:
+                cursor.execute(
+                    "UPDATE upload_files SET ref_count = %s WHERE filename = %s", (remaining, filename)
+                )
+            else:
+                # Unlink while the row is still locked so a concurrent writer waits for us
+                path = os.path.join(upload_folder, filename)
+                if os.path.exists(path):
+                    os.remove(path)
+                if on_delete is not None:
+                    on_delete(filename)
+                cursor.execute("DELETE FROM upload_files WHERE filename = %s", (filename,))
+                deleted.append(filename)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return deleted